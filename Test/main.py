@@ -1,5 +1,6 @@
 # # main.py - Complete Business Management API
 import os
+import asyncio
 import logging
 import time
 import uuid
@@ -98,6 +99,13 @@ class FirebaseDB:
 # Global database instance
 firebase_db = FirebaseDB()
 
+# # Async data layer (imported after FirebaseDB so it reuses the app initialised above)
+from firebase_config.aio import clients as aio_clients
+from firebase_config.aio import dashboard as aio_dashboard
+from firebase_config.aio import inventory as aio_inventory
+from firebase_config.aio import orders as aio_orders
+from firebase_config.aio import suppliers as aio_suppliers
+
 # # ================================
 # # LOGGING UTILITIES
 # # ================================
@@ -2043,6 +2051,64 @@ async def log_requests(request: Request, call_next):
 #         )
 #         raise HTTPException(status_code=500, detail=str(e))
 
+# # ================================
+# # ASYNC READ ENDPOINTS
+# # ================================
+# Served by firebase_config.aio on the event loop, so a slow Firestore call
+# doesn't tie up a worker thread; every call is bounded by its timeout.
+
+async def aio_call(call):
+    try:
+        return await call
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Firestore request timed out")
+
+async def aio_document(call, resource: str):
+    doc = await aio_call(call)
+    if doc is None:
+        raise HTTPException(status_code=404, detail=f"{resource} not found")
+    return doc
+
+@app.get("/api/v1/dashboard")
+async def get_dashboard(period: str = Query("monthly")):
+    return await aio_call(aio_dashboard.get_dashboard_metrics(period))
+
+@app.get("/api/v1/clients")
+async def get_clients(page_size: int = Query(100, ge=1, le=500), page_token: Optional[str] = None):
+    return await aio_call(aio_clients.get_clients_page(page_size, page_token))
+
+@app.get("/api/v1/clients/{client_id}")
+async def get_client(client_id: str):
+    return await aio_document(aio_clients.get_client_by_id(client_id), "Client")
+
+@app.get("/api/v1/inventory")
+async def get_inventory(page_size: int = Query(100, ge=1, le=500), page_token: Optional[str] = None):
+    return await aio_call(aio_inventory.get_inventory_items_page(page_size, page_token))
+
+@app.get("/api/v1/inventory/low-stock")
+async def get_low_stock(threshold: Optional[float] = None):
+    return await aio_call(aio_inventory.get_low_stock_items(threshold))
+
+@app.get("/api/v1/inventory/{item_id}")
+async def get_inventory_item(item_id: str):
+    return await aio_document(aio_inventory.get_inventory_item_by_id(item_id), "Inventory item")
+
+@app.get("/api/v1/orders")
+async def get_orders(page_size: int = Query(100, ge=1, le=500), page_token: Optional[str] = None):
+    return await aio_call(aio_orders.get_orders_page(page_size, page_token))
+
+@app.get("/api/v1/orders/{order_id}")
+async def get_order(order_id: str):
+    return await aio_document(aio_orders.get_order_by_id(order_id), "Order")
+
+@app.get("/api/v1/suppliers")
+async def get_suppliers(page_size: int = Query(100, ge=1, le=500), page_token: Optional[str] = None):
+    return await aio_call(aio_suppliers.get_suppliers_page(page_size, page_token))
+
+@app.get("/api/v1/suppliers/{supplier_id}")
+async def get_supplier(supplier_id: str):
+    return await aio_document(aio_suppliers.get_supplier_by_id(supplier_id), "Supplier")
+
 # # ================================
 # # MAIN APPLICATION ENTRY POINT
 # # ================================
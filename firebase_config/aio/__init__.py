@@ -0,0 +1,21 @@
+# ---------------- Async Data Layer ----------------
+# AsyncClient versions of the read and single-document write helpers, under
+# the same names as their synchronous modules. Each call takes `timeout=`.
+#
+# Left out on purpose (call the synchronous function, e.g. through
+# asyncio.to_thread, when an async caller needs one):
+# - Multi-document writes that run on the stock transaction engine, the ID
+#   allocator or idempotency keys: add_order, add_inventory_item,
+#   update_stock_quantity, add_client, add_supplier, add_supply_record,
+#   add_payment, add_expense, add_supplier_payment, update_client_due and
+#   update_supplier_due. aio.inventory's update/delete hand off to the
+#   synchronous ones in a worker thread for the same reason, and take no
+#   timeout (the thread would keep writing after it fired).
+# - Partial-name searches (search_*_by_partial_name) and
+#   get_items_expiring_soon, which are served from the in-memory mirror,
+#   name index and expiry index.
+# - iter_* generators; page with get_*_page instead.
+# - dashboard.get_snapshot / invalidate_snapshots (use get_dashboard_metrics),
+#   orders.get_total_sales_in_period, get_invoice_by_order_id and the
+#   GetAllOrders tool, suppliers.get_supply_history and the schema helpers
+#   (client_due_change, supply_history_ref, ...).
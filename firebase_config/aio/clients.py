@@ -0,0 +1,54 @@
+from firebase_config.aio.config import get_db, with_timeout
+from firebase_config.cache import invalidate
+from firebase_config.aio.query_utils import get_document, get_page, stream
+from google.cloud import firestore
+from typing import List, Dict, Optional
+from google.cloud.firestore_v1 import FieldFilter
+# ------------------------ Clients (async) ------------------------
+
+@with_timeout
+async def get_client_by_name(name: str, fields: Optional[List[str]] = None) -> list:
+    return await stream(get_db().collection("Clients").where(filter=FieldFilter("name", "==", name)), fields)
+
+@with_timeout
+async def get_client_by_id(client_id: str):
+    return await get_document(get_db().collection("Clients"), client_id)
+
+@with_timeout
+async def update_client(client_id: str, updated_data: dict):
+    updated_data["updated_at"] = firestore.SERVER_TIMESTAMP
+    await get_db().collection("Clients").document(client_id).update(updated_data)
+    invalidate("Clients", client_id)
+
+@with_timeout
+async def delete_client(client_id: str):
+    await get_db().collection("Clients").document(client_id).delete()
+    invalidate("Clients", client_id)
+
+@with_timeout
+async def get_all_clients(fields: Optional[List[str]] = None) -> list:
+    return await stream(get_db().collection("Clients"), fields)
+
+@with_timeout
+async def get_clients_page(page_size: int = 100, page_token: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    return await get_page(get_db().collection("Clients"), page_size=page_size, page_token=page_token, fields=fields)
+
+@with_timeout
+async def get_client_order_history(client_id: str, fields: Optional[List[str]] = None) -> list:
+    query = (
+        get_db().collection("Orders")
+        .where(filter=FieldFilter("client_id", "==", client_id))
+        .where(filter=FieldFilter("type", "==", "sell"))
+    )
+    return await stream(query, fields)
+
+@with_timeout
+async def get_client_payments(client_id: str, fields: Optional[List[str]] = None) -> list:
+    return await stream(get_db().collection("Payments").where(filter=FieldFilter("client_id", "==", client_id)), fields)
+
+@with_timeout
+async def resolve_client_id_by_name(name: str):
+    query = get_db().collection("Clients").where(filter=FieldFilter("name", "==", name)).limit(1)
+    async for doc in query.stream():
+        return doc.id
+    return None
@@ -0,0 +1,38 @@
+import firebase_config.config  # initialises the default Firebase app
+import firebase_admin
+from google.cloud import firestore
+import asyncio
+import functools
+import weakref
+
+# ---------------- Async Firestore Client ----------------
+# grpc.aio channels are bound to the event loop that created them, so one
+# AsyncClient is kept per running loop (Streamlit and scripts that call
+# asyncio.run() get a fresh loop each time).
+
+DEFAULT_TIMEOUT = 10.0  # seconds per call
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_db() -> firestore.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        app = firebase_admin.get_app()
+        client = firestore.AsyncClient(project=app.project_id, credentials=app.credential.get_credential())
+        _clients[loop] = client
+    return client
+
+
+def with_timeout(fn):
+    """Give an async data-layer call a `timeout=` keyword (default DEFAULT_TIMEOUT)."""
+    @functools.wraps(fn)
+    async def wrapper(*args, timeout: float = None, **kwargs):
+        return await asyncio.wait_for(fn(*args, **kwargs), timeout or DEFAULT_TIMEOUT)
+    return wrapper
+
+
+async def gather(*calls, timeout: float = None):
+    """Run independent calls concurrently; total latency is the slowest call."""
+    return await asyncio.wait_for(asyncio.gather(*calls), timeout or DEFAULT_TIMEOUT)
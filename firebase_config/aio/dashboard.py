@@ -0,0 +1,124 @@
+from firebase_config.aio.config import gather, get_db, with_timeout
+from firebase_config.aio.finance import get_all_dues, get_total_expenses, get_total_payments
+from firebase_config.aio.query_utils import count_query, stream, sum_query
+from firebase_config.dashboard import LOW_STOCK_FIELDS, get_date_range
+from firebase_config.rollups import _as_day
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+from google.cloud.firestore_v1 import FieldFilter
+
+# ---------------- Dashboard (async) ----------------
+# Same metrics as firebase_config.dashboard. Each call is one or a few
+# awaits, so a page can fan them out with gather() and wait for the
+# slowest metric instead of the sum of all of them.
+
+def _sales_orders_query(start_date=None, end_date=None):
+    query = get_db().collection("Orders").where(filter=FieldFilter("order_type", "in", ["sales", "delivery_challan"]))
+    if start_date:
+        query = query.where(filter=FieldFilter("order_date", ">=", start_date))
+    if end_date:
+        query = query.where(filter=FieldFilter("order_date", "<=", end_date))
+    return query
+
+@with_timeout
+async def get_total_revenue(start_date=None, end_date=None) -> float:
+    return await sum_query(_sales_orders_query(start_date, end_date), "total_amount")
+
+@with_timeout
+async def get_net_profit(start_date=None, end_date=None) -> float:
+    revenue, expenses = await gather(get_total_revenue(start_date, end_date),
+                                     get_total_expenses(None, start_date, end_date))
+    return revenue - expenses
+
+@with_timeout
+async def get_total_orders(start_date=None, end_date=None) -> int:
+    query = get_db().collection("Orders")
+    if start_date:
+        query = query.where(filter=FieldFilter("order_date", ">=", start_date))
+    if end_date:
+        query = query.where(filter=FieldFilter("order_date", "<=", end_date))
+    return await count_query(query)
+
+async def _get_daily_rollups(start_date, end_date) -> List[Dict]:
+    days = get_db().collection("rollups").document("daily").collection("days")
+    start, end = _as_day(start_date), _as_day(end_date)
+    refs = [days.document((start + timedelta(days=offset)).isoformat()) for offset in range((end - start).days + 1)]
+    if not refs:
+        return []
+    rollups = [doc.to_dict() | {"date": doc.id} async for doc in get_db().get_all(refs) if doc.exists]
+    return sorted(rollups, key=lambda r: r["date"])
+
+@with_timeout
+async def get_order_trend(start_date, end_date, group_by="day") -> List[Dict]:
+    data = defaultdict(int)
+    for rollup in await _get_daily_rollups(start_date, end_date):
+        key = rollup["date"] if group_by == "day" else rollup["date"][:7]
+        data[key] += rollup.get("orders", 0)
+    return [{"date": k, "orders": v} for k, v in sorted(data.items())]
+
+@with_timeout
+async def get_top_selling_items(start_date, end_date, limit=5) -> List[Dict]:
+    sales = defaultdict(lambda: {"quantity": 0, "total_amount": 0, "item_name": ""})
+    for rollup in await _get_daily_rollups(start_date, end_date):
+        revenue = rollup.get("item_revenue", {})
+        for name, qty in rollup.get("item_quantity", {}).items():
+            sales[name]["item_name"] = name
+            sales[name]["quantity"] += qty
+            sales[name]["total_amount"] += revenue.get(name, 0)
+    return sorted(sales.values(), key=lambda x: x["quantity"], reverse=True)[:limit]
+
+@with_timeout
+async def get_inventory_distribution_by_category() -> List[Dict]:
+    category_counts = defaultdict(float)
+    for item in await stream(get_db().collection("Inventory Items"), ["category", "stock_quantity"]):
+        category_counts[item.get("category", "uncategorized")] += float(item.get("stock_quantity", 0))
+    return [{"category": cat, "quantity": qty} for cat, qty in category_counts.items()]
+
+@with_timeout
+async def get_low_stock_items_dashboard(threshold=None, fields: Optional[List[str]] = LOW_STOCK_FIELDS) -> List[Dict]:
+    if threshold is None:
+        query = get_db().collection("Inventory Items").where(filter=FieldFilter("is_low_stock", "==", True))
+    else:
+        query = get_db().collection("Inventory Items").where(filter=FieldFilter("stock_quantity", "<=", threshold))
+    return await stream(query, fields)
+
+@with_timeout
+async def get_overdue_payments(days_overdue=0) -> List[Dict]:
+    today = datetime.utcnow()
+    query = get_db().collection("clients").where(filter=FieldFilter("total_due", ">", 0))
+    overdue = []
+    for data in await stream(query, ["client_name", "name", "total_due", "last_payment_date"]):
+        last_payment_date = data.get("last_payment_date")
+        if isinstance(last_payment_date, datetime):
+            # Firestore returns tz-aware datetimes; compare in naive UTC like the sync module
+            overdue_days = (today - last_payment_date.replace(tzinfo=None)).days
+            if overdue_days > days_overdue:
+                data["overdue_days"] = overdue_days
+                overdue.append(data)
+    return sorted(overdue, key=lambda x: x["overdue_days"], reverse=True)
+
+# ---------------- Fan-out ----------------
+
+async def get_dashboard_metrics(period="monthly", timeout: float = None) -> Dict:
+    """Every dashboard metric for a period, fetched concurrently."""
+    start, end = get_date_range(period)
+    names = ["total_revenue", "total_orders", "total_expenses", "total_payments", "dues",
+             "order_trend", "top_selling_items", "category_distribution", "low_stock_items", "overdue_payments"]
+    results = await gather(
+        get_total_revenue(start, end),
+        get_total_orders(start, end),
+        get_total_expenses(None, start, end),
+        get_total_payments(None, start, end),
+        get_all_dues(fields=["total_due"]),
+        get_order_trend(start, end),
+        get_top_selling_items(start, end),
+        get_inventory_distribution_by_category(),
+        get_low_stock_items_dashboard(),
+        get_overdue_payments(),
+        timeout=timeout,
+    )
+    metrics = dict(zip(names, results))
+    metrics["net_profit"] = metrics["total_revenue"] - metrics["total_expenses"]
+    metrics["total_dues"] = sum(d.get("total_due", 0) for d in metrics.pop("dues"))
+    return metrics
@@ -0,0 +1,73 @@
+from firebase_config.aio.config import get_db, with_timeout
+from firebase_config.cache import invalidate
+from firebase_config.aio.query_utils import stream, sum_query
+from google.cloud import firestore
+from typing import List, Dict, Optional
+from google.cloud.firestore_v1 import FieldFilter
+# ------------------------ Payments (async) ------------------------
+
+def _payments_query(client_id=None, start_date=None, end_date=None):
+    query = get_db().collection("Payments")
+    if client_id:
+        query = query.where(filter=FieldFilter("client_id", "==", client_id))
+    if start_date:
+        query = query.where(filter=FieldFilter("date", ">=", start_date))
+    if end_date:
+        query = query.where(filter=FieldFilter("date", "<=", end_date))
+    return query
+
+@with_timeout
+async def get_payments(client_id=None, start_date=None, end_date=None, fields: Optional[List[str]] = None) -> list:
+    return await stream(_payments_query(client_id, start_date, end_date), fields)
+
+@with_timeout
+async def get_total_payments(client_id=None, start_date=None, end_date=None) -> float:
+    return await sum_query(_payments_query(client_id, start_date, end_date), "amount")
+
+@with_timeout
+async def get_all_dues(fields: Optional[List[str]] = None) -> list:
+    return await stream(get_db().collection("clients").where(filter=FieldFilter("total_due", ">", 0)), fields)
+
+# ------------------------ Expenses (async) ------------------------
+
+def _expenses_query(category=None, start_date=None, end_date=None):
+    query = get_db().collection("Expenses")
+    if category:
+        query = query.where(filter=FieldFilter("category", "==", category))
+    if start_date:
+        query = query.where(filter=FieldFilter("date", ">=", start_date))
+    if end_date:
+        query = query.where(filter=FieldFilter("date", "<=", end_date))
+    return query
+
+@with_timeout
+async def get_expenses(category=None, start_date=None, end_date=None, fields: Optional[List[str]] = None) -> list:
+    return await stream(_expenses_query(category, start_date, end_date), fields)
+
+@with_timeout
+async def update_expense(expense_id: str, updated_data: dict):
+    updated_data["updated_at"] = firestore.SERVER_TIMESTAMP
+    await get_db().collection("Expenses").document(expense_id).update(updated_data)
+    invalidate("Expenses", expense_id)
+
+@with_timeout
+async def delete_expense(expense_id: str):
+    await get_db().collection("Expenses").document(expense_id).delete()
+    invalidate("Expenses", expense_id)
+
+@with_timeout
+async def get_total_expenses(category=None, start_date=None, end_date=None) -> float:
+    return await sum_query(_expenses_query(category, start_date, end_date), "amount")
+
+# ------------------------ Supplier Payments (async) ------------------------
+
+@with_timeout
+async def get_supplier_payments(supplier_id=None, start_date=None, end_date=None, fields: Optional[List[str]] = None) -> List[dict]:
+    query = get_db().collection("supplier_payments")
+    if supplier_id:
+        query = query.where(filter=FieldFilter("supplier_id", "==", supplier_id))
+    if start_date:
+        query = query.where(filter=FieldFilter("date", ">=", start_date))
+    if end_date:
+        query = query.where(filter=FieldFilter("date", "<=", end_date))
+    return await stream(query, fields)
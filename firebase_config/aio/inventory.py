@@ -0,0 +1,76 @@
+from firebase_config.aio.config import get_db, with_timeout
+from firebase_config.aio.query_utils import get_document, get_page, stream
+from firebase_config import inventory
+from firebase_config.batch_store import uses_subcollection
+from typing import List, Dict, Optional
+import asyncio
+from google.cloud.firestore_v1 import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
+# ------------------------ Inventory (async) ------------------------
+
+async def _load_batches(doc_id: str) -> List[Dict]:
+    batches = get_db().collection("Inventory Items").document(doc_id).collection("batches")
+    return await stream(batches.order_by(FieldPath.document_id()))
+
+async def _read_items(items: List[Dict], fields: Optional[List[str]] = None) -> List[Dict]:
+    """Fill in `batches` for migrated items, same as firebase_config.inventory."""
+    if fields and "batches" not in fields:
+        return items
+    migrated = [item for item in items if uses_subcollection(item)]
+    for item, batches in zip(migrated, await asyncio.gather(*(_load_batches(item["id"]) for item in migrated))):
+        item["batches"] = [{key: value for key, value in batch.items() if key not in ("id", "updated_at")}
+                           for batch in batches]
+    return items
+
+def _select(fields: Optional[List[str]]) -> Optional[List[str]]:
+    if fields and "batches" in fields and "batch_schema" not in fields:
+        return fields + ["batch_schema"]
+    return fields
+
+@with_timeout
+async def get_inventory_item_by_name(name: str, fields: Optional[List[str]] = None) -> List[Dict]:
+    return await _read_items(await stream(get_db().collection("Inventory Items").where(filter=FieldFilter("name", "==", name)), _select(fields)), fields)
+
+@with_timeout
+async def get_inventory_item_by_id(doc_id: str) -> Optional[Dict]:
+    item = await get_document(get_db().collection("Inventory Items"), doc_id)
+    return (await _read_items([item]))[0] if item else None
+
+# Both keep batches, the expiry index, low-stock flags and the ledger in
+# step, so they run the synchronous transaction in a worker thread. They take
+# no timeout: a thread can't be cancelled, so a timed-out call could still
+# commit after reporting failure.
+
+async def update_inventory_item(doc_id: str, updated_data: Dict):
+    await asyncio.to_thread(inventory.update_inventory_item, doc_id, updated_data)
+
+async def delete_inventory_item(doc_id: str):
+    await asyncio.to_thread(inventory.delete_inventory_item, doc_id)
+
+@with_timeout
+async def get_all_inventory_items(fields: Optional[List[str]] = None) -> List[Dict]:
+    return await _read_items(await stream(get_db().collection("Inventory Items"), _select(fields)), fields)
+
+@with_timeout
+async def get_inventory_items_page(page_size: int = 100, page_token: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    page = await get_page(get_db().collection("Inventory Items"), page_size=page_size, page_token=page_token, fields=_select(fields))
+    return page | {"items": await _read_items(page["items"], fields)}
+
+@with_timeout
+async def get_items_by_category(category: str, fields: Optional[List[str]] = None) -> List[Dict]:
+    return await _read_items(await stream(get_db().collection("Inventory Items").where(filter=FieldFilter("category", "==", category)), _select(fields)), fields)
+
+@with_timeout
+async def get_low_stock_items(threshold: Optional[float] = None, fields: Optional[List[str]] = None) -> List[Dict]:
+    if threshold is None:
+        query = get_db().collection("Inventory Items").where(filter=FieldFilter("is_low_stock", "==", True))
+    else:
+        query = get_db().collection("Inventory Items").where(filter=FieldFilter("stock_quantity", "<=", threshold))
+    return await _read_items(await stream(query, _select(fields)), fields)
+
+@with_timeout
+async def resolve_inventory_item_id_by_name(name: str) -> Optional[str]:
+    query = get_db().collection("Inventory Items").where(filter=FieldFilter("name", "==", name)).limit(1)
+    async for doc in query.stream():
+        return doc.id
+    return None
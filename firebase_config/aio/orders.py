@@ -0,0 +1,56 @@
+from firebase_config.aio.config import get_db, with_timeout
+from firebase_config.cache import invalidate
+from firebase_config.aio.query_utils import get_document, get_page, stream
+from google.cloud import firestore
+from datetime import datetime
+from typing import List, Dict, Optional
+from google.cloud.firestore_v1 import FieldFilter
+# ------------------------ Orders (async) ------------------------
+# Reads and simple updates only; add_order stays on the synchronous stock
+# transaction engine in firebase_config.orders.
+
+@with_timeout
+async def get_order_by_id(order_id: str) -> Optional[Dict]:
+    return await get_document(get_db().collection("Orders"), order_id)
+
+@with_timeout
+async def get_all_orders(fields: Optional[List[str]] = None):
+    return await stream(get_db().collection("Orders"), fields)
+
+@with_timeout
+async def get_orders_page(page_size: int = 100, page_token: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    return await get_page(get_db().collection("Orders"), page_size=page_size, page_token=page_token, fields=fields)
+
+@with_timeout
+async def get_orders_by_client(client_id: str, fields: Optional[List[str]] = None) -> List[Dict]:
+    return await stream(get_db().collection("Orders").where(filter=FieldFilter("client_id", "==", client_id)), fields)
+
+@with_timeout
+async def get_orders_by_supplier(supplier_id: str, fields: Optional[List[str]] = None) -> List[Dict]:
+    return await stream(get_db().collection("Orders").where(filter=FieldFilter("supplier_id", "==", supplier_id)), fields)
+
+@with_timeout
+async def get_orders_by_status(status: str, fields: Optional[List[str]] = None) -> List[Dict]:
+    return await stream(get_db().collection("Orders").where(filter=FieldFilter("status", "==", status)), fields)
+
+@with_timeout
+async def get_orders_by_date_range(start_date: datetime, end_date: datetime, fields: Optional[List[str]] = None) -> List[Dict]:
+    query = get_db().collection("Orders")\
+        .where(filter=FieldFilter("date", ">=", start_date))\
+        .where(filter=FieldFilter("date", "<=", end_date))
+    return await stream(query, fields)
+
+@with_timeout
+async def update_order(order_id: str, update_data: Dict):
+    update_data["updated_at"] = firestore.SERVER_TIMESTAMP
+    await get_db().collection("Orders").document(order_id).update(update_data)
+    invalidate("Orders", order_id)
+
+@with_timeout
+async def delete_order(order_id: str):
+    await get_db().collection("Orders").document(order_id).delete()
+    invalidate("Orders", order_id)
+
+@with_timeout
+async def search_orders_by_invoice_number(invoice_number: str) -> List[Dict]:
+    return await stream(get_db().collection("Orders").where(filter=FieldFilter("invoice_number", "==", invoice_number)))
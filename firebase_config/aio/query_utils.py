@@ -0,0 +1,44 @@
+from firebase_config.query_utils import _AGGREGATION_ERRORS, project
+from google.cloud.firestore_v1.field_path import FieldPath
+from typing import Dict, List, Optional
+
+# ---------------- Aggregation Helpers ----------------
+# Async counterparts of firebase_config.query_utils
+
+
+async def count_query(query) -> int:
+    try:
+        result = await query.count(alias="count").get()
+        return int(result[0][0].value)
+    except _AGGREGATION_ERRORS:
+        return len([doc async for doc in query.select([]).stream()])
+
+
+async def sum_query(query, field: str) -> float:
+    try:
+        result = await query.sum(field, alias="total").get()
+        return float(result[0][0].value or 0)
+    except _AGGREGATION_ERRORS:
+        return sum([float(doc.to_dict().get(field, 0) or 0) async for doc in query.select([field]).stream()])
+
+
+# ---------------- Reads ----------------
+
+async def stream(query, fields: Optional[List[str]] = None) -> List[Dict]:
+    return [doc.to_dict() | {"id": doc.id} async for doc in project(query, fields).stream()]
+
+
+async def get_page(collection_ref, query=None, page_size: int = 100,
+                   page_token: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    query = (query if query is not None else collection_ref).order_by(FieldPath.document_id())
+    if page_token:
+        query = query.start_after({FieldPath.document_id(): collection_ref.document(page_token)})
+    docs = [doc async for doc in project(query, fields).limit(page_size + 1).stream()]
+    items = [doc.to_dict() | {"id": doc.id} for doc in docs[:page_size]]
+    next_page_token = docs[page_size - 1].id if len(docs) > page_size else None
+    return {"items": items, "next_page_token": next_page_token}
+
+
+async def get_document(collection_ref, doc_id: str) -> Optional[Dict]:
+    doc = await collection_ref.document(doc_id).get()
+    return doc.to_dict() | {"id": doc.id} if doc.exists else None
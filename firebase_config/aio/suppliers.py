@@ -0,0 +1,43 @@
+from firebase_config.aio.config import get_db, with_timeout
+from firebase_config.cache import invalidate
+from firebase_config.aio.query_utils import get_document, get_page, stream
+from google.cloud import firestore
+from typing import List, Dict, Optional
+from google.cloud.firestore_v1 import FieldFilter
+# ------------------------ Suppliers (async) ------------------------
+
+@with_timeout
+async def get_supplier_by_name(name: str, fields: Optional[List[str]] = None) -> List[Dict]:
+    return await stream(get_db().collection("Suppliers").where(filter=FieldFilter("name", "==", name)), fields)
+
+@with_timeout
+async def get_supplier_by_id(supplier_id: str) -> Dict:
+    return await get_document(get_db().collection("Suppliers"), supplier_id)
+
+@with_timeout
+async def update_supplier(supplier_id: str, updated_data: Dict):
+    updated_data["updated_at"] = firestore.SERVER_TIMESTAMP
+    await get_db().collection("Suppliers").document(supplier_id).update(updated_data)
+    invalidate("Suppliers", supplier_id)
+
+@with_timeout
+async def delete_supplier(supplier_id: str):
+    await get_db().collection("Suppliers").document(supplier_id).delete()
+    invalidate("Suppliers", supplier_id)
+
+@with_timeout
+async def get_all_suppliers(fields: Optional[List[str]] = None) -> List[Dict]:
+    return await stream(get_db().collection("Suppliers"), fields)
+
+@with_timeout
+async def get_suppliers_page(page_size: int = 100, page_token: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    return await get_page(get_db().collection("Suppliers"), page_size=page_size, page_token=page_token, fields=fields)
+
+@with_timeout
+async def get_supplier_order_history(supplier_id: str, fields: Optional[List[str]] = None) -> list:
+    query = (
+        get_db().collection("Orders")
+        .where(filter=FieldFilter("supplier_id", "==", supplier_id))
+        .where(filter=FieldFilter("type", "==", "purchase"))
+    )
+    return await stream(query, fields)
@@ -0,0 +1,223 @@
+from firebase_config.config import db
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# ---------------- Columnar Analytics ----------------
+# Orders are flattened into an Arrow table with one row per order line and
+# only the fields the dashboard needs. The table is cached for
+# SNAPSHOT_TTL seconds, so every chart after the first is a vectorized
+# group-by over memory instead of another full scan of Orders.
+
+SNAPSHOT_TTL = 300  # seconds
+SALE_ORDER_TYPES = ["sell", "sales", "delivery_challan"]
+
+ORDER_FIELDS = ["order_type", "order_date", "client_id", "client_name", "items"]
+INVENTORY_FIELDS = ["name", "category", "stock_quantity", "unit_price"]
+
+LINE_SCHEMA = pa.schema([
+    ("order_id", pa.string()),
+    ("order_type", pa.string()),
+    ("order_date", pa.timestamp("us", tz="UTC")),
+    ("client_id", pa.string()),
+    ("client_name", pa.string()),
+    ("item_id", pa.string()),
+    ("item_name", pa.string()),
+    ("quantity", pa.float64()),
+    ("price", pa.float64()),
+])
+
+INVENTORY_SCHEMA = pa.schema([
+    ("item_id", pa.string()),
+    ("item_name", pa.string()),
+    ("category", pa.string()),
+    ("stock_quantity", pa.float64()),
+    ("unit_price", pa.float64()),
+])
+
+_NULL_FLOAT = pa.scalar(None, pa.float64())
+
+_snapshot_lock = threading.Lock()
+_snapshots = {}  # name -> (loaded_at, table)
+
+
+def _float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _utc(value):
+    if not isinstance(value, datetime):
+        return None
+    # Naive datetimes are treated as UTC, same as the Firestore client does
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+# ---------------- Loading ----------------
+
+def load_order_lines() -> pa.Table:
+    columns = {name: [] for name in LINE_SCHEMA.names}
+    for doc in db.collection("Orders").select(ORDER_FIELDS).stream():
+        order = doc.to_dict()
+        order_date = _utc(order.get("order_date"))
+        for item in order.get("items") or []:
+            columns["order_id"].append(doc.id)
+            columns["order_type"].append(order.get("order_type", ""))
+            columns["order_date"].append(order_date)
+            columns["client_id"].append(order.get("client_id", ""))
+            columns["client_name"].append(order.get("client_name", ""))
+            columns["item_id"].append(item.get("item_id", ""))
+            columns["item_name"].append(item.get("item_name", ""))
+            columns["quantity"].append(_float(item.get("quantity")))
+            columns["price"].append(_float(item.get("price")))
+    table = pa.table(columns, schema=LINE_SCHEMA)
+    return table.append_column("amount", pc.multiply(table["quantity"], table["price"]))
+
+
+def load_inventory() -> pa.Table:
+    columns = {name: [] for name in INVENTORY_SCHEMA.names}
+    for doc in db.collection("Inventory Items").select(INVENTORY_FIELDS).stream():
+        item = doc.to_dict()
+        columns["item_id"].append(doc.id)
+        columns["item_name"].append(item.get("name", ""))
+        columns["category"].append(item.get("category") or "uncategorized")
+        columns["stock_quantity"].append(_float(item.get("stock_quantity")))
+        columns["unit_price"].append(_float(item.get("unit_price")))
+    return pa.table(columns, schema=INVENTORY_SCHEMA)
+
+
+def _snapshot(name: str, loader, refresh: bool = False) -> pa.Table:
+    with _snapshot_lock:
+        cached = _snapshots.get(name)
+        if cached and not refresh and time.time() - cached[0] < SNAPSHOT_TTL:
+            return cached[1]
+        table = loader()
+        _snapshots[name] = (time.time(), table)
+        return table
+
+
+def get_order_lines(refresh: bool = False) -> pa.Table:
+    return _snapshot("orders", load_order_lines, refresh)
+
+
+def get_inventory_table(refresh: bool = False) -> pa.Table:
+    return _snapshot("inventory", load_inventory, refresh)
+
+
+def refresh_snapshots():
+    get_order_lines(refresh=True)
+    get_inventory_table(refresh=True)
+
+
+# ---------------- Filters ----------------
+
+def _lines(order_types: List[str] = None, start_date=None, end_date=None) -> pa.Table:
+    table = get_order_lines()
+    mask = None
+
+    def combine(condition):
+        return condition if mask is None else pc.and_(mask, condition)
+
+    if order_types:
+        mask = combine(pc.is_in(table["order_type"], value_set=pa.array(order_types)))
+    if start_date:
+        mask = combine(pc.greater_equal(table["order_date"], pa.scalar(_utc(start_date), LINE_SCHEMA.field("order_date").type)))
+    if end_date:
+        mask = combine(pc.less_equal(table["order_date"], pa.scalar(_utc(end_date), LINE_SCHEMA.field("order_date").type)))
+    return table if mask is None else table.filter(mask)
+
+
+# ---------------- Metrics ----------------
+
+def top_sellers(start_date=None, end_date=None, limit: int = 5) -> pa.Table:
+    grouped = _lines(SALE_ORDER_TYPES, start_date, end_date) \
+        .group_by("item_name").aggregate([("quantity", "sum"), ("amount", "sum")]) \
+        .sort_by([("quantity_sum", "descending")])
+    return grouped.slice(0, limit)
+
+
+def revenue_by_client(start_date=None, end_date=None) -> List[Dict]:
+    grouped = _lines(SALE_ORDER_TYPES, start_date, end_date) \
+        .group_by(["client_id", "client_name"]).aggregate([("amount", "sum"), ("order_id", "count_distinct")]) \
+        .sort_by([("amount_sum", "descending")])
+    return [
+        {"client_id": row["client_id"], "client_name": row["client_name"],
+         "revenue": row["amount_sum"], "orders": row["order_id_count_distinct"]}
+        for row in grouped.to_pylist()
+    ]
+
+
+def category_mix(start_date=None, end_date=None) -> List[Dict]:
+    """Quantity and revenue sold per inventory category."""
+    categories = get_inventory_table().select(["item_id", "category"])
+    joined = _lines(SALE_ORDER_TYPES, start_date, end_date).join(categories, "item_id", join_type="left outer")
+    grouped = joined.group_by("category").aggregate([("quantity", "sum"), ("amount", "sum")]) \
+        .sort_by([("amount_sum", "descending")])
+    return [
+        {"category": row["category"] or "uncategorized", "quantity": row["quantity_sum"], "revenue": row["amount_sum"]}
+        for row in grouped.to_pylist()
+    ]
+
+
+def item_velocity(days: int = 30) -> List[Dict]:
+    """Average units sold per day over the trailing window, with days of cover."""
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    sold = _lines(SALE_ORDER_TYPES, start_date=start).group_by("item_id").aggregate([("quantity", "sum")])
+    stock = get_inventory_table().select(["item_id", "item_name", "stock_quantity"])
+    joined = stock.join(sold, "item_id", join_type="left outer")
+    per_day = pc.divide(pc.fill_null(joined["quantity_sum"], 0.0), float(days))
+    cover = pc.if_else(pc.greater(per_day, 0), pc.divide(joined["stock_quantity"], per_day), _NULL_FLOAT)
+    joined = joined.append_column("per_day", per_day).append_column("days_of_cover", cover) \
+        .sort_by([("per_day", "descending")])
+    return [
+        {"item_id": row["item_id"], "item_name": row["item_name"], "units_per_day": row["per_day"],
+         "stock_quantity": row["stock_quantity"], "days_of_cover": row["days_of_cover"]}
+        for row in joined.to_pylist()
+    ]
+
+
+def margin_by_item(start_date=None, end_date=None) -> List[Dict]:
+    """Sales revenue against weighted-average purchase cost per item."""
+    sales = _lines(SALE_ORDER_TYPES, start_date, end_date) \
+        .group_by("item_name").aggregate([("quantity", "sum"), ("amount", "sum")])
+    # Cost basis uses every purchase, not just ones inside the window
+    purchases = _lines(["purchase"]).group_by("item_name").aggregate([("quantity", "sum"), ("amount", "sum")])
+    costs = pa.table({
+        "item_name": purchases["item_name"],
+        "purchased_quantity": purchases["quantity_sum"],
+        "purchased_amount": purchases["amount_sum"],
+    })
+    joined = sales.join(costs, "item_name", join_type="left outer")
+    unit_cost = pc.if_else(pc.greater(pc.fill_null(joined["purchased_quantity"], 0.0), 0),
+                           pc.divide(joined["purchased_amount"], joined["purchased_quantity"]), _NULL_FLOAT)
+    cost = pc.multiply(unit_cost, joined["quantity_sum"])
+    margin = pc.subtract(joined["amount_sum"], cost)
+    joined = joined.append_column("unit_cost", unit_cost).append_column("margin", margin) \
+        .sort_by([("amount_sum", "descending")])
+    return [
+        {"item_name": row["item_name"], "quantity": row["quantity_sum"], "revenue": row["amount_sum"],
+         "unit_cost": row["unit_cost"], "margin": row["margin"],
+         "margin_pct": row["margin"] / row["amount_sum"] if row["margin"] is not None and row["amount_sum"] else None}
+        for row in joined.to_pylist()
+    ]
+
+
+# ---------------- Dashboard-compatible API ----------------
+# Same signatures and return shapes as firebase_config.dashboard
+
+def get_top_selling_items(start_date=None, end_date=None, limit=5) -> List[Dict]:
+    return [
+        {"item_name": row["item_name"], "quantity": row["quantity_sum"], "total_amount": row["amount_sum"]}
+        for row in top_sellers(start_date, end_date, limit).to_pylist()
+    ]
+
+
+def get_inventory_distribution_by_category() -> List[Dict]:
+    grouped = get_inventory_table().group_by("category").aggregate([("stock_quantity", "sum")])
+    return [{"category": row["category"], "quantity": row["stock_quantity_sum"]} for row in grouped.to_pylist()]
@@ -0,0 +1,193 @@
+from firebase_config.config import db
+from firebase_config.batches import BatchAllocator, batch_expiry
+from firebase_config.mirror import get_mirror
+from google.cloud import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# ---------------- Batch Storage ----------------
+# Items created before the subcollection migration keep their batches in
+# the `batches` array (schema 1). Migrated and new items (batch_schema: 2)
+# keep one document per batch in Inventory Items/<id>/batches, so a sale
+# writes only the batch documents it changed plus the item's totals.
+# Everything that reads or writes batches goes through here, so both
+# layouts work side by side until `python -m firebase_config.migrate_subcollections`
+# has converted every item.
+
+BATCH_SCHEMA = 2
+
+# attach_batches() switches to one collection-group read above this many items
+ATTACH_PER_ITEM_LIMIT = 10
+
+# WriteBatches take at most 500 operations
+DELETE_CHUNK = 400
+
+
+def batches_ref(item_id: str):
+    return db.collection("Inventory Items").document(item_id).collection("batches")
+
+
+def batch_doc_id(batch_number: str) -> str:
+    # Batch numbers may contain "/" which Firestore IDs can't
+    return str(batch_number or "-").replace("/", "_")
+
+
+def uses_subcollection(item: Dict) -> bool:
+    return int(item.get("batch_schema", 1) or 1) >= BATCH_SCHEMA
+
+
+def batch_document(batch: Dict) -> Dict:
+    """A batch as stored in the subcollection: the raw fields plus a parsed expiry."""
+    expiry = batch_expiry(batch)
+    doc = {key: value for key, value in batch.items() if key not in ("id", "updated_at")}
+    doc["quantity"] = float(batch.get("quantity", 0) or 0)
+    doc["expiry_date"] = datetime(expiry.year, expiry.month, expiry.day, tzinfo=timezone.utc) if expiry else None
+    doc["updated_at"] = firestore.SERVER_TIMESTAMP
+    return doc
+
+
+def _from_snapshot(snapshot) -> Dict:
+    data = snapshot.to_dict()
+    data.pop("updated_at", None)
+    return data
+
+
+def _from_mirror(doc: Dict) -> Dict:
+    return {key: value for key, value in doc.items() if key not in ("id", "parent_id", "updated_at")}
+
+
+def _mirrored_batches(mirror, item_ids: List[str]) -> Dict[str, List[Dict]]:
+    if len(item_ids) <= ATTACH_PER_ITEM_LIMIT:
+        docs = [doc for item_id in item_ids for doc in mirror.find("parent_id", item_id)]
+    else:
+        wanted = set(item_ids)
+        docs = mirror.filter(lambda doc: doc.get("parent_id") in wanted)
+    loaded = {}
+    # Same order as load_batches (by document ID, the part after the "/")
+    for doc in sorted(docs, key=lambda doc: doc["id"]):
+        loaded.setdefault(doc["parent_id"], []).append(_from_mirror(doc))
+    return loaded
+
+
+# ---------------- Reads ----------------
+
+def load_batches(item_id: str, item: Dict, transaction=None) -> List[Dict]:
+    """An item's batches as a list, whichever layout it uses.
+
+    Inside a transaction pass it along so the batch documents are read (and
+    locked) with the item.
+    """
+    if not uses_subcollection(item):
+        return item.get("batches", []) or []
+    query = batches_ref(item_id).order_by(FieldPath.document_id())
+    docs = transaction.get(query) if transaction is not None else query.stream()
+    return [_from_snapshot(doc) for doc in docs]
+
+
+def get_item_batches(item_id: str) -> List[Dict]:
+    doc = db.collection("Inventory Items").document(item_id).get()
+    if not doc.exists:
+        raise ValueError(f"❌ Inventory item '{item_id}' not found.")
+    return load_batches(item_id, doc.to_dict())
+
+
+def with_batches(item_id: str, item: Optional[Dict]) -> Optional[Dict]:
+    """Fill in `batches` for a migrated item so callers see the old shape."""
+    if item is None or not uses_subcollection(item):
+        return item
+    return item | {"batches": load_batches(item_id, item)}
+
+
+def attach_batches(items: List[Dict]) -> List[Dict]:
+    """with_batches() for a list of items (each needs its "id").
+
+    Served from the "batches" mirror (or its replica) when one is live, so
+    mirror-served item reads stay local. Otherwise a few migrated items are
+    read one subcollection each; beyond ATTACH_PER_ITEM_LIMIT every batch
+    is read with one collection-group query instead of one query per item.
+    """
+    migrated = [item["id"] for item in items if uses_subcollection(item)]
+    if not migrated:
+        return items
+    mirror = get_mirror("batches")
+    if mirror is not None:
+        loaded = _mirrored_batches(mirror, migrated)
+    elif len(migrated) <= ATTACH_PER_ITEM_LIMIT:
+        loaded = {item_id: load_batches(item_id, {"batch_schema": BATCH_SCHEMA}) for item_id in migrated}
+    else:
+        wanted = set(migrated)
+        docs = {}
+        for doc in db.collection_group("batches").stream():
+            item_ref = doc.reference.parent.parent
+            if item_ref is None or item_ref.parent.id != "Inventory Items" or item_ref.id not in wanted:
+                continue
+            docs.setdefault(item_ref.id, []).append(doc)
+        # Same order as load_batches (by document ID)
+        loaded = {item_id: [_from_snapshot(doc) for doc in sorted(batch_docs, key=lambda doc: doc.id)]
+                  for item_id, batch_docs in docs.items()}
+    return [item | {"batches": loaded.get(item["id"], [])} if uses_subcollection(item) else item
+            for item in items]
+
+
+# ---------------- Writes ----------------
+
+def stage_batches(writer, item_id: str, item: Dict, batches: List[Dict],
+                  before: Optional[Dict[str, float]] = None) -> Dict:
+    """Queue the batch writes and return the fields to update on the item.
+
+    Schema 1 rewrites the array. Schema 2 writes only the batch documents
+    whose quantity differs from `before` (all of them when it's omitted)
+    and deletes those in `before` that are no longer in `batches`.
+    """
+    stock_quantity = sum(float(b.get("quantity", 0) or 0) for b in batches)
+    fields = {"stock_quantity": stock_quantity, "updated_at": firestore.SERVER_TIMESTAMP}
+    if not uses_subcollection(item):
+        fields["batches"] = batches
+        return fields
+    for batch in batches:
+        batch_number = batch.get("batch_number", "")
+        quantity = float(batch.get("quantity", 0) or 0)
+        if before is not None and before.get(batch_number) == quantity:
+            continue
+        writer.set(batches_ref(item_id).document(batch_doc_id(batch_number)), batch_document(batch))
+    kept = {batch.get("batch_number", "") for batch in batches}
+    for batch_number in (before or {}):
+        if batch_number not in kept:
+            writer.delete(batches_ref(item_id).document(batch_doc_id(batch_number)))
+    return fields
+
+
+def delete_collection(collection_ref, chunk: int = DELETE_CHUNK) -> int:
+    """Delete every document a (sub)collection or query returns, in WriteBatches of `chunk`; returns the count."""
+    deleted = 0
+    batch, pending = db.batch(), 0
+    for doc in collection_ref.select([]).stream():
+        batch.delete(doc.reference)
+        pending += 1
+        if pending == chunk:
+            batch.commit()
+            deleted += pending
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+        deleted += pending
+    return deleted
+
+
+def drop_batches(item_id: str):
+    """Delete a removed item's batch documents."""
+    delete_collection(batches_ref(item_id))
+
+
+# ---------------- Allocation Preview ----------------
+
+def plan_allocation(item_id: str, quantity: float) -> List[Dict]:
+    """Preview the FEFO plan for selling `quantity` of an item (read-only)."""
+    doc = db.collection("Inventory Items").document(item_id).get()
+    if not doc.exists:
+        raise ValueError(f"❌ Inventory item '{item_id}' not found.")
+    item = doc.to_dict()
+    # Plan against a copy so the preview never mutates cached data
+    batches = [dict(batch) for batch in load_batches(item_id, item)]
+    return BatchAllocator(batches, item.get("name", item_id)).allocate(float(quantity))
@@ -0,0 +1,115 @@
+from calendar import monthrange
+from datetime import date, datetime
+from typing import Dict, List, Optional
+import heapq
+import re
+
+# ---------------- FEFO Batch Allocation ----------------
+# Sales without a batch_number are filled first-expiry-first-out. An item's
+# batches go into a min-heap keyed by expiry, so splitting a quantity across
+# k batches costs O(b + k log b) instead of a rescan per line. Several order
+# lines for the same item share one heap, so a multi-line order is planned
+# in one pass inside its transaction.
+
+EXPIRY_KEYS = ("exp", "Expiry", "expiry")
+
+# Batches with no readable expiry are sold last
+_NO_EXPIRY = date.max
+
+
+def parse_expiry(value) -> Optional[date]:
+    """Read a batch expiry: MM/YYYY, MM/YY, YYYY-MM, YYYY-MM-DD, DD/MM/YYYY or a date.
+
+    Month-only expiries run to the end of that month, as printed on packs.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or "").strip()
+    if not text:
+        return None
+    match = re.fullmatch(r"(\d{1,2})[/-](\d{2}|\d{4})", text)
+    if match:
+        month, year = int(match.group(1)), int(match.group(2))
+        year += 2000 if year < 100 else 0
+    else:
+        match = re.fullmatch(r"(\d{4})-(\d{1,2})", text)
+        if not match:
+            for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+                try:
+                    return datetime.strptime(text[:10], fmt).date()
+                except ValueError:
+                    continue
+            return None
+        year, month = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return date(year, month, monthrange(year, month)[1])
+
+
+def batch_expiry(batch: Dict) -> Optional[date]:
+    for key in EXPIRY_KEYS:
+        if batch.get(key):
+            return parse_expiry(batch[key])
+    return None
+
+
+class BatchAllocator:
+    """FEFO allocator over one item's `batches` list.
+
+    Allocations decrement the batch dicts in place, so the same list can be
+    written straight back with batch_store.stage_batches(). Expired batches
+    are skipped unless allow_expired=True.
+    """
+
+    def __init__(self, batches: List[Dict], item_name: str = "", today: date = None, allow_expired: bool = False):
+        self.batches = batches
+        self.item_name = item_name
+        today = today or date.today()
+        self._heap = []
+        for position, batch in enumerate(batches):
+            expiry = batch_expiry(batch)
+            if float(batch.get("quantity", 0) or 0) <= 0:
+                continue
+            if expiry is not None and expiry < today and not allow_expired:
+                continue
+            self._heap.append((expiry or _NO_EXPIRY, position))
+        heapq.heapify(self._heap)
+        self._available = sum(float(batches[position].get("quantity", 0) or 0) for _, position in self._heap)
+
+    def available(self) -> float:
+        return self._available
+
+    def allocate(self, quantity: float) -> List[Dict]:
+        """Take `quantity` from the earliest-expiring batches.
+
+        Returns the plan as [{"batch_number", "quantity", "expiry"}, ...].
+        Raises ValueError (leaving the batches untouched) if the sellable
+        stock is short.
+        """
+        if quantity <= 0:
+            return []
+        if self.available() < quantity:
+            raise ValueError(f"❌ Not enough unexpired stock for item '{self.item_name}': "
+                             f"requested {quantity}, available {self.available()}.")
+        plan = []
+        remaining = quantity
+        # The epsilon absorbs float drift so a fully covered request can't run the heap dry
+        while remaining > 1e-9 and self._heap:
+            expiry, position = self._heap[0]
+            batch = self.batches[position]
+            batch_qty = float(batch.get("quantity", 0) or 0)
+            taken = min(batch_qty, remaining)
+            batch["quantity"] = batch_qty - taken
+            remaining -= taken
+            self._available -= taken
+            if batch["quantity"] <= 0:
+                heapq.heappop(self._heap)
+            plan.append({
+                "batch_number": batch.get("batch_number", ""),
+                "quantity": taken,
+                "expiry": None if expiry == _NO_EXPIRY else expiry.isoformat(),
+            })
+        return plan
+
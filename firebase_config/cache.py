@@ -0,0 +1,189 @@
+from firebase_config.config import db
+from firebase_config.mirror import get_mirror
+from collections import OrderedDict
+from typing import Callable, Dict, List
+import copy
+import functools
+import threading
+import time
+
+# ---------------- Entity Cache ----------------
+# Process-wide read-through cache for single-document lookups (get_*_by_id)
+# and name -> ID resolution. Entries are bounded by an LRU and expire after
+# a per-collection TTL. Writes made through the update_*/delete_* helpers in
+# this process invalidate their entry straight away; writes from other
+# processes are picked up when the TTL runs out, or immediately once
+# enable_cache_invalidation() has attached snapshot listeners.
+
+MAX_ENTRIES = 2048
+DEFAULT_TTL = 60  # seconds
+
+# Stock moves on every order, so inventory entries expire fastest
+CACHE_TTLS = {
+    "Clients": 300,
+    "Suppliers": 300,
+    "Inventory Items": 30,
+    "Orders": 120,
+}
+
+_MISSING = object()
+
+
+class EntityCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttls: Dict[str, float] = None):
+        self.max_entries = max_entries
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self._entries = OrderedDict()  # (collection, kind, key) -> (expires_at, value)
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a load that raced a write isn't cached
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _lookup(self, entry_key):
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[entry_key]
+            self._stats["expirations"] += 1
+            return _MISSING
+        self._entries.move_to_end(entry_key)
+        return value
+
+    def get_or_load(self, collection: str, kind: str, key, loader: Callable):
+        """Return the cached value or call loader() and cache its result.
+
+        None results (missing documents, unknown names) are not cached, so a
+        document created a moment later is found on the next call.
+        """
+        entry_key = (collection, kind, key)
+        with self._lock:
+            value = self._lookup(entry_key)
+            self._stats["hits" if value is not _MISSING else "misses"] += 1
+            generation = self._generation
+        if value is not _MISSING:
+            return copy.deepcopy(value)
+
+        value = loader()
+        if value is not None:
+            self.put(collection, kind, key, value, generation)
+        return copy.deepcopy(value)
+
+    def put(self, collection: str, kind: str, key, value, generation: int = None):
+        ttl = self.ttls.get(collection, DEFAULT_TTL)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[(collection, kind, key)] = (time.monotonic() + ttl, copy.deepcopy(value))
+            self._entries.move_to_end((collection, kind, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, collection: str, doc_id: str):
+        """Drop a document's by-ID entry and any name lookups that resolved to it."""
+        with self._lock:
+            stale = [entry_key for entry_key, (_, value) in self._entries.items()
+                     if entry_key[0] == collection
+                     and ((entry_key[1] == "id" and entry_key[2] == doc_id)
+                          or (entry_key[1] == "name" and value == doc_id))]
+            for entry_key in stale:
+                del self._entries[entry_key]
+            self._stats["invalidations"] += len(stale)
+            self._generation += 1
+
+    def clear(self, collection: str = None):
+        with self._lock:
+            self._generation += 1
+            if collection is None:
+                self._entries.clear()
+            else:
+                for entry_key in [k for k in self._entries if k[0] == collection]:
+                    del self._entries[entry_key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+entity_cache = EntityCache()
+
+
+def cached(collection: str, kind: str = "id"):
+    """Read-through caching for a one-argument lookup (doc ID or exact name).
+
+    The undecorated function stays reachable as `fn.uncached`.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(key):
+            return entity_cache.get_or_load(collection, kind, key, lambda: fn(key))
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
+
+
+def invalidate(collection: str, *doc_ids: str):
+    for doc_id in doc_ids:
+        if doc_id:
+            entity_cache.invalidate(collection, doc_id)
+
+
+def get_cache_stats() -> Dict:
+    return entity_cache.stats()
+
+
+def configure_cache(max_entries: int = None, ttls: Dict[str, float] = None):
+    """Resize the LRU or override per-collection TTLs (seconds)."""
+    if max_entries is not None:
+        entity_cache.max_entries = max_entries
+    if ttls:
+        entity_cache.ttls.update(ttls)
+
+
+# ---------------- Cross-process Invalidation ----------------
+# Optional: watch the cached collections and drop entries as soon as any
+# process changes them. Piggybacks on the live mirror's listener when the
+# mirror is running, otherwise opens one on_snapshot watch per collection.
+
+_watches = {}  # collection -> ("mirror", mirror) or ("watch", watch handle)
+_watches_lock = threading.Lock()
+
+
+def enable_cache_invalidation(collections: List[str] = None):
+    """Safe to call repeatedly; re-attaches if the mirror was restarted."""
+    with _watches_lock:
+        for collection in collections or list(CACHE_TTLS):
+            source, handle = _watches.get(collection, (None, None))
+            if source == "watch" or (source == "mirror" and handle is get_mirror(collection)):
+                continue
+            mirror = get_mirror(collection)
+            if mirror is not None:
+                mirror.add_listener(lambda doc_id, data, c=collection: entity_cache.invalidate(c, doc_id))
+                _watches[collection] = ("mirror", mirror)
+                continue
+
+            def on_snapshot(docs, changes, read_time, c=collection):
+                for change in changes:
+                    entity_cache.invalidate(c, change.document.id)
+
+            _watches[collection] = ("watch", db.collection(collection).on_snapshot(on_snapshot))
+
+
+def disable_cache_invalidation():
+    """Stop the snapshot watches (mirror listeners stop with the mirror)."""
+    with _watches_lock:
+        for source, handle in _watches.values():
+            if source == "watch":
+                handle.unsubscribe()
+        _watches.clear()
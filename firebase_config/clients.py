@@ -1,24 +1,15 @@
 from firebase_config.config import db
+from firebase_config.query_utils import get_page, iter_query, project, project_docs
+from firebase_config.id_allocator import get_next_id
+from firebase_config.mirror import get_mirror
+from firebase_config.cache import cached, invalidate
+from firebase_config.name_index import rank_by_name, search_by_name
 from google.cloud import firestore
 from datetime import datetime
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional
 from google.cloud.firestore_v1 import FieldFilter
 # ------------------------ Clients ------------------------
 
-def get_next_id(prefix: str, counter_name: str) -> str:
-    counter_ref = db.collection("doc_counters").document(counter_name)
-    counter_doc = counter_ref.get()
-
-    if not counter_doc.exists:
-        counter_ref.set({"last_id": 1})
-        next_id = 1
-    else:
-        counter_ref.update({"last_id": firestore.Increment(1)})
-        next_id = counter_doc.to_dict()["last_id"] + 1
-
-    return f"{prefix}{next_id:04d}"
-
-
 def add_client(client_data: Dict) -> str:
     client_id = get_next_id("C", "clients")
     client_doc = {
@@ -37,10 +28,14 @@ def add_client(client_data: Dict) -> str:
     return client_id
 
 
-def get_client_by_name(name: str) -> list:
-    docs = db.collection("Clients").where(filter=FieldFilter("name", "==", name)).stream()
+def get_client_by_name(name: str, strict: bool = False, fields: Optional[List[str]] = None) -> list:
+    mirror = get_mirror("Clients")
+    if mirror and not strict:
+        return project_docs(mirror.find("name", name), fields)
+    docs = project(db.collection("Clients").where(filter=FieldFilter("name", "==", name)), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
+@cached("Clients")
 def get_client_by_id(client_id: str):
     doc = db.collection("Clients").document(client_id).get()
     return doc.to_dict() | {"id": doc.id} if doc.exists else None
@@ -48,45 +43,63 @@ def get_client_by_id(client_id: str):
 def update_client(client_id: str, updated_data: dict):
     updated_data["updated_at"] = firestore.SERVER_TIMESTAMP
     db.collection("Clients").document(client_id).update(updated_data)
+    invalidate("Clients", client_id)
 
 def delete_client(client_id: str):
     db.collection("Clients").document(client_id).delete()
+    invalidate("Clients", client_id)
 
-def get_all_clients() -> list:
-    docs = db.collection("Clients").stream()
+def get_all_clients(strict: bool = False, fields: Optional[List[str]] = None) -> list:
+    mirror = get_mirror("Clients")
+    if mirror and not strict:
+        return project_docs(mirror.all(), fields)
+    docs = project(db.collection("Clients"), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
-def search_clients_by_partial_name(partial_name: str) -> list:
+def get_clients_page(page_size: int = 100, page_token: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    """One page of Clients: {"items": [...], "next_page_token": str | None}."""
+    return get_page(db.collection("Clients"), page_size=page_size, page_token=page_token, fields=fields)
+
+def iter_clients(page_size: int = 100, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+    return iter_query(db.collection("Clients"), page_size=page_size, fields=fields)
+
+def search_clients_by_partial_name(partial_name: str, strict: bool = False, limit: int = None) -> list:
+    """Ranked, typo-tolerant name search (served from the name index when live)."""
+    if not strict:
+        results = search_by_name("Clients", partial_name, limit)
+        if results is not None:
+            return results
     docs = db.collection("Clients").stream()
-    return [
-        doc.to_dict() | {"id": doc.id}
-        for doc in docs
-        if partial_name.lower() in doc.to_dict().get("name", "").lower()
-    ]
-
-def get_client_order_history(client_id: str) -> list:
-    orders = (
+    return rank_by_name([doc.to_dict() | {"id": doc.id} for doc in docs], partial_name, limit)
+
+def get_client_order_history(client_id: str, fields: Optional[List[str]] = None) -> list:
+    query = (
         db.collection("Orders")
         .where(filter=FieldFilter("client_id", "==", client_id))
         .where(filter=FieldFilter("type", "==", "sell"))
-        .stream()
     )
+    orders = project(query, fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in orders]
 
 
-def update_client_due(client_id: str, change_amount: float):
-    doc_ref = db.collection("Clients").document(client_id)
-    doc_ref.update({
-        "total_due": firestore.Increment(change_amount),
+def client_due_change(change_amount: float) -> Dict:
+    """Fields that move a client's due by change_amount (for batches and transactions)."""
+    return {
+        "due_amount": firestore.Increment(change_amount),
         "updated_at": firestore.SERVER_TIMESTAMP
-    })
+    }
+
+def update_client_due(client_id: str, change_amount: float):
+    db.collection("Clients").document(client_id).update(client_due_change(change_amount))
+    invalidate("Clients", client_id)
 
-def get_client_payments(client_id: str) -> list:
-    docs = db.collection("Payments").where(filter=FieldFilter("client_id", "==", client_id)).stream()
+def get_client_payments(client_id: str, fields: Optional[List[str]] = None) -> list:
+    docs = project(db.collection("Payments").where(filter=FieldFilter("client_id", "==", client_id)), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
 # ------------------------ Utilities ------------------------
 
+@cached("Clients", "name")
 def resolve_client_id_by_name(name: str) :
     docs = db.collection("Clients").where(filter=FieldFilter("name", "==", name)).limit(1).stream()
     for doc in docs:
@@ -1,18 +1,24 @@
 from firebase_config.config import db
 from google.cloud import firestore
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from google.cloud.firestore_v1 import FieldFilter
 from firebase_config.finance import *
+from firebase_config.query_utils import count_query, project, sum_query
+from firebase_config.rollups import get_daily_rollups
+from firebase_config.low_stock import get_low_stock_count, low_stock_query
+from firebase_config import analytics
 
-def get_total_revenue(start_date=None, end_date=None) -> float:
+def _sales_orders_query(start_date=None, end_date=None):
     query = db.collection("Orders").where(filter=FieldFilter("order_type", "in", ["sales", "delivery_challan"]))
     if start_date:
         query = query.where(filter=FieldFilter("order_date", ">=", start_date))
     if end_date:
         query = query.where(filter=FieldFilter("order_date", "<=", end_date))
-    docs = query.stream()
-    return sum(doc.to_dict().get("total_amount", 0) for doc in docs)
+    return query
+
+def get_total_revenue(start_date=None, end_date=None) -> float:
+    return sum_query(_sales_orders_query(start_date, end_date), "total_amount")
 
 def get_net_profit(start_date=None, end_date=None) -> float:
     revenue = get_total_revenue(start_date, end_date)
@@ -25,53 +31,36 @@ def get_total_orders(start_date=None, end_date=None) -> int:
         query = query.where(filter=FieldFilter("order_date", ">=", start_date))
     if end_date:
         query = query.where(filter=FieldFilter("order_date", "<=", end_date))
-    return len(list(query.stream()))
+    return count_query(query)
 
 
 from collections import defaultdict
 
 def get_order_trend(start_date, end_date, group_by="day") -> List[Dict]:
-    import datetime
-    from dateutil import parser
-
-    query = db.collection("Orders").where(filter=FieldFilter("order_date", ">=", start_date)).where(filter=FieldFilter("order_date", "<=", end_date))
-    docs = query.stream()
-
+    # Served from the daily rollups: one small document per day in range
     data = defaultdict(int)
-    for doc in docs:
-        order = doc.to_dict()
-        ts = order.get("order_date")
-        if isinstance(ts, datetime.datetime):
-            key = ts.strftime("%Y-%m-%d") if group_by == "day" else ts.strftime("%Y-%m")
-            data[key] += 1
+    for rollup in get_daily_rollups(start_date, end_date):
+        key = rollup["date"] if group_by == "day" else rollup["date"][:7]
+        data[key] += rollup.get("orders", 0)
 
     return [{"date": k, "orders": v} for k, v in sorted(data.items())]
 
 
 def get_top_selling_items(start_date=None, end_date=None, limit=5) -> List[Dict]:
-    query = db.collection("Orders").where(filter=FieldFilter("order_type", "in", ["sales", "delivery_challan"]))
-    if start_date:
-        query = query.where(filter=FieldFilter("order_date", ">=", start_date))
-    if end_date:
-        query = query.where(filter=FieldFilter("order_date", "<=", end_date))
-
     sales = defaultdict(lambda: {"quantity": 0, "total_amount": 0, "item_name": ""})
-    for doc in query.stream():
-        items = doc.to_dict().get("items", [])
-        for item in items:
-            name = item.get("item_name", "")
-            qty = float(item.get("quantity", 0))
-            amt = float(item.get("price", 0)) * qty
+    for rollup in get_daily_rollups(start_date, end_date):
+        revenue = rollup.get("item_revenue", {})
+        for name, qty in rollup.get("item_quantity", {}).items():
             sales[name]["item_name"] = name
             sales[name]["quantity"] += qty
-            sales[name]["total_amount"] += amt
+            sales[name]["total_amount"] += revenue.get(name, 0)
 
     sorted_items = sorted(sales.values(), key=lambda x: x["quantity"], reverse=True)
     return sorted_items[:limit]
 
 
 def get_inventory_distribution_by_category() -> List[Dict]:
-    docs = db.collection("Inventory Items").stream()
+    docs = db.collection("Inventory Items").select(["category", "stock_quantity"]).stream()
     category_counts = defaultdict(float)
     for doc in docs:
         item = doc.to_dict()
@@ -81,14 +70,22 @@ def get_inventory_distribution_by_category() -> List[Dict]:
 
     return [{"category": cat, "quantity": qty} for cat, qty in category_counts.items()]
 
-def get_low_stock_items_dashboard(threshold=10) -> List[Dict]:
-    docs = db.collection("Inventory Items").where(filter=FieldFilter("stock_quantity", "<=", threshold)).stream()
+LOW_STOCK_FIELDS = ["name", "stock_quantity", "category", "low_stock"]
+
+def get_low_stock_items_dashboard(threshold=None, fields: Optional[List[str]] = LOW_STOCK_FIELDS) -> List[Dict]:
+    # Per-item thresholds via the maintained is_low_stock flag unless a global one is given
+    if threshold is None:
+        query = low_stock_query()
+    else:
+        query = db.collection("Inventory Items").where(filter=FieldFilter("stock_quantity", "<=", threshold))
+    docs = project(query, fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]  ##Already present in inventory.py
 
 def get_overdue_payments(days_overdue=0) -> List[Dict]:
     from datetime import datetime, timedelta
     today = datetime.utcnow()
-    docs = db.collection("clients").where(filter=FieldFilter("total_due", ">", 0)).stream()
+    docs = db.collection("clients").where(filter=FieldFilter("total_due", ">", 0))\
+        .select(["client_name", "name", "total_due", "last_payment_date"]).stream()
 
     overdue = []
     for doc in docs:
@@ -116,3 +113,146 @@ def get_date_range(period="monthly"):
     else:
         start = end = today
     return start, end
+
+
+# ---------------- Dashboard Snapshot ----------------
+# One entry point for the whole Dashboard tab. Independent metrics run
+# concurrently on a small thread pool, net profit reuses the revenue and
+# expense totals instead of re-querying them, the category chart comes from
+# the cached Arrow inventory table (firebase_config.analytics), and the
+# result is cached for DASHBOARD_SNAPSHOT_TTL seconds per period.
+# Concurrent callers for the same period wait on the in-flight computation
+# (single-flight), so every viewer shares one set of Firestore reads.
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+SNAPSHOT_TTL = float(os.getenv("DASHBOARD_SNAPSHOT_TTL", "60"))  # seconds
+SNAPSHOT_LOW_STOCK_THRESHOLD = None  # None: each item's own low_stock level
+SNAPSHOT_OVERDUE_DAYS = 7
+SNAPSHOT_TREND_DAYS = 30  # trend window when period="all"
+
+_snapshot_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dashboard")
+_snapshot_lock = threading.Lock()
+_snapshots = {}   # period -> DashboardSnapshot
+_inflight = {}    # period -> Future
+
+
+@dataclass
+class DashboardSnapshot:
+    period: str
+    start_date: Optional[datetime]
+    end_date: Optional[datetime]
+    total_inventory: int = 0
+    low_stock_items: List[Dict] = field(default_factory=list)
+    low_stock_count: int = 0
+    total_orders: int = 0
+    total_revenue: float = 0.0
+    total_expenses: float = 0.0
+    net_profit: float = 0.0
+    total_dues: float = 0.0
+    order_trend: List[Dict] = field(default_factory=list)
+    top_selling_items: List[Dict] = field(default_factory=list)
+    category_distribution: List[Dict] = field(default_factory=list)
+    overdue_payments: List[Dict] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)  # metric -> seconds
+    errors: Dict[str, str] = field(default_factory=dict)     # metric -> error message
+    computed_at: float = 0.0
+    elapsed: float = 0.0
+
+    def age(self) -> float:
+        return time.time() - self.computed_at
+
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        return fn(*args, **kwargs), None, time.perf_counter() - started
+    except Exception as e:
+        return None, e, time.perf_counter() - started
+
+
+def _snapshot_range(period: str):
+    if period == "all":
+        return None, None
+    return get_date_range(period)
+
+
+def _compute_snapshot(period: str) -> DashboardSnapshot:
+    started = time.perf_counter()
+    start, end = _snapshot_range(period)
+    if start is None:
+        trend_end = datetime.utcnow()
+        trend_start = trend_end - timedelta(days=SNAPSHOT_TREND_DAYS)
+    else:
+        trend_start, trend_end = start, end
+
+    jobs = {
+        "total_inventory": (count_query, db.collection("Inventory Items")),
+        "low_stock_items": (get_low_stock_items_dashboard, SNAPSHOT_LOW_STOCK_THRESHOLD),
+        "low_stock_count": (get_low_stock_count,),
+        "total_orders": (get_total_orders, start, end),
+        "total_revenue": (get_total_revenue, start, end),
+        "total_expenses": (get_total_expenses, None, start, end),
+        "dues": (get_all_dues, ["total_due"]),
+        "order_trend": (get_order_trend, trend_start, trend_end),
+        "top_selling_items": (get_top_selling_items, start, end),
+        "category_distribution": (analytics.get_inventory_distribution_by_category,),
+        "overdue_payments": (get_overdue_payments, SNAPSHOT_OVERDUE_DAYS),
+    }
+    futures = {name: _snapshot_executor.submit(_timed, *job) for name, job in jobs.items()}
+
+    snapshot = DashboardSnapshot(period=period, start_date=start, end_date=end)
+    for name, future in futures.items():
+        value, error, elapsed = future.result()
+        snapshot.timings[name] = elapsed
+        if error is not None:
+            snapshot.errors[name] = str(error)
+        elif name == "dues":
+            snapshot.total_dues = sum(d.get("total_due", 0) or 0 for d in value)
+        else:
+            setattr(snapshot, name, value if value is not None else getattr(snapshot, name))
+
+    # Derived from the totals above rather than re-running both scans
+    snapshot.net_profit = snapshot.total_revenue - snapshot.total_expenses
+    snapshot.computed_at = time.time()
+    snapshot.elapsed = time.perf_counter() - started
+    return snapshot
+
+
+def get_snapshot(period: str = "all", ttl: float = None, refresh: bool = False) -> DashboardSnapshot:
+    """Every Dashboard metric for a period ("all", "daily", "weekly" or "monthly")."""
+    ttl = SNAPSHOT_TTL if ttl is None else ttl
+    with _snapshot_lock:
+        cached = _snapshots.get(period)
+        if cached and not refresh and cached.age() < ttl:
+            return cached
+        future = _inflight.get(period)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[period] = future
+
+    if not leader:
+        return future.result()
+
+    try:
+        snapshot = _compute_snapshot(period)
+        with _snapshot_lock:
+            _snapshots[period] = snapshot
+        future.set_result(snapshot)
+        return snapshot
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _snapshot_lock:
+            _inflight.pop(period, None)
+
+
+def invalidate_snapshots():
+    with _snapshot_lock:
+        _snapshots.clear()
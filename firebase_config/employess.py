@@ -1,20 +1,10 @@
 from firebase_config.config import db
+from firebase_config.query_utils import get_page, iter_query, project, project_docs
+from firebase_config.id_allocator import get_next_id
+from firebase_config.mirror import get_mirror
 from google.cloud import firestore
 from typing import Dict, List
 
-def get_next_id(prefix: str, counter_name: str) -> str:
-    counter_ref = db.collection("doc_counters").document(counter_name)
-    counter_doc = counter_ref.get()
-
-    if not counter_doc.exists:
-        counter_ref.set({"last_id": 1})
-        next_id = 1
-    else:
-        counter_ref.update({"last_id": firestore.Increment(1)})
-        next_id = counter_doc.to_dict()["last_id"] + 1
-
-    return f"{prefix}{next_id:04d}"
-
 def add_employee(employee_data: Dict) -> str:
     employee_id = get_next_id("E", "employees")
     employee_doc = {
@@ -29,15 +19,29 @@ def add_employee(employee_data: Dict) -> str:
     db.collection("Employees").document(employee_id).set(employee_doc)
     return employee_id
 
-def get_employee_by_name(name):
-    docs = db.collection("Employees").where("name", "==", name).stream()
-    return [doc.to_dict() for doc in docs]
+def get_employee_by_name(name, strict=False, fields=None):
+    mirror = get_mirror("Employees")
+    if mirror and not strict:
+        return project_docs(mirror.find("name", name), fields)
+    docs = project(db.collection("Employees").where("name", "==", name), fields).stream()
+    return [doc.to_dict() | {"id": doc.id} for doc in docs]
+
+def get_all_employees(strict=False, fields=None):
+    mirror = get_mirror("Employees")
+    if mirror and not strict:
+        return project_docs(mirror.all(), fields)
+    docs = project(db.collection("Employees"), fields).stream()
+    return [doc.to_dict() | {"id": doc.id} for doc in docs]
+
+def get_employees_page(page_size=100, page_token=None, fields=None):
+    """One page of Employees: {"items": [...], "next_page_token": str | None}."""
+    return get_page(db.collection("Employees"), page_size=page_size, page_token=page_token, fields=fields)
 
-def get_all_employees():
-    docs = db.collection("Employees").stream()
-    return [doc.to_dict() for doc in docs]
+def iter_employees(page_size=100, fields=None):
+    return iter_query(db.collection("Employees"), page_size=page_size, fields=fields)
 
 def update_employee(employee_id, updated_data):
+    updated_data["updated_at"] = firestore.SERVER_TIMESTAMP
     db.collection("Employees").document(employee_id).update(updated_data)
 
 def delete_employee(employee_id):
@@ -0,0 +1,173 @@
+from firebase_config.config import db
+from firebase_config.batches import batch_expiry
+from firebase_config.batch_store import delete_collection, load_batches
+from firebase_config.query_utils import project
+from google.cloud import firestore
+from google.cloud.firestore_v1 import FieldFilter
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+# ---------------- Batch Expiry Index ----------------
+# One document per (item, batch) that still has stock, in "Batch Expiry",
+# with the expiry parsed into a real timestamp. It is written in the same
+# commit as the stock change (add_order, add_inventory_item and the stock
+# engine) and a batch drops out of the index once it reaches zero, so
+# expiry questions are a single range query on `expiry`: O(log n + k) for
+# k matching batches, instead of scanning every item's batches array.
+#
+# Rebuild from Inventory Items with `python -m firebase_config.expiry_index`.
+
+EXPIRY_COLLECTION = "Batch Expiry"
+
+# Item fields copied onto the entries; editing one rewrites the item's entries
+INDEXED_ITEM_FIELDS = {"name", "category", "unit_price"}
+
+
+def batch_key(item_id: str, batch_number: str) -> str:
+    # Batch numbers may contain "/" which Firestore IDs can't
+    return f"{item_id}__{str(batch_number or '-').replace('/', '_')}"
+
+
+def batch_quantities(batches: List[Dict]) -> Dict[str, float]:
+    return {batch.get("batch_number", ""): float(batch.get("quantity", 0) or 0) for batch in batches}
+
+
+def item_fields(item: Dict) -> Dict:
+    """The item-level fields copied onto every entry of that item."""
+    return {
+        "item_name": item.get("name", ""),
+        "category": item.get("category") or "uncategorized",
+        "unit_price": float(item.get("unit_price", 0) or 0),
+    }
+
+
+def expiry_entry(item_id: str, item: Dict, batch: Dict) -> Dict:
+    expiry = batch_expiry(batch)
+    return {"item_id": item_id} | item_fields(item) | {
+        "batch_number": batch.get("batch_number", ""),
+        "expiry": datetime(expiry.year, expiry.month, expiry.day, tzinfo=timezone.utc) if expiry else None,
+        "quantity": float(batch.get("quantity", 0) or 0),
+        "updated_at": firestore.SERVER_TIMESTAMP,
+    }
+
+
+def record_batches(writer, item_id: str, item: Dict, batches: List[Dict], before: Optional[Dict[str, float]] = None):
+    """Queue index writes for an item's batches on a transaction or WriteBatch.
+
+    Pass `before` (batch_quantities() of the list as read) to write only the
+    batches whose quantity changed; leave it out for a newly created item.
+    """
+    for batch in batches:
+        batch_number = batch.get("batch_number", "")
+        quantity = float(batch.get("quantity", 0) or 0)
+        if before is not None and before.get(batch_number) == quantity:
+            continue
+        ref = db.collection(EXPIRY_COLLECTION).document(batch_key(item_id, batch_number))
+        if quantity > 0:
+            writer.set(ref, expiry_entry(item_id, item, batch))
+        elif before is not None and before.get(batch_number, 0) > 0:
+            writer.delete(ref)
+
+
+def refresh_item(item_id: str, item: Dict) -> int:
+    """Rewrite name/category/unit_price on an item's entries after an edit; returns entries updated."""
+    fields = item_fields(item) | {"updated_at": firestore.SERVER_TIMESTAMP}
+    batch, pending, updated = db.batch(), 0, 0
+    for doc in db.collection(EXPIRY_COLLECTION).where(filter=FieldFilter("item_id", "==", item_id)).select([]).stream():
+        batch.update(doc.reference, fields)
+        pending += 1
+        if pending == 400:
+            batch.commit()
+            updated += pending
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+        updated += pending
+    return updated
+
+
+def drop_item(item_id: str):
+    """Remove every index entry of a deleted item."""
+    delete_collection(db.collection(EXPIRY_COLLECTION).where(filter=FieldFilter("item_id", "==", item_id)))
+
+
+# ---------------- Queries ----------------
+
+def _today() -> datetime:
+    now = datetime.now(timezone.utc)
+    return datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+
+
+def get_expiring_batches(days: int = 30, fields: Optional[List[str]] = None) -> List[Dict]:
+    """Batches with stock expiring between today and `days` from now, soonest first."""
+    today = _today()
+    query = db.collection(EXPIRY_COLLECTION)\
+        .where(filter=FieldFilter("expiry", ">=", today))\
+        .where(filter=FieldFilter("expiry", "<=", today + timedelta(days=days)))\
+        .order_by("expiry")
+    return [doc.to_dict() | {"id": doc.id} for doc in project(query, fields).stream()]
+
+
+def get_expired_batches(fields: Optional[List[str]] = None) -> List[Dict]:
+    """Batches already past expiry that still hold stock."""
+    query = db.collection(EXPIRY_COLLECTION)\
+        .where(filter=FieldFilter("expiry", "<", _today()))\
+        .order_by("expiry")
+    return [doc.to_dict() | {"id": doc.id} for doc in project(query, fields).stream()]
+
+
+def get_value_at_risk_by_category(days: int = 30, include_expired: bool = True) -> List[Dict]:
+    """Stock value (quantity x unit_price) expiring within `days`, per category."""
+    fields = ["category", "quantity", "unit_price"]
+    batches = get_expiring_batches(days, fields)
+    if include_expired:
+        batches += get_expired_batches(fields)
+    totals = defaultdict(lambda: {"value": 0.0, "quantity": 0.0, "batches": 0})
+    for batch in batches:
+        total = totals[batch.get("category") or "uncategorized"]
+        total["quantity"] += batch.get("quantity", 0)
+        total["value"] += batch.get("quantity", 0) * batch.get("unit_price", 0)
+        total["batches"] += 1
+    return sorted(({"category": category} | total for category, total in totals.items()),
+                  key=lambda row: row["value"], reverse=True)
+
+
+# ---------------- Rebuild ----------------
+
+def rebuild_expiry_index() -> int:
+    """Recreate the index from every item's batches; returns entries written."""
+    batch = db.batch()
+    pending = 0
+    live = set()
+
+    def flush_if_full():
+        nonlocal batch, pending
+        pending += 1
+        if pending == 400:
+            batch.commit()
+            batch, pending = db.batch(), 0
+
+    fields = ["name", "category", "unit_price", "batches", "batch_schema"]
+    for doc in db.collection("Inventory Items").select(fields).stream():
+        item = doc.to_dict()
+        for entry in load_batches(doc.id, item):
+            if float(entry.get("quantity", 0) or 0) <= 0:
+                continue
+            key = batch_key(doc.id, entry.get("batch_number", ""))
+            live.add(key)
+            batch.set(db.collection(EXPIRY_COLLECTION).document(key), expiry_entry(doc.id, item, entry))
+            flush_if_full()
+
+    for doc in db.collection(EXPIRY_COLLECTION).select([]).stream():
+        if doc.id not in live:
+            batch.delete(doc.reference)
+            flush_if_full()
+
+    if pending:
+        batch.commit()
+    return len(live)
+
+
+if __name__ == "__main__":
+    print(f"✅ Rebuilt {rebuild_expiry_index()} batch expiry entries")
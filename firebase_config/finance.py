@@ -1,16 +1,48 @@
 from firebase_config.config import db
+from firebase_config.cache import invalidate
+from firebase_config.clients import client_due_change
+from firebase_config.idempotency import get_result, record_completion, request_hash, run_once, split_key
+from firebase_config.mirror import get_mirror
+from firebase_config.query_utils import project, project_docs, sum_query
+from firebase_config.rollups import record_expense, record_payment
+from firebase_config.stock import run_stock_transaction
 from google.cloud import firestore
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from google.cloud.firestore_v1 import FieldFilter
 # ------------------------ Payments ------------------------
 
-def add_payment(payment_data: dict) -> str:
+def add_payment(payment_data: dict, idempotency_key: Optional[str] = None, reduce_due: bool = False) -> str:
+    """Record a client payment; a repeated idempotency_key returns the first payment's ID.
+
+    With reduce_due=True the client's due drops by the amount in the same
+    commit, so a retried call can't take it off twice.
+    """
+    key, payment_data = split_key(payment_data, idempotency_key)
+    digest = request_hash((payment_data | {"reduce_due": True}) if reduce_due else payment_data)
+    client_id = payment_data.get("client_id")
+    if reduce_due and not client_id:
+        raise ValueError("client_id is required to reduce the client's due")
     payment_data["date"] = payment_data.get("date", firestore.SERVER_TIMESTAMP)
-    doc_ref = db.collection("Payments").add(payment_data)
-    return doc_ref[1].id
-
-def get_payments(client_id=None, start_date=None, end_date=None) -> list:
+    # `date` is caller-supplied and may be backdated; the replica syncs on these
+    payment_data["created_at"] = firestore.SERVER_TIMESTAMP
+    payment_data["updated_at"] = firestore.SERVER_TIMESTAMP
+
+    def write(batch):
+        doc_ref = db.collection("Payments").document()
+        batch.set(doc_ref, payment_data)
+        record_payment(batch, payment_data, payment_data["date"])
+        if reduce_due:
+            batch.update(db.collection("Clients").document(client_id),
+                         client_due_change(-float(payment_data.get("amount", 0))))
+        return doc_ref.id
+
+    payment_id = run_once("payment", key, digest, write)
+    if reduce_due:
+        invalidate("Clients", client_id)
+    return payment_id
+
+def _payments_query(client_id=None, start_date=None, end_date=None):
     query = db.collection("Payments")
     if client_id:
         query = query.where(filter=FieldFilter("client_id", "==", client_id))
@@ -18,20 +50,24 @@ def get_payments(client_id=None, start_date=None, end_date=None) -> list:
         query = query.where(filter=FieldFilter("date", ">=", start_date))
     if end_date:
         query = query.where(filter=FieldFilter("date", "<=", end_date))
-    docs = query.stream()
+    return query
+
+def get_payments(client_id=None, start_date=None, end_date=None, fields: Optional[List[str]] = None) -> list:
+    docs = project(_payments_query(client_id, start_date, end_date), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
 def get_total_payments(client_id=None, start_date=None, end_date=None) -> float:
-    payments = get_payments(client_id, start_date, end_date)
-    return sum(p.get("amount", 0) for p in payments)
+    return sum_query(_payments_query(client_id, start_date, end_date), "amount")
 
-def get_all_dues() -> list:
-    docs = db.collection("clients").where(filter=FieldFilter("total_due", ">", 0)).stream()
+def get_all_dues(fields: Optional[List[str]] = None) -> list:
+    docs = project(db.collection("clients").where(filter=FieldFilter("total_due", ">", 0)), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
 # ------------------------ Expenses ------------------------
 
-def add_expense(expense_data: Dict) -> str:
+def add_expense(expense_data: Dict, idempotency_key: Optional[str] = None) -> str:
+    """Record an expense; a repeated idempotency_key returns the first expense's ID."""
+    key, expense_data = split_key(expense_data, idempotency_key)
     expense_doc = {
         "amount": float(expense_data.get("amount", 0)),
         "category": expense_data.get("category", ""),
@@ -40,10 +76,23 @@ def add_expense(expense_data: Dict) -> str:
         "created_at": firestore.SERVER_TIMESTAMP,
         "updated_at": firestore.SERVER_TIMESTAMP
     }
-    doc_ref = db.collection("Expenses").add(expense_doc)
-    return doc_ref[1].id
 
-def get_expenses(category=None, start_date=None, end_date=None) -> list:
+    def write(batch):
+        doc_ref = db.collection("Expenses").document()
+        batch.set(doc_ref, expense_doc)
+        record_expense(batch, expense_doc)
+        return doc_ref.id
+
+    return run_once("expense", key, request_hash(expense_data), write)
+
+def get_expenses(category=None, start_date=None, end_date=None, strict=False, fields: Optional[List[str]] = None) -> list:
+    mirror = get_mirror("Expenses")
+    if mirror and not strict and not start_date and not end_date:
+        return project_docs(mirror.find("category", category) if category else mirror.all(), fields)
+    docs = project(_expenses_query(category, start_date, end_date), fields).stream()
+    return [doc.to_dict() | {"id": doc.id} for doc in docs]
+
+def _expenses_query(category=None, start_date=None, end_date=None):
     query = db.collection("Expenses")
     if category:
         query = query.where(filter=FieldFilter("category", "==", category))
@@ -51,23 +100,23 @@ def get_expenses(category=None, start_date=None, end_date=None) -> list:
         query = query.where(filter=FieldFilter("date", ">=", start_date))
     if end_date:
         query = query.where(filter=FieldFilter("date", "<=", end_date))
-    docs = query.stream()
-    return [doc.to_dict() | {"id": doc.id} for doc in docs]
+    return query
 
 def update_expense(expense_id: str, updated_data: dict):
     updated_data["updated_at"] = firestore.SERVER_TIMESTAMP
     db.collection("Expenses").document(expense_id).update(updated_data)
+    invalidate("Expenses", expense_id)
 
 def delete_expense(expense_id: str):
     db.collection("Expenses").document(expense_id).delete()
+    invalidate("Expenses", expense_id)
 
 def get_total_expenses(category=None, start_date=None, end_date=None) -> float:
-    expenses = get_expenses(category, start_date, end_date)
-    return sum(e.get("amount", 0) for e in expenses)
+    return sum_query(_expenses_query(category, start_date, end_date), "amount")
 
 # ------------------------ Supplier Payments ------------------------
 from typing import List
-def get_supplier_payments(supplier_id=None, start_date=None, end_date=None) -> List[dict]:
+def get_supplier_payments(supplier_id=None, start_date=None, end_date=None, fields: Optional[List[str]] = None) -> List[dict]:
     query = db.collection("supplier_payments")
     
     if supplier_id:
@@ -77,37 +126,49 @@ def get_supplier_payments(supplier_id=None, start_date=None, end_date=None) -> L
     if end_date:
         query = query.where(filter=FieldFilter("date", "<=", end_date))
     
-    docs = query.stream()
+    docs = project(query, fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
 
 
 
-def add_supplier_payment(payment_data: dict) -> str:
+def add_supplier_payment(payment_data: dict, idempotency_key: Optional[str] = None) -> str:
+    """Record a payment to a supplier and reduce its due in one transaction.
+
+    A repeated idempotency_key returns the first payment's ID.
+    """
+    key, payment_data = split_key(payment_data, idempotency_key)
     supplier_id = payment_data.get("supplier_id")
     amount = payment_data.get("amount", 0)
     if not supplier_id or amount <= 0:
         raise ValueError("supplier_id and positive amount are required")
-    
+    digest = request_hash(payment_data)
+
     payment_data["date"] = payment_data.get("date", firestore.SERVER_TIMESTAMP)
-    
-    # Add to `supplier_payments` collection
-    payment_ref = db.collection("supplier_payments").add(payment_data)
-    
-    # Update supplier's due_amount
-    supplier_ref = db.collection("suppliers").document(supplier_id)
-    
+    supplier_ref = db.collection("Suppliers").document(supplier_id)
+
     def update_due(transaction):
-        snapshot = transaction.get(supplier_ref)
-        current_due = snapshot.get("due_amount") or 0
+        if key:
+            result = get_result("supplier_payment", key, digest, transaction)
+            if result is not None:
+                return result
+        snapshot = supplier_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise ValueError(f"❌ Supplier '{supplier_id}' not found.")
+        # add_supplier and add_order keep the supplier balance in `due`
+        current_due = (snapshot.to_dict() or {}).get("due") or 0
         new_due = max(0, current_due - amount)
+        payment_ref = db.collection("supplier_payments").document()
+        transaction.set(payment_ref, payment_data)
         transaction.update(supplier_ref, {
-            "due_amount": new_due,
+            "due": new_due,
             "updated_at": firestore.SERVER_TIMESTAMP,
             "updated_by": payment_data.get("added_by")
         })
-    
-    db.run_transaction(update_due)
-    
-    return payment_ref[1].id
+        if key:
+            record_completion(transaction, "supplier_payment", key, digest, payment_ref.id)
+        return payment_ref.id
 
+    payment_id = run_stock_transaction(update_due)
+    invalidate("Suppliers", supplier_id)
+    return payment_id
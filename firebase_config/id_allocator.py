@@ -0,0 +1,71 @@
+from firebase_config.config import db
+from google.cloud import firestore
+from typing import List
+import threading
+
+# ---------------- Block-leased ID Allocator ----------------
+# Each process leases a range of IDs from `doc_counters/<name>` in one
+# transaction and hands them out from memory, so creating 100 entities
+# costs one counter write instead of 200 round trips. `last_id` keeps its
+# meaning (highest number handed out or leased), so existing counters carry
+# on where they are. IDs leased by a process that exits are skipped, which
+# leaves gaps in the sequence but never duplicates.
+
+BLOCK_SIZE = 100
+
+
+class IdAllocator:
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        self.block_size = block_size
+        self.leases = 0
+        self._lock = threading.Lock()
+        self._blocks = {}  # counter_name -> [next_number, end_exclusive]
+
+    def _lease(self, counter_name: str, size: int) -> List[int]:
+        ref = db.collection("doc_counters").document(counter_name)
+
+        @firestore.transactional
+        def txn(transaction):
+            snapshot = ref.get(transaction=transaction)
+            last_id = snapshot.to_dict().get("last_id", 0) if snapshot.exists else 0
+            transaction.set(ref, {"last_id": last_id + size}, merge=True)
+            return last_id + 1
+
+        first = txn(db.transaction())
+        self.leases += 1
+        return [first, first + size]
+
+    def next_number(self, counter_name: str) -> int:
+        return self.allocate(counter_name, 1)[0]
+
+    def allocate(self, counter_name: str, count: int) -> List[int]:
+        """Reserve `count` consecutive-as-possible numbers for a counter."""
+        numbers = []
+        with self._lock:
+            block = self._blocks.get(counter_name)
+            if block:
+                take = min(count, block[1] - block[0])
+                numbers.extend(range(block[0], block[0] + take))
+                block[0] += take
+
+            needed = count - len(numbers)
+            if needed:
+                # One lease covers the whole request plus a fresh block
+                size = needed + self.block_size
+                block = self._lease(counter_name, size)
+                numbers.extend(range(block[0], block[0] + needed))
+                block[0] += needed
+                self._blocks[counter_name] = block
+        return numbers
+
+
+allocator = IdAllocator()
+
+
+def get_next_id(prefix: str, counter_name: str) -> str:
+    return f"{prefix}{allocator.next_number(counter_name):04d}"
+
+
+def get_next_ids(prefix: str, counter_name: str, count: int) -> List[str]:
+    """Reserve IDs for a bulk import with at most one counter transaction."""
+    return [f"{prefix}{number:04d}" for number in allocator.allocate(counter_name, count)]
@@ -0,0 +1,92 @@
+from firebase_config.config import db
+from google.api_core import exceptions
+from google.cloud import firestore
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+import hashlib
+import json
+
+# ---------------- Idempotency Keys ----------------
+# Write functions that take an idempotency key record
+# "Idempotency Keys/<scope>:<key>" (the result plus a hash of the request)
+# in the same commit as the write itself. A retry with the same key then
+# returns the original result instead of writing again, so callers can
+# retry on timeouts without deducting stock or bumping dues twice. Reusing
+# a key for a different request raises ValueError.
+#
+# Records carry `expires_at`; add a Firestore TTL policy on that field to
+# have old keys cleaned up.
+
+IDEMPOTENCY_COLLECTION = "Idempotency Keys"
+KEY_TTL = timedelta(days=7)
+KEY_FIELD = "idempotency_key"
+
+
+def key_ref(scope: str, key: str):
+    return db.collection(IDEMPOTENCY_COLLECTION).document(f"{scope}:{key}".replace("/", "_"))
+
+
+def split_key(data: Dict, key: Optional[str] = None) -> Tuple[Optional[str], Dict]:
+    """Take the key from the argument or from data["idempotency_key"] (as tools send it).
+
+    Returns (key, data without the key field).
+    """
+    key = key or data.get(KEY_FIELD)
+    return (str(key) if key else None), {name: value for name, value in data.items() if name != KEY_FIELD}
+
+
+def request_hash(data: Dict) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def stored_result(snapshot, scope: str, key: str, digest: str):
+    """The recorded result for a key, or None if it hasn't completed yet."""
+    if not snapshot.exists:
+        return None
+    record = snapshot.to_dict()
+    if record.get("request_hash") != digest:
+        raise ValueError(f"❌ Idempotency key '{key}' was already used for a different {scope} request.")
+    return record.get("result")
+
+
+def get_result(scope: str, key: str, digest: str, transaction=None):
+    return stored_result(key_ref(scope, key).get(transaction=transaction), scope, key, digest)
+
+
+def record_completion(writer, scope: str, key: str, digest: str, result):
+    """Queue the key record on a transaction or WriteBatch.
+
+    Uses create(), so a batch racing another call with the same key fails
+    to commit instead of writing twice.
+    """
+    writer.create(key_ref(scope, key), {
+        "scope": scope,
+        "request_hash": digest,
+        "result": result,
+        "created_at": firestore.SERVER_TIMESTAMP,
+        "expires_at": datetime.now(timezone.utc) + KEY_TTL,
+    })
+
+
+def run_once(scope: str, key: Optional[str], digest: str, write: Callable):
+    """Run write(batch) and commit it once per key; returns write's result.
+
+    `write` queues its writes on the WriteBatch it is given and returns the
+    result to hand back (and to replay). Without a key it just commits.
+    """
+    if key:
+        result = get_result(scope, key, digest)
+        if result is not None:
+            return result
+    batch = db.batch()
+    result = write(batch)
+    if key:
+        record_completion(batch, scope, key, digest, result)
+    try:
+        batch.commit()
+    except exceptions.AlreadyExists:
+        if not key:
+            raise
+        # A concurrent call with the same key committed first
+        return get_result(scope, key, digest)
+    return result
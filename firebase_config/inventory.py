@@ -1,24 +1,35 @@
 from firebase_config.config import db
+from firebase_config.query_utils import get_page, project, project_docs
+from firebase_config.id_allocator import get_next_id
+from firebase_config.mirror import get_mirror
+from firebase_config.cache import cached, invalidate
+from firebase_config.batch_store import BATCH_SCHEMA, attach_batches, drop_batches, load_batches, stage_batches, with_batches
+from firebase_config.expiry_index import INDEXED_ITEM_FIELDS, batch_quantities, drop_item, get_expiring_batches, record_batches, refresh_item
+from firebase_config.low_stock import is_low, low_stock_query, low_stock_update, record_low_stock_delta
+from firebase_config.ledger import drop_history, record_movement
+from firebase_config.name_index import rank_by_name, search_by_name
+from firebase_config.stock import run_stock_transaction
 from google.cloud import firestore
 from google.cloud.firestore import DocumentSnapshot
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime, timedelta
 from google.cloud.firestore_v1 import FieldFilter
-# ---------------- Inventory CRUD ----------------
-def get_next_id(prefix: str, counter_name: str) -> str:
-    counter_ref = db.collection("doc_counters").document(counter_name)
-    counter_doc = counter_ref.get()
-
-    if not counter_doc.exists:
-        counter_ref.set({"last_id": 1})
-        next_id = 1
-    else:
-        counter_ref.update({"last_id": firestore.Increment(1)})
-        next_id = counter_doc.to_dict()["last_id"] + 1
+# ---------------- Batch Dual-Read ----------------
+# Migrated items keep their batches in a subcollection; every reader fills
+# `batches` back in so callers see the same shape for both layouts.
 
-    return f"{prefix}{next_id:04d}"
+def _select(fields: Optional[List[str]]) -> Optional[List[str]]:
+    # Projections asking for batches also need the schema to know where they live
+    if fields and "batches" in fields and "batch_schema" not in fields:
+        return fields + ["batch_schema"]
+    return fields
 
+def _read_items(items: List[Dict], fields: Optional[List[str]] = None) -> List[Dict]:
+    if fields and "batches" not in fields:
+        return items
+    return attach_batches(items)
 
+# ---------------- Inventory CRUD ----------------
 def add_inventory_item(item_data: Dict) -> str:
     item_id = get_next_id("I", "items")
 
@@ -44,69 +55,176 @@ def add_inventory_item(item_data: Dict) -> str:
         "name": item_data.get("name", ""),
         "category": item_data.get("category", ""),
         "low_stock": float(item_data.get("low_stock", 0)),
+        "unit_price": float(item_data.get("unit_price", 0) or 0),
         "quantity": total_quantity,
         "stock_quantity": total_quantity,
-        "batches": structured_batches,
+        "batch_schema": BATCH_SCHEMA,
+        "is_low_stock": is_low(total_quantity, item_data.get("low_stock", 0)),
         "created_at": firestore.SERVER_TIMESTAMP,
         "updated_at": firestore.SERVER_TIMESTAMP
     }
 
-    db.collection("Inventory Items").document(item_id).set(item_doc)
+    batch = db.batch()
+    # New items keep their batches in the subcollection from the start
+    item_doc |= stage_batches(batch, item_id, item_doc, structured_batches)
+    batch.set(db.collection("Inventory Items").document(item_id), item_doc)
+    record_batches(batch, item_id, item_doc, structured_batches)
+    record_low_stock_delta(batch, int(item_doc["is_low_stock"]))
+    for entry in structured_batches:
+        if entry["quantity"]:
+            record_movement(batch, item_id, "adjustment", entry["quantity"], entry["batch_number"], reason="opening stock")
+    batch.commit()
     return item_id
 
 
 
-def get_inventory_item_by_name(name: str) -> List[Dict]:
-    docs = db.collection("Inventory Items").where(filter=FieldFilter("name", "==", name)).stream()
-    return [doc.to_dict() | {"id": doc.id} for doc in docs]
+def get_inventory_item_by_name(name: str, strict: bool = False, fields: Optional[List[str]] = None) -> List[Dict]:
+    mirror = get_mirror("Inventory Items")
+    if mirror and not strict:
+        return project_docs(_read_items(mirror.find("name", name), fields), fields)
+    docs = project(db.collection("Inventory Items").where(filter=FieldFilter("name", "==", name)), _select(fields)).stream()
+    return _read_items([doc.to_dict() | {"id": doc.id} for doc in docs], fields)
 
+@cached("Inventory Items")
 def get_inventory_item_by_id(doc_id: str) -> Optional[Dict]:
     doc: DocumentSnapshot = db.collection("Inventory Items").document(doc_id).get()
-    return doc.to_dict() | {"id": doc.id} if doc.exists else None
+    return with_batches(doc.id, doc.to_dict()) | {"id": doc.id} if doc.exists else None
 
 def update_inventory_item(doc_id: str, updated_data: Dict):
     updated_data["updated_at"] = firestore.SERVER_TIMESTAMP
-    db.collection("Inventory Items").document(doc_id).update(updated_data)
+    ref = db.collection("Inventory Items").document(doc_id)
+    if not {"stock_quantity", "low_stock", "batches"} & updated_data.keys():
+        ref.update(updated_data)
+    else:
+        # Stock, batches or threshold changed: recompute the low-stock flag in the same commit
+        def txn(transaction):
+            snapshot = ref.get(transaction=transaction)
+            if not snapshot.exists:
+                raise ValueError(f"❌ Inventory item '{doc_id}' not found.")
+            item = snapshot.to_dict()
+            data = dict(updated_data)
+            if "batches" in data:
+                stored = batch_quantities(load_batches(doc_id, item, transaction))
+                batches = data.pop("batches")
+                data = stage_batches(transaction, doc_id, item, batches, stored) | data
+                record_batches(transaction, doc_id, item, batches, stored)
+            threshold = data.get("low_stock", item.get("low_stock", 0))
+            stock = data.get("stock_quantity", item.get("stock_quantity", 0))
+            flag, delta = low_stock_update(item | {"low_stock": threshold}, stock)
+            transaction.update(ref, data | flag)
+            record_low_stock_delta(transaction, delta)
+            change = float(stock or 0) - float(item.get("stock_quantity", 0) or 0)
+            if "stock_quantity" in data and change:
+                record_movement(transaction, doc_id, "adjustment", change, reason="manual edit")
+
+        run_stock_transaction(txn)
+    if INDEXED_ITEM_FIELDS & updated_data.keys():
+        # Expiry index entries carry a copy of these
+        snapshot = ref.get(field_paths=list(INDEXED_ITEM_FIELDS))
+        if snapshot.exists:
+            refresh_item(doc_id, snapshot.to_dict())
+    invalidate("Inventory Items", doc_id)
 
 def delete_inventory_item(doc_id: str):
-    db.collection("Inventory Items").document(doc_id).delete()
-
-def get_all_inventory_items() -> List[Dict]:
-    docs = db.collection("Inventory Items").stream()
-    return [doc.to_dict() | {"id": doc.id} for doc in docs]
+    ref = db.collection("Inventory Items").document(doc_id)
+
+    def txn(transaction):
+        snapshot = ref.get(transaction=transaction)
+        transaction.delete(ref)
+        if snapshot.exists and snapshot.to_dict().get("is_low_stock"):
+            record_low_stock_delta(transaction, -1)
+
+    run_stock_transaction(txn)
+    drop_batches(doc_id)
+    drop_history(doc_id)
+    drop_item(doc_id)
+    invalidate("Inventory Items", doc_id)
+
+def get_all_inventory_items(strict: bool = False, fields: Optional[List[str]] = None) -> List[Dict]:
+    mirror = get_mirror("Inventory Items")
+    if mirror and not strict:
+        return project_docs(_read_items(mirror.all(), fields), fields)
+    docs = project(db.collection("Inventory Items"), _select(fields)).stream()
+    return _read_items([doc.to_dict() | {"id": doc.id} for doc in docs], fields)
+
+def get_inventory_items_page(page_size: int = 100, page_token: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    """One page of Inventory Items: {"items": [...], "next_page_token": str | None}."""
+    page = get_page(db.collection("Inventory Items"), page_size=page_size, page_token=page_token, fields=_select(fields))
+    return page | {"items": _read_items(page["items"], fields)}
+
+def iter_inventory_items(page_size: int = 100, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+    page_token = None
+    while True:
+        page = get_inventory_items_page(page_size, page_token, fields)
+        yield from page["items"]
+        page_token = page["next_page_token"]
+        if not page_token:
+            return
 
 # ---------------- Filtering & Helpers ----------------
 
-def get_items_by_category(category: str) -> List[Dict]:
-    docs = db.collection("Inventory Items").where(filter=FieldFilter("category", "==", category)).stream()
-    return [doc.to_dict() | {"id": doc.id} for doc in docs]
-
-def get_low_stock_items(threshold: int = 10) -> List[Dict]:
-    docs = db.collection("Inventory Items").where(filter=FieldFilter("stock_quantity", "<=", threshold)).stream()
-    return [doc.to_dict() | {"id": doc.id} for doc in docs]
+def get_items_by_category(category: str, strict: bool = False, fields: Optional[List[str]] = None) -> List[Dict]:
+    mirror = get_mirror("Inventory Items")
+    if mirror and not strict:
+        return project_docs(_read_items(mirror.find("category", category), fields), fields)
+    docs = project(db.collection("Inventory Items").where(filter=FieldFilter("category", "==", category)), _select(fields)).stream()
+    return _read_items([doc.to_dict() | {"id": doc.id} for doc in docs], fields)
+
+def get_low_stock_items(threshold: Optional[float] = None, fields: Optional[List[str]] = None) -> List[Dict]:
+    """Items at or below their own `low_stock` level, or below `threshold` when given."""
+    if threshold is None:
+        query = low_stock_query()
+    else:
+        query = db.collection("Inventory Items").where(filter=FieldFilter("stock_quantity", "<=", threshold))
+    docs = project(query, _select(fields)).stream()
+    return _read_items([doc.to_dict() | {"id": doc.id} for doc in docs], fields)
 
 def update_stock_quantity(doc_id: str, change: int):
-    db.collection("Inventory Items").document(doc_id).update({
-        "stock_quantity": firestore.Increment(change),
-        "updated_at": firestore.SERVER_TIMESTAMP
-    })
-
-def search_inventory_by_partial_name(partial: str) -> List[Dict]:
+    ref = db.collection("Inventory Items").document(doc_id)
+
+    def txn(transaction):
+        snapshot = ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise ValueError(f"❌ Inventory item '{doc_id}' not found.")
+        item = snapshot.to_dict()
+        flag, delta = low_stock_update(item, float(item.get("stock_quantity", 0) or 0) + change)
+        transaction.update(ref, {
+            "stock_quantity": firestore.Increment(change),
+            "updated_at": firestore.SERVER_TIMESTAMP
+        } | flag)
+        record_low_stock_delta(transaction, delta)
+        record_movement(transaction, doc_id, "adjustment", change, reason="stock adjustment")
+
+    run_stock_transaction(txn)
+    invalidate("Inventory Items", doc_id)
+
+def search_inventory_by_partial_name(partial: str, strict: bool = False, limit: int = None) -> List[Dict]:
+    """Ranked, typo-tolerant name search (served from the name index when live)."""
+    if not strict:
+        results = search_by_name("Inventory Items", partial, limit)
+        if results is not None:
+            return _read_items(results)
     docs = db.collection("Inventory Items").stream()
-    return [
-        doc.to_dict() | {"id": doc.id}
-        for doc in docs
-        if partial.lower() in doc.to_dict().get("name", "").lower()
-    ]
-
-def get_items_expiring_soon(days: int = 30) -> List[Dict]:
-    now = datetime.utcnow()
-    future = now + timedelta(days=days)
-    docs = db.collection("Inventory Items")\
-             .where(filter=FieldFilter("expiry_date", "<=", future))\
-             .stream()
-    return [doc.to_dict() | {"id": doc.id} for doc in docs]
-
+    return _read_items(rank_by_name([doc.to_dict() | {"id": doc.id} for doc in docs], partial, limit))
+
+def get_items_expiring_soon(days: int = 30, fields: Optional[List[str]] = None) -> List[Dict]:
+    """Items with a batch expiring within `days`, soonest first.
+
+    Served from the batch expiry index; each item also carries
+    `expiring_batches`, the matching index rows. Use
+    expiry_index.get_expiring_batches for one row per batch.
+    """
+    by_item = {}
+    for row in get_expiring_batches(days):
+        by_item.setdefault(row["item_id"], []).append(row)
+    if not by_item:
+        return []
+    refs = [db.collection("Inventory Items").document(item_id) for item_id in by_item]
+    docs = {doc.id: doc.to_dict() | {"id": doc.id} for doc in db.get_all(refs, field_paths=_select(fields)) if doc.exists}
+    items = _read_items([docs[item_id] for item_id in by_item if item_id in docs], fields)
+    return [item | {"expiring_batches": by_item[item["id"]]} for item in items]
+
+@cached("Inventory Items", "name")
 def resolve_inventory_item_id_by_name(name: str) -> Optional[str]:
     docs = db.collection("Inventory Items").where(filter=FieldFilter("name", "==", name)).limit(1).stream()
     for doc in docs:
@@ -1,5 +1,6 @@
 # Add a new invoice and return its document ID
 from firebase_config.config import db
+from firebase_config.query_utils import get_page, iter_query, project
 from google.cloud import firestore
 from typing import Dict, List
 from datetime import datetime
@@ -43,8 +44,8 @@ def add_invoice(invoice_data: Dict) -> str:
 
 
 # Get invoice(s) by exact invoice number
-def get_invoice_by_number(invoice_number):
-    docs = db.collection("Invoices").where(filter=FieldFilter("invoice_number", "==", invoice_number)).stream()
+def get_invoice_by_number(invoice_number, fields=None):
+    docs = project(db.collection("Invoices").where(filter=FieldFilter("invoice_number", "==", invoice_number)), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
 # Get invoice by document ID
@@ -53,10 +54,18 @@ def get_invoice_by_id(invoice_id):
     return doc.to_dict() | {"id": doc.id} if doc.exists else None
 
 # Get all invoices
-def get_all_invoices():
-    docs = db.collection("Invoices").stream()
+def get_all_invoices(fields=None):
+    docs = project(db.collection("Invoices"), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
+# Page through invoices / stream them in bounded pages
+def get_invoices_page(page_size=100, page_token=None, fields=None):
+    """One page of Invoices: {"items": [...], "next_page_token": str | None}."""
+    return get_page(db.collection("Invoices"), page_size=page_size, page_token=page_token, fields=fields)
+
+def iter_invoices(page_size=100, fields=None):
+    return iter_query(db.collection("Invoices"), page_size=page_size, fields=fields)
+
 # Update invoice data by document ID
 
 def update_invoice(invoice_id: str, updated_data: Dict):
@@ -0,0 +1,181 @@
+from firebase_config.config import db
+from firebase_config.batch_store import delete_collection, load_batches
+from google.cloud import firestore
+from google.cloud.firestore_v1 import FieldFilter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+# ---------------- Stock Ledger ----------------
+# Every stock movement is appended to Inventory Items/<id>/ledger as one
+# small entry (signed quantity, batch, order) in the same commit as the
+# stock change, so writing a movement costs the same whatever the item's
+# batch count. The running total stays on the item's `stock_quantity`, so
+# current stock is one document read.
+#
+# Inventory Items/<id>/stock_snapshots holds periodic compacted snapshots
+# (total and per-batch quantities as of a point in time). Stock as of any
+# date is the latest snapshot at or before it plus the short tail of ledger
+# entries after it. Compact with `python -m firebase_config.ledger`, e.g.
+# nightly.
+
+MOVEMENT_TYPES = {
+    "purchase": "purchase",
+    "sell": "sale",
+    "sales": "sale",
+    "delivery_challan": "challan",
+}
+
+# Entries newer than this may still be committing; snapshots stop short of it
+SNAPSHOT_SETTLE = timedelta(minutes=1)
+
+
+def ledger_ref(item_id: str):
+    return db.collection("Inventory Items").document(item_id).collection("ledger")
+
+
+def snapshots_ref(item_id: str):
+    return db.collection("Inventory Items").document(item_id).collection("stock_snapshots")
+
+
+def movement_type(order_type: str) -> str:
+    return MOVEMENT_TYPES.get(order_type, "adjustment")
+
+
+def record_movement(writer, item_id: str, movement: str, quantity: float, batch_number: str = "",
+                    order_id: str = "", reason: str = ""):
+    """Append one ledger entry on a transaction or WriteBatch.
+
+    `quantity` is signed: positive adds stock, negative removes it.
+    """
+    writer.set(ledger_ref(item_id).document(), {
+        "type": movement,
+        "quantity": float(quantity),
+        "batch_number": batch_number or "",
+        "order_id": order_id or "",
+        "reason": reason,
+        "at": firestore.SERVER_TIMESTAMP,
+    })
+
+
+def record_order_movements(writer, item_id: str, order_type: str, line: Dict, order_id: str):
+    """Ledger entries for one order line, one per batch it touched."""
+    movement = movement_type(order_type)
+    sign = 1 if movement == "purchase" else -1
+    pieces = line.get("allocations") or [{"batch_number": line.get("batch_number", ""), "quantity": line["quantity"]}]
+    for piece in pieces:
+        record_movement(writer, item_id, movement, sign * float(piece["quantity"]), piece["batch_number"], order_id)
+
+
+# ---------------- Reads ----------------
+
+def get_current_stock(item_id: str) -> float:
+    doc = db.collection("Inventory Items").document(item_id).get(field_paths=["stock_quantity"])
+    if not doc.exists:
+        raise ValueError(f"❌ Inventory item '{item_id}' not found.")
+    return float(doc.to_dict().get("stock_quantity", 0) or 0)
+
+
+def get_ledger(item_id: str, start=None, end=None, limit: int = None) -> List[Dict]:
+    """Ledger entries for an item, oldest first; `start` is exclusive, `end` inclusive."""
+    query = ledger_ref(item_id)
+    if start:
+        query = query.where(filter=FieldFilter("at", ">", start))
+    if end:
+        query = query.where(filter=FieldFilter("at", "<=", end))
+    query = query.order_by("at")
+    if limit:
+        query = query.limit(limit)
+    return [doc.to_dict() | {"id": doc.id} for doc in query.stream()]
+
+
+def get_latest_snapshot(item_id: str, as_of=None) -> Optional[Dict]:
+    query = snapshots_ref(item_id)
+    if as_of:
+        query = query.where(filter=FieldFilter("as_of", "<=", as_of))
+    for doc in query.order_by("as_of", direction=firestore.Query.DESCENDING).limit(1).stream():
+        return doc.to_dict()
+    return None
+
+
+def _apply(state: Dict, entries: List[Dict]) -> Dict:
+    batches = dict(state.get("batches", {}))
+    total = float(state.get("stock_quantity", 0))
+    for entry in entries:
+        quantity = float(entry.get("quantity", 0))
+        total += quantity
+        batch_number = entry.get("batch_number", "")
+        batches[batch_number] = batches.get(batch_number, 0) + quantity
+    return {"stock_quantity": total, "batches": batches}
+
+
+def get_stock_as_of(item_id: str, when: datetime) -> Dict:
+    """Total and per-batch stock at `when`: latest snapshot plus the ledger tail.
+
+    Raises ValueError if `when` is before the item's first snapshot (the
+    ledger doesn't reach back that far).
+    """
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    snapshot = get_latest_snapshot(item_id, when)
+    if snapshot is None:
+        raise ValueError(f"❌ No stock history for item '{item_id}' at {when.isoformat()}.")
+    entries = get_ledger(item_id, start=snapshot["as_of"], end=when)
+    state = _apply(snapshot, entries)
+    return state | {"as_of": when, "snapshot_as_of": snapshot["as_of"], "entries_applied": len(entries)}
+
+
+# ---------------- Compaction ----------------
+
+def _baseline(item_id: str, as_of: datetime) -> Dict:
+    """First snapshot of an item at `as_of`, taken from its current batches.
+
+    The batches are read after `as_of`, so the ledger entries between the
+    two are backed out to give the stock at `as_of` itself.
+    """
+    ref = db.collection("Inventory Items").document(item_id)
+    doc = ref.get(field_paths=["batches", "batch_schema", "stock_quantity"])
+    if not doc.exists:
+        raise ValueError(f"❌ Inventory item '{item_id}' not found.")
+    item = doc.to_dict()
+    batches = {}
+    for batch in load_batches(item_id, item):
+        batch_number = batch.get("batch_number", "")
+        batches[batch_number] = batches.get(batch_number, 0) + float(batch.get("quantity", 0) or 0)
+    current = {"stock_quantity": float(item.get("stock_quantity", 0) or 0), "batches": batches}
+    later = get_ledger(item_id, start=as_of, end=doc.read_time)
+    state = _apply(current, [entry | {"quantity": -float(entry.get("quantity", 0))} for entry in later])
+    return state | {"as_of": as_of, "entries": 0, "baseline": True}
+
+
+def compact_item(item_id: str, as_of: datetime = None) -> Dict:
+    """Write a snapshot of the item at `as_of` (default: now minus SNAPSHOT_SETTLE)."""
+    as_of = as_of or datetime.now(timezone.utc) - SNAPSHOT_SETTLE
+    previous = get_latest_snapshot(item_id, as_of)
+    if previous is None:
+        snapshot = _baseline(item_id, as_of)
+    else:
+        entries = get_ledger(item_id, start=previous["as_of"], end=as_of)
+        if not entries:
+            return previous
+        snapshot = _apply(previous, entries) | {"as_of": as_of, "entries": len(entries), "baseline": False}
+    snapshot["created_at"] = firestore.SERVER_TIMESTAMP
+    snapshots_ref(item_id).document(snapshot["as_of"].strftime("%Y%m%dT%H%M%S")).set(snapshot)
+    return snapshot
+
+
+def drop_history(item_id: str):
+    """Delete a removed item's ledger and snapshots."""
+    delete_collection(ledger_ref(item_id))
+    delete_collection(snapshots_ref(item_id))
+
+
+def compact_all(as_of: datetime = None) -> int:
+    count = 0
+    for doc in db.collection("Inventory Items").select([]).stream():
+        compact_item(doc.id, as_of)
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    print(f"✅ Compacted stock ledger for {compact_all()} items")
@@ -1,26 +1,17 @@
 import os
-from llama_index.core import Document, Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core import Settings
 from firebase_config.llama_index_configs import global_settings 
 from firebase_config.employess import get_all_employees  # you must create this function
 from .employee_index import build_employees_index  # you must create this builder
+from .sync_daemon import SCHEMAS
 
-# Set embedding model globally
-Settings.embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Shared cached model: only documents whose text changed get embedded
+Settings.embed_model = global_settings.embed_model
 
 def build_employee_documents():
-    employees = get_all_employees()
-    docs = []
-    for emp in employees:
-        text = f"""
-        Name: {emp.get("name")}
-        Employee ID: {emp.get("id")}
-        Collected : {emp.get("collected", 0)}
-        Paid: {emp.get("paid", 0)}
-        Phone: {emp.get('phone')}
-        """
-        docs.append(Document(text=text.strip()))
-    return docs
+    # Same text as the sync daemon writes, so the embedding cache is shared
+    employees = get_all_employees(strict=True)
+    return [SCHEMAS["employees"].document(emp, emp["id"]) for emp in employees]
 
 if __name__ == "__main__":
     docs = build_employee_documents()
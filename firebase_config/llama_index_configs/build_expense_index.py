@@ -1,27 +1,17 @@
 import os
-from llama_index.core import Document, Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core import Settings
 from firebase_config.llama_index_configs import global_settings 
 from firebase_config.finance import get_expenses
 from .expense_index import build_expenses_index
+from .sync_daemon import SCHEMAS
 
-# Set embedding model globally
-Settings.embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Shared cached model: only documents whose text changed get embedded
+Settings.embed_model = global_settings.embed_model
 
 def build_expense_documents():
-    items = get_expenses()
-    docs = []
-    for item in items:
-        text = f"""
-        Amount: ₹{item.get("amount")}
-        Category: {item.get("category")}
-        Paid By: {item.get("paid_by")}
-        Remarks: {item.get("remarks", "")}
-        Expense Date: {item.get("expense_date")}
-        Created At: {item.get("created_at")}
-        """
-        docs.append(Document(text=text.strip()))
-    return docs
+    # Same text as the sync daemon writes, so the embedding cache is shared
+    items = get_expenses(strict=True)
+    return [SCHEMAS["expenses"].document(item, item["id"]) for item in items]
 
 if __name__ == "__main__":
     docs = build_expense_documents()
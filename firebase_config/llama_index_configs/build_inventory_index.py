@@ -1,32 +1,17 @@
 import os
-from llama_index.core import Document, Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core import Settings
 from firebase_config.llama_index_configs import global_settings
 from firebase_config.inventory import get_all_inventory_items
 from .item_index import build_items_index
+from .sync_daemon import SCHEMAS
 
-# Set embedding model globally
-Settings.embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Shared cached model: only documents whose text changed get embedded
+Settings.embed_model = global_settings.embed_model
 
 def build_item_documents():
-    items = get_all_inventory_items()
-    docs = []
-    for item in items:
-        batches = item.get("batch", [])
-        batch_info_text = ""
-        for batch in batches:
-            batch_info_text += f"\n    Batch No: {batch.get('batch_number')}, Expiry: {batch.get('exp')}, Qty: {batch.get('quantity')}"
-
-        text = f"""
-        Item Name: {item.get("name")}
-        Item ID: {item.get("id")}
-        Category: {item.get("category")}
-        Total Quantity: {item.get("quantity")}
-        Low Stock Threshold: {item.get("low_stock")}
-        Batches: {batch_info_text.strip()}
-        """
-        docs.append(Document(text=text.strip()))
-    return docs
+    # Same text as the sync daemon writes, so the embedding cache is shared
+    items = get_all_inventory_items(strict=True)
+    return [SCHEMAS["items"].document(item, item["id"]) for item in items]
 
 if __name__ == "__main__":
     docs = build_item_documents()
@@ -1,27 +1,18 @@
 import os
-from llama_index.core import Document, Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core import Settings
 from firebase_config.llama_index_configs import global_settings
 
 from firebase_config.suppliers import get_all_suppliers
 from .supplier_index import build_suppliers_index
+from .sync_daemon import SCHEMAS
 
-# Set embedding model globally
-Settings.embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Shared cached model: only documents whose text changed get embedded
+Settings.embed_model = global_settings.embed_model
 
 def build_supplier_documents():
-    suppliers = get_all_suppliers()
-    docs = []
-    for supplier in suppliers:
-        text = f"""
-        Supplier ID: {supplier.get("id")}
-        Name: {supplier.get("name")}
-        Contact: {supplier.get("contact")}
-        Address: {supplier.get("address")}
-        Due Amount: ₹{supplier.get("due")}
-        """
-        docs.append(Document(text=text.strip()))
-    return docs
+    # Same text as the sync daemon writes, so the embedding cache is shared
+    suppliers = get_all_suppliers(strict=True)
+    return [SCHEMAS["suppliers"].document(supplier, supplier["id"]) for supplier in suppliers]
 
 if __name__ == "__main__":
     docs = build_supplier_documents()
@@ -0,0 +1,225 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Embedding Cache ----------------
+# Embeddings keyed by (model name, hash of the rendered document text), kept
+# on disk so index rebuilds and sync-listener restarts only embed documents
+# whose text actually changed. Per model there are three files in
+# EMBEDDING_CACHE_DIR:
+#
+#   <model>.f16   vectors as raw float16 rows, appended in order
+#   <model>.keys  one text hash per line; line i is row i of the .f16 file
+#   <model>.json  {"model": ..., "dim": ...}
+#   <model>.lock  held by whichever process is appending
+#
+# Both data files are append-only. Every process that embeds (the build_*
+# scripts, the sync daemon, Streamlit) shares the directory, so appends
+# happen under an exclusive lock on <model>.lock, after re-reading the tail
+# other processes wrote. Readers pick up new rows on a miss. A crash
+# mid-write leaves an unmatched tail, which the next writer truncates.
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".embedding_cache"))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@contextlib.contextmanager
+def _locked(path: str):
+    """Exclusive inter-process lock on `path` (created if missing)."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, directory: str = EMBEDDING_CACHE_DIR):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        os.makedirs(directory, exist_ok=True)
+        self.model_name = model_name
+        self.vectors_path = os.path.join(directory, f"{slug}.f16")
+        self.keys_path = os.path.join(directory, f"{slug}.keys")
+        self.meta_path = os.path.join(directory, f"{slug}.json")
+        self.lock_path = os.path.join(directory, f"{slug}.lock")
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._row_count = 0      # rows of the .f16 file covered by _rows
+        self._keys_offset = 0    # bytes of the .keys file read so far
+        self._stored = None      # memmap of those rows
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        with self._lock, _locked(self.lock_path):
+            self._refresh(repair=True)
+
+    def _refresh(self, repair: bool = False):
+        """Read rows appended since the last look (caller holds self._lock).
+
+        With repair=True (only under the file lock) an unmatched tail left by
+        a crashed writer is truncated so the next append lines up.
+        """
+        if self.dim is None:
+            if not os.path.exists(self.meta_path):
+                return
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)["dim"]
+        row_bytes = self.dim * 2
+        tail = b""
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "rb") as f:
+                f.seek(self._keys_offset)
+                tail = f.read()
+        # Only whole lines; a writer may be half way through the last one
+        lines = tail[:tail.rfind(b"\n") + 1].splitlines(keepends=True)
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        lines = lines[:max(0, size // row_bytes - self._row_count)]
+        for line in lines:
+            self._rows.setdefault(line.decode("ascii").strip(), self._row_count)
+            self._row_count += 1
+            self._keys_offset += len(line)
+
+        if repair:
+            keys_size = os.path.getsize(self.keys_path) if os.path.exists(self.keys_path) else 0
+            if size != self._row_count * row_bytes or keys_size != self._keys_offset:
+                logger.warning(f"⚠️ Truncating embedding cache {self.vectors_path} to {self._row_count} rows")
+                with open(self.vectors_path, "ab") as f:
+                    f.truncate(self._row_count * row_bytes)
+                with open(self.keys_path, "ab") as f:
+                    f.truncate(self._keys_offset)
+        if lines:
+            self._stored = np.memmap(self.vectors_path, dtype=np.float16, mode="r",
+                                     shape=(self._row_count, self.dim))
+
+    def _changed_on_disk(self) -> bool:
+        return os.path.exists(self.keys_path) and os.path.getsize(self.keys_path) > self._keys_offset
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _vector(self, row: int) -> List[float]:
+        return self._stored[row].astype(np.float32).tolist()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached embeddings for `texts` (None where missing)."""
+        with self._lock:
+            keys = [text_hash(text) for text in texts]
+            if any(key not in self._rows for key in keys) and self._changed_on_disk():
+                # Another process may have embedded them since we last looked
+                self._refresh()
+            found = [None if key not in self._rows else self._vector(self._rows[key]) for key in keys]
+            hits = sum(vector is not None for vector in found)
+            self.hits += hits
+            self.misses += len(texts) - hits
+            return found
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        with self._lock, _locked(self.lock_path):
+            # Catch up first so rows appended by other processes aren't overwritten or duplicated
+            self._refresh(repair=True)
+            new = {}
+            for text, vector in zip(texts, vectors):
+                key = text_hash(text)
+                if key not in self._rows and key not in new:
+                    new[key] = np.asarray(vector, dtype=np.float16)
+            if not new:
+                return
+            if self.dim is None:
+                self.dim = len(next(iter(new.values())))
+                with open(self.meta_path, "w") as f:
+                    json.dump({"model": self.model_name, "dim": self.dim}, f)
+            # Vectors first: a crash before the keys are written leaves an unmatched tail that the next writer drops
+            with open(self.vectors_path, "ab") as f:
+                for vector in new.values():
+                    f.write(vector.tobytes())
+            with open(self.keys_path, "a") as f:
+                f.writelines(f"{key}\n" for key in new)
+            self._refresh()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"model": self.model_name, "entries": len(self._rows), "hits": self.hits, "misses": self.misses}
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(model_name: str) -> EmbeddingCache:
+    """The process-wide cache for a model."""
+    with _caches_lock:
+        if model_name not in _caches:
+            _caches[model_name] = EmbeddingCache(model_name)
+        return _caches[model_name]
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Wraps an embedding model so document embeddings go through the cache.
+
+    Query embeddings are passed straight through: they are one-off and
+    would only grow the cache.
+    """
+
+    _inner: Any = PrivateAttr()
+    _cache: Any = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: Optional[EmbeddingCache] = None, **kwargs):
+        super().__init__(model_name=inner.model_name, embed_batch_size=inner.embed_batch_size, **kwargs)
+        self._inner = inner
+        # An empty EmbeddingCache is falsy (it has __len__), so test for None
+        self._cache = cache if cache is not None else get_cache(inner.model_name)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._inner.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await self._inner.aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Only the misses reach the model, in one batch
+            embedded = self._inner.get_text_embedding_batch([texts[i] for i in missing])
+            self._cache.put_many([texts[i] for i in missing], embedded)
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return vectors
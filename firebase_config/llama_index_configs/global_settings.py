@@ -6,6 +6,7 @@ from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from qdrant_client import QdrantClient
 from llama_index.vector_stores.qdrant import QdrantVectorStore
 from sentence_transformers import SentenceTransformer
+from firebase_config.llama_index_configs.embedding_cache import CachedEmbedding
 
 # 🗝 Load env
 load_dotenv()
@@ -29,7 +30,8 @@ logger.info("✅ Qdrant client initialized")
 ST_MODEL = "all-MiniLM-L6-v2"
 logger.info(f"🧠 Loading SentenceTransformer model: {ST_MODEL}")
 st_model = SentenceTransformer(ST_MODEL)
-embed_model = HuggingFaceEmbedding(model_name=ST_MODEL)
+# Document embeddings are cached on disk by text hash (see embedding_cache)
+embed_model = CachedEmbedding(HuggingFaceEmbedding(model_name=ST_MODEL))
 Settings.embed_model = embed_model
 Settings.llm = None
 
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+from llama_index.core import VectorStoreIndex, StorageContext
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from firebase_config.llama_index_configs.global_settings import global_settings
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Index Registry ----------------
+# One VectorStoreIndex, retriever and query engine per Qdrant collection,
+# built on first use and shared by every caller in the process. A semantic
+# tool call then costs one query embedding plus one vector search instead
+# of rebuilding the vector store, storage context and index each time.
+# Call warm_up() at startup to build them before the first query.
+
+SEMANTIC_COLLECTIONS = ("orders", "items", "clients", "suppliers", "payments", "expenses", "invoices", "employees")
+LATENCY_WINDOW = 256  # recent calls kept per collection for percentiles
+
+
+class _Entry:
+    def __init__(self, collection: str):
+        started = time.perf_counter()
+        vector_store = QdrantVectorStore(client=global_settings()["qdrant_client"], collection_name=collection)
+        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        self.index = VectorStoreIndex.from_vector_store(vector_store=vector_store, storage_context=storage_context)
+        self.retriever = self.index.as_retriever()
+        self.query_engine = self.index.as_query_engine()
+        self.load_seconds = time.perf_counter() - started
+        self.loaded_at = time.time()
+
+
+_entries: Dict[str, _Entry] = {}
+_registry_lock = threading.Lock()
+_load_locks = {collection: threading.Lock() for collection in SEMANTIC_COLLECTIONS}
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _entry(collection: str) -> _Entry:
+    if collection not in _load_locks:
+        raise ValueError(f"❌ Unknown semantic collection '{collection}'.")
+    entry = _entries.get(collection)
+    if entry is not None:
+        return entry
+    # Per-collection lock: a slow first load of one index doesn't block the others
+    with _load_locks[collection]:
+        entry = _entries.get(collection)
+        if entry is None:
+            entry = _Entry(collection)
+            with _registry_lock:
+                _entries[collection] = entry
+            logger.info(f"✅ Loaded '{collection}' index in {entry.load_seconds:.2f}s")
+    return entry
+
+
+def get_index(collection: str) -> VectorStoreIndex:
+    return _entry(collection).index
+
+
+def get_retriever(collection: str):
+    return _entry(collection).retriever
+
+
+def get_query_engine(collection: str):
+    return _entry(collection).query_engine
+
+
+def reset(collection: Optional[str] = None):
+    """Drop cached indexes (one collection or all) so the next call rebuilds them."""
+    with _registry_lock:
+        if collection:
+            _entries.pop(collection, None)
+        else:
+            _entries.clear()
+
+
+# ---------------- Queries ----------------
+
+def _record(collection: str, seconds: float, failed: bool):
+    with _stats_lock:
+        stats = _stats.setdefault(collection, {"calls": 0, "errors": 0, "total_seconds": 0.0,
+                                               "recent": deque(maxlen=LATENCY_WINDOW)})
+        stats["calls"] += 1
+        stats["errors"] += failed
+        stats["total_seconds"] += seconds
+        stats["recent"].append(seconds)
+
+
+def _timed(collection: str, call):
+    started = time.perf_counter()
+    failed = True
+    try:
+        result = call()
+        failed = False
+        return result
+    finally:
+        _record(collection, time.perf_counter() - started, failed)
+
+
+def query(collection: str, text: str) -> str:
+    """Run `text` through the collection's shared query engine."""
+    return _timed(collection, lambda: str(get_query_engine(collection).query(text)))
+
+
+def retrieve(collection: str, text: str) -> List:
+    """Top-k nodes for `text` from the collection's shared retriever."""
+    return _timed(collection, lambda: get_retriever(collection).retrieve(text))
+
+
+def get_latency_stats() -> Dict[str, Dict]:
+    """Per-collection call counts and latencies (ms); p50/p95 over recent calls."""
+    with _stats_lock:
+        snapshot = {collection: dict(stats, recent=sorted(stats["recent"])) for collection, stats in _stats.items()}
+    report = {}
+    for collection, stats in snapshot.items():
+        recent = stats["recent"]
+        report[collection] = {
+            "calls": stats["calls"],
+            "errors": stats["errors"],
+            "avg_ms": round(1000 * stats["total_seconds"] / stats["calls"], 1) if stats["calls"] else 0.0,
+            "p50_ms": round(1000 * recent[len(recent) // 2], 1) if recent else 0.0,
+            "p95_ms": round(1000 * recent[min(len(recent) - 1, int(len(recent) * 0.95))], 1) if recent else 0.0,
+            "loaded": collection in _entries,
+        }
+    return report
+
+
+def reset_latency_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# ---------------- Warm-up ----------------
+
+def warm_up(collections: Optional[Iterable[str]] = None, background: bool = False) -> Dict[str, float]:
+    """Build the indexes ahead of the first query.
+
+    Returns {collection: load seconds} (failures are logged and skipped).
+    With background=True it runs in a daemon thread and returns {} at once.
+    """
+    collections = list(collections or SEMANTIC_COLLECTIONS)
+    if background:
+        threading.Thread(target=warm_up, args=(collections,), daemon=True, name="index-warmup").start()
+        return {}
+    loaded = {}
+    for collection in collections:
+        try:
+            loaded[collection] = _entry(collection).load_seconds
+        except Exception as e:
+            logger.error(f"❌ Could not warm up '{collection}' index: {e}")
+    return loaded
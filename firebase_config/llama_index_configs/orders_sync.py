@@ -1,84 +1,14 @@
-# orders_qdrant_sync.py
+# Kept as an entry point; the schema and listener live in sync_daemon.
 
-import logging, os, time
-from google.cloud import firestore
-from google.oauth2 import service_account
-from llama_index.core import Document
-from firebase_config.llama_index_configs.global_settings import global_settings
-from firebase_config.llama_index_configs.order_index import load_orders_index
-from qdrant_client.http.models import VectorParams, Distance
+import logging
+from firebase_config.llama_index_configs.sync_daemon import SCHEMAS, run_daemon
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = r"C:\Users\thebe\ML\Codes\Balaji Health Care Assisstant\balaji-health-care-assistant\firebase_config\firebase_key.json"
-
-def create_document(order_data: dict, doc_id: str) -> Document:
-    items_text = "\n".join([
-        f"- {item.get('item', '')} | Qty: {item.get('quantity', '')} | Price: {item.get('price', '')}"
-        for item in order_data.get("items", [])
-    ])
-    text = f"""
-    Order ID: {doc_id}
-    Order Type: {order_data.get("order_type", "")}
-    Client: {order_data.get("client_name", "")}
-    Invoice/Challan: {order_data.get("invoice_number", "")}
-    Amount Paid: ₹{order_data.get("amount_paid", 0)}
-    Payment Status: {order_data.get("payment_status", "")}
-    Mode: {order_data.get("mode_of_payment", "")}
-    Order Date: {order_data.get("order_date", "")}
-    Remarks: {order_data.get("remarks", "")}
-    Items:
-    {items_text}
-    """.strip()
-
-    return Document(
-        text=text,
-        doc_id=doc_id,
-        metadata={"order_id": doc_id, "client": order_data.get("client_name", "")}
-    )
-
-def sync_orders_to_qdrant(docs, changes, read_time):
-    from firebase_config.llama_index_configs.global_settings import global_settings
-    index = load_orders_index()
-    qdrant = global_settings()["order_vector_store"].client
-
-    for doc in docs:
-        doc_id = doc.id
-        if not doc.exists:
-            try:
-                qdrant.delete(collection_name="orders", points_selector=[doc_id])
-                logger.info(f"🗑️ Deleted order {doc_id} from Qdrant")
-            except Exception as e:
-                logger.error(f"❌ Deletion error: {e}")
-            continue
-
-        order_data = doc.to_dict()
-        document = create_document(order_data, doc_id)
-        index.insert([document])
-        logger.info(f"✅ Synced order {doc_id} to Qdrant")
+create_document = SCHEMAS["orders"].document
 
 def listen_for_order_changes():
-    credentials_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
-    if not os.path.exists(credentials_path):
-        raise FileNotFoundError("Firebase key file not found.")
-
-    credentials = service_account.Credentials.from_service_account_file(credentials_path)
-    db = firestore.Client(credentials=credentials, project=os.getenv("FIRESTORE_PROJECT_ID"))
-    ref = db.collection("Orders")
-
-    qdrant = global_settings()["order_vector_store"].client
-    try:
-        qdrant.get_collection("orders")
-    except Exception:
-        qdrant.create_collection("orders", vectors_config=VectorParams(size=384, distance=Distance.COSINE))
-        logger.info("📦 Created Qdrant 'orders' collection")
-
-    ref.on_snapshot(sync_orders_to_qdrant)
-    logger.info("📡 Listening for Order changes...")
-
-    while True:
-        time.sleep(1)
+    """Mirror Firestore `Orders` into Qdrant `orders` (run sync_daemon to mirror every collection)."""
+    run_daemon(["orders"])
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
     listen_for_order_changes()
@@ -0,0 +1,82 @@
+import logging
+import uuid
+from typing import Iterable, List
+
+from llama_index.core import Document
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from qdrant_client.http.models import (Distance, FieldCondition, Filter, FilterSelector, HasIdCondition,
+                                       MatchAny, PayloadSchemaType, VectorParams)
+from firebase_config.llama_index_configs.global_settings import global_settings
+from firebase_config.llama_index_configs.index_registry import get_index
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Qdrant Upserts ----------------
+# Every Firestore document is exactly one Qdrant point whose ID is derived
+# from the document ID (uuid5 of "<collection>:<doc_id>"). Writing a changed
+# document overwrites its point in place, and a delete is one filter on the
+# `doc_id` payload field. The collection then holds one point per document
+# however many edits it has seen, instead of gaining a point per edit.
+#
+# Points left by the old index.insert() path have random IDs; they are
+# removed the first time their document is upserted.
+
+POINT_NAMESPACE = uuid.UUID("5b0e8f3a-2c4d-4e61-9a7b-3f1d6c8e2a90")
+VECTOR_SIZE = 384  # all-MiniLM-L6-v2
+
+
+def point_id(collection: str, doc_id: str) -> str:
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{collection}:{doc_id}"))
+
+
+def _doc_ids_filter(doc_ids: List[str], keep_points: List[str] = None) -> Filter:
+    return Filter(
+        must=[FieldCondition(key="doc_id", match=MatchAny(any=doc_ids))],
+        must_not=[HasIdCondition(has_id=keep_points)] if keep_points else None,
+    )
+
+
+def ensure_collection(collection: str):
+    """Create the collection (and the doc_id payload index deletes filter on) if missing."""
+    client = global_settings()["qdrant_client"]
+    try:
+        client.get_collection(collection)
+    except Exception:
+        client.create_collection(collection, vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE))
+        logger.info(f"📦 Created Qdrant '{collection}' collection")
+    client.create_payload_index(collection, field_name="doc_id", field_schema=PayloadSchemaType.KEYWORD)
+
+
+def _to_node(collection: str, document: Document, embedding: List[float]) -> TextNode:
+    node = TextNode(id_=point_id(collection, document.doc_id), text=document.text,
+                    metadata=dict(document.metadata), embedding=embedding)
+    # Stored as the point's doc_id / ref_doc_id payload, which deletes filter on
+    node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(node_id=document.doc_id)
+    return node
+
+
+def upsert_documents(collection: str, documents: Iterable[Document]) -> int:
+    """Write one point per document (keyed by its doc_id), replacing any existing ones."""
+    documents = list(documents)
+    if not documents:
+        return 0
+    embeddings = global_settings()["embed_model"].get_text_embedding_batch([doc.text for doc in documents])
+    nodes = [_to_node(collection, doc, embedding) for doc, embedding in zip(documents, embeddings)]
+    doc_ids = [doc.doc_id for doc in documents]
+    global_settings()["qdrant_client"].delete(
+        collection_name=collection,
+        points_selector=FilterSelector(filter=_doc_ids_filter(doc_ids, [node.node_id for node in nodes])),
+    )
+    get_index(collection).vector_store.add(nodes)
+    return len(nodes)
+
+
+def delete_documents(collection: str, doc_ids: Iterable[str]) -> int:
+    doc_ids = list(doc_ids)
+    if doc_ids:
+        global_settings()["qdrant_client"].delete(
+            collection_name=collection,
+            points_selector=FilterSelector(filter=_doc_ids_filter(doc_ids)),
+        )
+    return len(doc_ids)
+
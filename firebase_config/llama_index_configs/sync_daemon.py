@@ -0,0 +1,216 @@
+import logging
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from llama_index.core import Document
+from firebase_config.llama_index_configs.qdrant_sync import ensure_collection
+from firebase_config.llama_index_configs.sync_engine import SyncEngine
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Sync Daemon ----------------
+# One process keeps every semantic collection in Qdrant in step with
+# Firestore. Each collection is described by a SyncSchema (which Firestore
+# collection it mirrors, how a document renders to text, which fields go
+# into the metadata) instead of a copy-pasted *_sync.py script. The daemon
+# loads the embedding model and Firestore client once, opens one watch per
+# collection and runs every collection's flushes on one shared worker pool.
+#
+# The build_*_index.py rebuilds render through the same SCHEMAS, so a
+# rebuild and the daemon write identical text for a document and share its
+# cached embedding.
+#
+#   python -m firebase_config.llama_index_configs.sync_daemon [orders items ...]
+
+SYNC_WORKERS = int(os.getenv("SYNC_WORKERS", "2"))
+METRICS_INTERVAL = float(os.getenv("SYNC_METRICS_INTERVAL", "60"))  # seconds between metrics logs
+STOP_TIMEOUT = float(os.getenv("SYNC_STOP_TIMEOUT", "30"))  # seconds each engine gets to flush on shutdown
+
+
+class _Fields(dict):
+    """Template values; fields a document doesn't have render as empty."""
+
+    def __missing__(self, key):
+        return ""
+
+
+@dataclass
+class SyncSchema:
+    collection: str                 # Qdrant collection
+    firestore_collection: str
+    template: str                   # str.format_map over the document's fields plus `id`
+    metadata: Dict[str, str]        # metadata key -> field ("id" is the document ID)
+    computed: Dict[str, Callable[[Dict, str], str]] = field(default_factory=dict)
+
+    def render(self, data: Dict, doc_id: str) -> str:
+        values = _Fields({key: value for key, value in data.items() if value is not None})
+        values["id"] = doc_id
+        for name, compute in self.computed.items():
+            values[name] = compute(data, doc_id)
+        return self.template.format_map(values).strip()
+
+    def document(self, data: Dict, doc_id: str) -> Document:
+        metadata = {key: doc_id if source == "id" else data.get(source, "") for key, source in self.metadata.items()}
+        return Document(text=self.render(data, doc_id), doc_id=doc_id, metadata=metadata)
+
+
+# ---------------- Schemas ----------------
+
+def _order_items(order: Dict, order_id: str) -> str:
+    return "\n".join(
+        f"- {item.get('item_name') or item.get('item', '')} | Qty: {item.get('quantity', '')} | Price: {item.get('price', '')}"
+        for item in order.get("items", [])
+    )
+
+
+def _item_batches(item: Dict, item_id: str) -> str:
+    from firebase_config.batch_store import load_batches
+    # Items from the inventory readers already carry `batches`; raw snapshots
+    # of migrated items don't
+    batches = item["batches"] if "batches" in item else load_batches(item_id, item)
+    return "\n".join(
+        f"- Batch: {batch.get('batch_number', '')}, Exp: {batch.get('exp', '')}, Qty: {batch.get('quantity', 0)}"
+        for batch in batches
+    )
+
+
+SCHEMAS: Dict[str, SyncSchema] = {schema.collection: schema for schema in (
+    SyncSchema(
+        collection="orders",
+        firestore_collection="Orders",
+        template="""
+Order ID: {id}
+Order Type: {order_type}
+Client: {client_name}
+Invoice/Challan: {invoice_number}
+Amount Paid: ₹{amount_paid}
+Payment Status: {payment_status}
+Mode: {mode_of_payment}
+Order Date: {order_date}
+Remarks: {remarks}
+Items:
+{items_text}
+""",
+        metadata={"order_id": "id", "client": "client_name"},
+        computed={"items_text": _order_items},
+    ),
+    SyncSchema(
+        collection="clients",
+        firestore_collection="Clients",
+        template="""
+Name: {name}
+PAN: {pan}
+GST: {gst}
+POC Name: {poc_name}
+POC Contact: {poc_contact}
+Address: {address}
+Due Amount: ₹{due_amount}
+""",
+        metadata={"client_id": "id", "name": "name"},
+    ),
+    SyncSchema(
+        collection="items",
+        firestore_collection="Inventory Items",
+        template="""
+Name: {name}
+Category: {category}
+Quantity: {stock_quantity}
+Low Stock: {low_stock}
+Batches:
+{batches_text}
+""",
+        metadata={"item_id": "id", "name": "name"},
+        computed={"batches_text": _item_batches},
+    ),
+    SyncSchema(
+        collection="suppliers",
+        firestore_collection="Suppliers",
+        template="""
+Name: {name}
+Contact: {contact}
+Due Amount: ₹{due}
+Address: {address}
+""",
+        metadata={"supplier_id": "id", "name": "name"},
+    ),
+    SyncSchema(
+        collection="expenses",
+        firestore_collection="Expenses",
+        template="""
+Amount: ₹{amount}
+Category: {category}
+Paid By: {paid_by}
+Remarks: {remarks}
+Expense Date: {expense_date}
+""",
+        metadata={"expense_id": "id", "category": "category"},
+    ),
+    SyncSchema(
+        collection="employees",
+        firestore_collection="Employees",
+        template="""
+Name: {name}
+Collected: ₹{collected}
+Paid: ₹{paid}
+Phone: {phone}
+""",
+        metadata={"employee_id": "id", "name": "name"},
+    ),
+)}
+
+
+# ---------------- Daemon ----------------
+
+def run_daemon(names: Optional[List[str]] = None, workers: int = SYNC_WORKERS,
+               stop_event: Optional[threading.Event] = None):
+    """Mirror the named collections (default: all of SCHEMAS) until stopped.
+
+    Stops on SIGINT/SIGTERM or when `stop_event` is set; queued changes are
+    flushed before it returns.
+    """
+    names = list(names or SCHEMAS)
+    unknown = [name for name in names if name not in SCHEMAS]
+    if unknown:
+        raise ValueError(f"❌ Unknown sync collection(s): {', '.join(unknown)}")
+
+    from firebase_config.config import db
+
+    stop_event = stop_event or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop_event.set())
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qdrant-embed")
+    engines: Dict[str, SyncEngine] = {}
+    watches = []
+    try:
+        for name in names:
+            schema = SCHEMAS[name]
+            ensure_collection(schema.collection)
+            engine = SyncEngine(schema.collection, schema.document, executor=executor)
+            engines[name] = engine
+            watches.append(db.collection(schema.firestore_collection).on_snapshot(
+                lambda docs, changes, read_time, engine=engine: engine.submit(changes)))
+            logger.info(f"📡 Listening for {schema.firestore_collection} changes -> '{schema.collection}'")
+
+        while not stop_event.wait(METRICS_INTERVAL):
+            for engine in engines.values():
+                logger.info(f"📊 {engine.metrics()}")
+    finally:
+        for watch in watches:
+            watch.unsubscribe()
+        stuck = [name for name, engine in engines.items() if not engine.stop(STOP_TIMEOUT)]
+        if stuck:
+            logger.error(f"❌ Gave up waiting for {', '.join(stuck)} to flush after {STOP_TIMEOUT:.0f}s")
+        executor.shutdown(wait=not stuck, cancel_futures=True)
+        logger.info("🛑 Sync daemon stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    run_daemon(sys.argv[1:] or None)
@@ -0,0 +1,247 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Callable, Dict, Optional
+
+from llama_index.core import Document
+from firebase_config.llama_index_configs.embedding_cache import text_hash
+from firebase_config.llama_index_configs.qdrant_sync import delete_documents, upsert_documents
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Sync Engine ----------------
+# on_snapshot callbacks only enqueue their changes here and return; one
+# worker thread per collection drains the queue. Changes to the same
+# document are coalesced while they wait (last write wins, a delete
+# supersedes an edit), and the worker waits for a quiet `debounce` window
+# (at most `max_wait`) before flushing. A flush renders up to `batch_size`
+# documents, embeds them in one call and writes them with one Qdrant
+# upsert. So a bulk import or an order touching 20 items costs one
+# embedding batch and one round trip instead of 20.
+#
+# The queue holds at most `max_pending` distinct documents. When it is
+# full, submit() blocks the listener thread until the worker catches up
+# (backpressure), rather than buffering without bound.
+#
+# A failed flush is requeued and retried with backoff. Once stop() is
+# called a batch gets STOP_RETRIES attempts, then its doc_ids are logged
+# and dropped, so shutdown can't hang on an unreachable Qdrant.
+#
+# Documents whose rendered text is the same as at their last upsert (e.g.
+# only updated_at moved) are skipped. Engines given a shared `executor`
+# run their flushes on it, so several collections share one embedding pool.
+
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "32"))
+SYNC_DEBOUNCE = float(os.getenv("SYNC_DEBOUNCE", "0.5"))  # seconds without new events before a flush
+SYNC_MAX_WAIT = float(os.getenv("SYNC_MAX_WAIT", "2.0"))  # flush the oldest change after this long regardless
+SYNC_MAX_PENDING = int(os.getenv("SYNC_MAX_PENDING", "1000"))
+RETRY_DELAY = 1.0  # seconds, doubled per consecutive failure
+RETRY_DELAY_CAP = 30.0
+STOP_RETRIES = 3  # attempts per batch once stop() was called, then it is dropped
+
+_DELETE = object()
+
+
+class SyncEngine:
+    def __init__(self, collection: str, create_document: Callable[[Dict, str], Document],
+                 batch_size: int = SYNC_BATCH_SIZE, debounce: float = SYNC_DEBOUNCE,
+                 max_wait: float = SYNC_MAX_WAIT, max_pending: int = SYNC_MAX_PENDING,
+                 executor: Optional[Executor] = None):
+        self.collection = collection
+        self.create_document = create_document
+        self.batch_size = batch_size
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.executor = executor
+        self._synced = {}  # doc_id -> hash of the text last upserted
+        self._pending = OrderedDict()  # doc_id -> document data, or _DELETE
+        self._first_at: Optional[float] = None
+        self._last_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._stopping = False
+        self._failures_in_row = 0
+        self._metrics = {
+            "events": 0,             # document changes received
+            "coalesced": 0,          # changes folded into one already queued
+            "batches": 0,
+            "upserted": 0,
+            "deleted": 0,
+            "unchanged": 0,          # documents skipped because their text hadn't changed
+            "failures": 0,           # batches that failed and were requeued
+            "dropped": 0,            # documents given up on while stopping
+            "backpressure_waits": 0,
+            "backpressure_seconds": 0.0,
+            "max_queue_depth": 0,
+            "last_batch_size": 0,
+            "last_batch_seconds": 0.0,
+        }
+
+    # ---------------- Producer side ----------------
+
+    def submit(self, changes):
+        """Queue one on_snapshot callback's changes (blocks while the queue is full)."""
+        for change in changes:
+            doc = change.document
+            value = _DELETE if change.type.name == "REMOVED" else doc.to_dict()
+            self.enqueue(doc.id, value)
+
+    def enqueue(self, doc_id: str, value):
+        with self._cond:
+            self._start()
+            if doc_id not in self._pending and len(self._pending) >= self.max_pending:
+                waited = time.monotonic()
+                self._metrics["backpressure_waits"] += 1
+                while len(self._pending) >= self.max_pending and not self._stopping:
+                    self._cond.wait()
+                self._metrics["backpressure_seconds"] += time.monotonic() - waited
+            self._metrics["events"] += 1
+            if doc_id in self._pending:
+                self._metrics["coalesced"] += 1
+                # Move to the back so the document is flushed with its newest data
+                self._pending.move_to_end(doc_id)
+            self._pending[doc_id] = value
+            now = time.monotonic()
+            self._first_at = self._first_at or now
+            self._last_at = now
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], len(self._pending))
+            self._cond.notify_all()
+
+    # ---------------- Worker ----------------
+
+    def _start(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._stopping = False
+            self._worker = threading.Thread(target=self._run, daemon=True, name=f"qdrant-sync-{self.collection}")
+            self._worker.start()
+
+    def _due_in(self) -> float:
+        """Seconds until the queue should flush (0 = now); called with the lock held."""
+        if len(self._pending) >= self.batch_size or self._stopping:
+            return 0.0
+        now = time.monotonic()
+        return max(0.0, min(self._last_at + self.debounce, self._first_at + self.max_wait) - now)
+
+    def _take_batch(self) -> Dict:
+        with self._cond:
+            while True:
+                if self._pending:
+                    due = self._due_in()
+                    if due <= 0:
+                        break
+                    self._cond.wait(due)
+                elif self._stopping:
+                    return {}
+                else:
+                    self._cond.wait()
+            batch = {}
+            while self._pending and len(batch) < self.batch_size:
+                doc_id, value = self._pending.popitem(last=False)
+                batch[doc_id] = value
+            if self._pending:
+                self._first_at = self._last_at = time.monotonic()
+            else:
+                self._first_at = self._last_at = None
+            self._cond.notify_all()  # wake producers waiting on a full queue
+            return batch
+
+    def _requeue(self, batch: Dict):
+        # Changes that arrived while the batch was in flight are newer; keep those
+        with self._cond:
+            # Reinserting at the front in reverse keeps the batch's own order
+            for doc_id, value in reversed(batch.items()):
+                if doc_id not in self._pending:
+                    self._pending[doc_id] = value
+                    self._pending.move_to_end(doc_id, last=False)
+            now = time.monotonic()
+            self._first_at = self._first_at or now
+            self._last_at = self._last_at or now
+
+    def _flush(self, batch: Dict):
+        started = time.perf_counter()
+        removed = [doc_id for doc_id, value in batch.items() if value is _DELETE]
+        documents, hashes = [], {}
+        for doc_id, value in batch.items():
+            if value is _DELETE:
+                continue
+            document = self.create_document(value, doc_id)
+            hashes[doc_id] = text_hash(document.text)
+            if self._synced.get(doc_id) != hashes[doc_id]:
+                documents.append(document)
+        delete_documents(self.collection, removed)
+        upsert_documents(self.collection, documents)
+        for doc_id in removed:
+            self._synced.pop(doc_id, None)
+        self._synced.update(hashes)
+        with self._cond:
+            self._metrics["batches"] += 1
+            self._metrics["upserted"] += len(documents)
+            self._metrics["deleted"] += len(removed)
+            self._metrics["unchanged"] += len(hashes) - len(documents)
+            self._metrics["last_batch_size"] = len(batch)
+            self._metrics["last_batch_seconds"] = time.perf_counter() - started
+        logger.info(f"✅ Synced {len(documents)} {self.collection}, deleted {len(removed)} "
+                    f"({time.perf_counter() - started:.2f}s, {self.queue_depth()} queued)")
+
+    def _run(self):
+        stop_attempts = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                if self.executor is not None:
+                    self.executor.submit(self._flush, batch).result()
+                else:
+                    self._flush(batch)
+                self._failures_in_row = 0
+                stop_attempts = 0
+            except Exception as e:
+                self._failures_in_row += 1
+                with self._cond:
+                    self._metrics["failures"] += 1
+                    stopping = self._stopping
+                if stopping:
+                    stop_attempts += 1
+                    if stop_attempts >= STOP_RETRIES:
+                        with self._cond:
+                            self._metrics["dropped"] += len(batch)
+                        logger.error(f"❌ Giving up on {len(batch)} {self.collection} changes while stopping "
+                                     f"({stop_attempts} failed attempts): {', '.join(batch)}: {e}")
+                        stop_attempts = 0
+                        continue
+                delay = min(RETRY_DELAY_CAP, RETRY_DELAY * 2 ** (self._failures_in_row - 1))
+                if stopping:
+                    delay = min(delay, RETRY_DELAY)
+                logger.error(f"❌ Error syncing {self.collection} to Qdrant, retrying in {delay:.0f}s: {e}")
+                self._requeue(batch)
+                with self._cond:
+                    # stop() cuts the wait short so shutdown only pays for the bounded retries
+                    self._cond.wait_for(lambda: self._stopping and not stopping, delay)
+
+    # ---------------- Control & metrics ----------------
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def metrics(self) -> Dict:
+        with self._cond:
+            return dict(self._metrics, queue_depth=len(self._pending), collection=self.collection)
+
+    def stop(self, timeout: float = None) -> bool:
+        """Flush whatever is queued, then stop the worker.
+
+        Returns False if the worker was still running after `timeout`.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            return not self._worker.is_alive()
+        return True
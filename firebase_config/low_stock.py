@@ -0,0 +1,79 @@
+from firebase_config.config import db
+from google.cloud import firestore
+from google.cloud.firestore_v1 import FieldFilter
+from typing import Dict, Tuple
+
+# ---------------- Low-stock Flag ----------------
+# Each item carries `is_low_stock`, computed against its own `low_stock`
+# threshold whenever its stock changes, and stats/low_stock holds how many
+# items are flagged. Both are written in the same commit as the stock
+# change, so the low-stock list is one equality query and the count is one
+# document read.
+#
+# Backfill existing items with `python -m firebase_config.low_stock`.
+
+
+def low_stock_counter_ref():
+    return db.collection("stats").document("low_stock")
+
+
+def is_low(stock_quantity, low_stock) -> bool:
+    return float(stock_quantity or 0) <= float(low_stock or 0)
+
+
+def low_stock_update(item: Dict, stock_quantity: float = None) -> Tuple[Dict, int]:
+    """Return ({"is_low_stock": bool}, counter delta) for an item's new stock.
+
+    `item` is the document as read (before the write); the delta compares
+    against its stored flag, so the counter always equals the number of
+    flagged items.
+    """
+    if stock_quantity is None:
+        stock_quantity = item.get("stock_quantity", 0)
+    flag = is_low(stock_quantity, item.get("low_stock", 0))
+    was = bool(item.get("is_low_stock", False))
+    return {"is_low_stock": flag}, int(flag) - int(was)
+
+
+def record_low_stock_delta(writer, delta: int):
+    """Queue the counter change on a transaction or WriteBatch (no-op for 0)."""
+    if delta:
+        writer.set(low_stock_counter_ref(), {
+            "count": firestore.Increment(delta),
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        }, merge=True)
+
+
+def get_low_stock_count() -> int:
+    doc = low_stock_counter_ref().get()
+    return int(doc.to_dict().get("count", 0)) if doc.exists else 0
+
+
+def low_stock_query():
+    return db.collection("Inventory Items").where(filter=FieldFilter("is_low_stock", "==", True))
+
+
+# ---------------- Backfill ----------------
+
+def rebuild_low_stock_flags() -> int:
+    """Recompute every item's flag and reset the counter; returns the count."""
+    batch = db.batch()
+    pending = 0
+    count = 0
+    for doc in db.collection("Inventory Items").select(["stock_quantity", "low_stock", "is_low_stock"]).stream():
+        item = doc.to_dict()
+        flag = is_low(item.get("stock_quantity", 0), item.get("low_stock", 0))
+        count += flag
+        if item.get("is_low_stock") is not flag:
+            batch.update(doc.reference, {"is_low_stock": flag, "updated_at": firestore.SERVER_TIMESTAMP})
+            pending += 1
+            if pending == 400:
+                batch.commit()
+                batch, pending = db.batch(), 0
+    batch.set(low_stock_counter_ref(), {"count": count, "updated_at": firestore.SERVER_TIMESTAMP})
+    batch.commit()
+    return count
+
+
+if __name__ == "__main__":
+    print(f"✅ {rebuild_low_stock_flags()} items flagged as low stock")
@@ -0,0 +1,222 @@
+from firebase_config.config import db
+from firebase_config.batch_store import (BATCH_SCHEMA, batch_doc_id, batch_document, batches_ref,
+                                         delete_collection, stage_batches, uses_subcollection)
+from firebase_config.cache import invalidate
+from firebase_config.expiry_index import batch_quantities, drop_item
+from firebase_config.ledger import drop_history
+from firebase_config.stock import mutate_stock, run_stock_transaction
+from firebase_config.suppliers import SUPPLY_SCHEMA, supply_history_ref, uses_supply_subcollection
+from google.cloud import firestore
+from datetime import datetime
+from typing import Dict, List
+import json
+import statistics
+import sys
+import time
+
+# ---------------- Subcollection Migration ----------------
+# Moves Inventory Items `batches` arrays into Inventory Items/<id>/batches
+# and Suppliers `supplied_items[].supply_history` into
+# Suppliers/<id>/supply_history. Each document is copied ahead in bounded
+# commits, then one transaction catches up on anything written since the
+# copy, flips the schema field and deletes the array, so the app keeps
+# selling while it runs (every reader dual-reads both layouts).
+#
+#   python -m firebase_config.migrate_subcollections              migrate everything
+#   python -m firebase_config.migrate_subcollections --benchmark  compare sale write cost
+
+CHUNK = 400
+
+
+def _commit_chunks(writes: List):
+    """Commit (ref, data) pairs in WriteBatches of at most CHUNK writes."""
+    for start in range(0, len(writes), CHUNK):
+        batch = db.batch()
+        for ref, data in writes[start:start + CHUNK]:
+            batch.set(ref, data)
+        batch.commit()
+
+
+# ---------------- Inventory Items ----------------
+
+def migrate_item(item_id: str) -> int:
+    """Move one item's batches into its subcollection; returns batches moved."""
+    ref = db.collection("Inventory Items").document(item_id)
+    snapshot = ref.get()
+    if not snapshot.exists:
+        raise ValueError(f"❌ Inventory item '{item_id}' not found.")
+    item = snapshot.to_dict()
+    if uses_subcollection(item):
+        return 0
+    batches = item.get("batches") or []
+    _commit_chunks([(batches_ref(item_id).document(batch_doc_id(batch.get("batch_number", ""))), batch_document(batch))
+                    for batch in batches])
+    copied = batch_quantities(batches)
+
+    def txn(transaction):
+        current = ref.get(transaction=transaction).to_dict()
+        if uses_subcollection(current):
+            return 0
+        latest = current.get("batches") or []
+        # Rewrite only the batches sold or received since the copy
+        stage_batches(transaction, item_id, current | {"batch_schema": BATCH_SCHEMA}, latest, copied)
+        transaction.update(ref, {
+            "batch_schema": BATCH_SCHEMA,
+            "batches": firestore.DELETE_FIELD,
+            "updated_at": firestore.SERVER_TIMESTAMP
+        })
+        return len(latest)
+
+    moved = run_stock_transaction(txn)
+    invalidate("Inventory Items", item_id)
+    return moved
+
+
+# ---------------- Suppliers ----------------
+
+def _legacy_recorded_at(record: Dict):
+    for key in ("recorded_at", "supplied_at", "date", "created_at"):
+        value = record.get(key)
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                continue
+    return None
+
+
+def _history_writes(supplier_id: str, supplied_items: List[Dict], skip: Dict[str, int] = None) -> List:
+    """(ref, data) for every supply record, keyed by item and position so re-runs overwrite."""
+    writes = []
+    for item in supplied_items:
+        item_id = item["item_id"]
+        for position, record in enumerate(item.get("supply_history", [])):
+            if skip and position < skip.get(item_id, 0):
+                continue
+            ref = supply_history_ref(supplier_id).document(f"{batch_doc_id(item_id)}_{position:05d}")
+            writes.append((ref, record | {"item_id": item_id, "recorded_at": _legacy_recorded_at(record)}))
+    return writes
+
+
+def migrate_supplier(supplier_id: str) -> int:
+    """Move one supplier's supply history into its subcollection; returns records moved."""
+    ref = db.collection("Suppliers").document(supplier_id)
+    snapshot = ref.get()
+    if not snapshot.exists:
+        raise ValueError("Supplier not found")
+    supplier = snapshot.to_dict()
+    if uses_supply_subcollection(supplier):
+        return 0
+    supplied_items = supplier.get("supplied_items", [])
+    _commit_chunks(_history_writes(supplier_id, supplied_items))
+    copied = {item["item_id"]: len(item.get("supply_history", [])) for item in supplied_items}
+
+    def txn(transaction):
+        current = ref.get(transaction=transaction).to_dict()
+        if uses_supply_subcollection(current):
+            return 0
+        latest = current.get("supplied_items", [])
+        # Supply history is append-only, so only records added since the copy remain
+        for history_ref, data in _history_writes(supplier_id, latest, copied):
+            transaction.set(history_ref, data)
+        transaction.update(ref, {
+            "supply_schema": SUPPLY_SCHEMA,
+            "supplied_item_ids": [item["item_id"] for item in latest],
+            "supplied_items": firestore.DELETE_FIELD,
+            "updated_at": firestore.SERVER_TIMESTAMP
+        })
+        return sum(len(item.get("supply_history", [])) for item in latest)
+
+    moved = run_stock_transaction(txn)
+    invalidate("Suppliers", supplier_id)
+    return moved
+
+
+def migrate_all() -> Dict:
+    stats = {"items": 0, "batches": 0, "suppliers": 0, "supply_records": 0}
+    for doc in db.collection("Inventory Items").select(["batch_schema"]).stream():
+        if not uses_subcollection(doc.to_dict()):
+            stats["batches"] += migrate_item(doc.id)
+            stats["items"] += 1
+    for doc in db.collection("Suppliers").select(["supply_schema"]).stream():
+        if not uses_supply_subcollection(doc.to_dict()):
+            stats["supply_records"] += migrate_supplier(doc.id)
+            stats["suppliers"] += 1
+    return stats
+
+
+# ---------------- Benchmark ----------------
+
+class _SizeRecorder:
+    """Stands in for a transaction to measure what a write would send."""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def set(self, ref, data, merge=False):
+        self.bytes += len(json.dumps(data, default=str))
+
+    def delete(self, ref):
+        self.bytes += len(ref.id)
+
+
+def _payload_bytes(item: Dict, batches: List[Dict], sold: str) -> int:
+    recorder = _SizeRecorder()
+    before = batch_quantities(batches)
+    after = [batch | {"quantity": batch["quantity"] - 1} if batch["batch_number"] == sold else batch
+             for batch in batches]
+    fields = stage_batches(recorder, "BENCH", item, after, before)
+    return recorder.bytes + len(json.dumps(fields, default=str))
+
+
+def _drop_bench_item(item_id: str):
+    delete_collection(batches_ref(item_id))
+    drop_history(item_id)
+    drop_item(item_id)
+    db.collection("Inventory Items").document(item_id).delete()
+
+
+def benchmark(batch_count: int = 200, sales: int = 30) -> Dict:
+    """Time single-unit sales against temporary items in both layouts.
+
+    Returns {schema: {"p50_ms", "p95_ms", "payload_bytes"}}; the items are
+    deleted afterwards.
+    """
+    batches = [{"batch_number": f"B{n:04d}", "exp": f"{(n % 12) + 1:02d}/2099", "quantity": float(sales + 1)}
+               for n in range(batch_count)]
+    results = {}
+    for schema in (1, BATCH_SCHEMA):
+        item_id = f"BENCH-v{schema}"
+        item = {"name": item_id, "category": "benchmark", "low_stock": 0.0, "batch_schema": schema,
+                "is_low_stock": False}
+        try:
+            # Created inside the try so a failed or interrupted run still cleans up
+            writer = db.batch()
+            item |= stage_batches(writer, item_id, item, batches)
+            writer.set(db.collection("Inventory Items").document(item_id), item)
+            writer.commit()
+            timings = []
+            for sale in range(sales):
+                batch_number = batches[sale % batch_count]["batch_number"]
+                started = time.perf_counter()
+                mutate_stock(item_id, [{"batch_number": batch_number, "quantity": 1}], "sell")
+                timings.append((time.perf_counter() - started) * 1000)
+            results[schema] = {
+                "p50_ms": round(statistics.median(timings), 1),
+                "p95_ms": round(statistics.quantiles(timings, n=20)[-1], 1),
+                "payload_bytes": _payload_bytes(item, batches, batches[0]["batch_number"]),
+            }
+        finally:
+            _drop_bench_item(item_id)
+    return results
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        for schema, result in benchmark().items():
+            print(f"[✔] schema {schema}: p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+                  f"{result['payload_bytes']} bytes per sale")
+    else:
+        print(f"✅ Migrated {migrate_all()}")
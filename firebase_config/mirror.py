@@ -0,0 +1,249 @@
+from firebase_config.config import db
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+# ---------------- Live Collection Mirror ----------------
+# Opt-in, process-wide copy of the hot collections kept current by one
+# `on_snapshot` listener each. Read helpers in firebase_config/* serve from
+# the mirror when it is enabled and fall back to Firestore otherwise (or
+# when the caller passes strict=True). Writes always go to Firestore and
+# come back through the listener.
+
+MIRRORED_COLLECTIONS = ["Inventory Items", "batches", "Clients", "Suppliers", "Orders", "Employees", "Expenses"]
+
+# Subcollections mirrored as one collection group: name -> parent collection.
+# Their documents are keyed "<parent id>/<doc id>" and carry `parent_id`.
+GROUP_COLLECTIONS = {"batches": "Inventory Items"}
+
+# Secondary indexes: field -> {value -> set of doc ids}
+INDEXED_FIELDS = {
+    "Inventory Items": ["name", "category"],
+    "batches": ["parent_id"],
+    "Clients": ["name"],
+    "Suppliers": ["name"],
+    "Orders": ["client_id", "supplier_id", "status", "order_type", "invoice_number"],
+    "Employees": ["name"],
+    "Expenses": ["category"],
+}
+
+
+class CollectionMirror:
+    def __init__(self, collection: str, indexed_fields: List[str]):
+        self.collection = collection
+        self.version = 0          # bumped on every snapshot applied
+        self.read_time = None     # server read_time of the last snapshot
+        self.last_synced = None   # local wall-clock time of the last snapshot
+        self._docs = {}
+        self._indexes = {field: {} for field in indexed_fields}
+        self._lock = threading.RLock()
+        # Held while delivering changes to listeners, so a slow listener
+        # never blocks reads and replays stay ordered with live changes
+        self._deliver_lock = threading.RLock()
+        self._ready = threading.Event()
+        self._listeners = []
+        self._watch = None
+
+    # ---------------- Lifecycle ----------------
+
+    def start(self):
+        if self._watch is None:
+            self._watch = source_query(self.collection).on_snapshot(self._on_snapshot)
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+        self._ready.clear()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._watch is not None and self._ready.is_set()
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last snapshot was applied.
+
+        The listener only fires on change, so a quiet collection ages without
+        being stale; pass strict=True to the read helpers when a read must
+        reflect a write made elsewhere a moment ago.
+        """
+        return None if self.last_synced is None else time.time() - self.last_synced
+
+    def add_listener(self, callback: Callable):
+        """Call callback(doc_id, data_or_None) for every document change."""
+        def deliver(applied):
+            for doc_id, data in applied:
+                callback(doc_id, data)
+        self.add_batch_listener(deliver)
+
+    def add_batch_listener(self, callback: Callable):
+        """Call callback([(doc_id, data_or_None), ...]) once per snapshot.
+
+        The current documents are replayed as one batch first, outside the
+        read lock.
+        """
+        with self._deliver_lock:
+            with self._lock:
+                self._listeners.append(callback)
+                current = [(doc_id, dict(data)) for doc_id, data in self._docs.items()]
+            if current:
+                callback(current)
+
+    # ---------------- Snapshot handling ----------------
+
+    def _on_snapshot(self, docs, changes, read_time):
+        applied = []
+        with self._lock:
+            for change in changes:
+                keyed = keyed_document(self.collection, change.document)
+                if keyed is None:
+                    continue
+                doc_id, data = keyed
+                if change.type.name == "REMOVED":
+                    self._remove(doc_id)
+                    applied.append((doc_id, None))
+                else:
+                    data = data | {"id": doc_id}
+                    self._put(doc_id, data)
+                    applied.append((doc_id, data))
+            self.version += 1
+            self.read_time = read_time
+            self.last_synced = time.time()
+        with self._deliver_lock:
+            for callback in list(self._listeners):
+                callback(applied)
+        self._ready.set()
+
+    def _put(self, doc_id: str, data: Dict):
+        self._remove(doc_id)
+        self._docs[doc_id] = data
+        for field, index in self._indexes.items():
+            value = data.get(field)
+            if _hashable(value):
+                index.setdefault(value, set()).add(doc_id)
+
+    def _remove(self, doc_id: str):
+        old = self._docs.pop(doc_id, None)
+        if old is None:
+            return
+        for field, index in self._indexes.items():
+            value = old.get(field)
+            if _hashable(value) and value in index:
+                index[value].discard(doc_id)
+                if not index[value]:
+                    del index[value]
+
+    # ---------------- Reads ----------------
+
+    def get(self, doc_id: str) -> Optional[Dict]:
+        with self._lock:
+            data = self._docs.get(doc_id)
+            return dict(data) if data is not None else None
+
+    def all(self) -> List[Dict]:
+        with self._lock:
+            return [dict(data) for data in self._docs.values()]
+
+    def find(self, field: str, value) -> List[Dict]:
+        with self._lock:
+            if field in self._indexes:
+                ids = self._indexes[field].get(value, ())
+                return [dict(self._docs[doc_id]) for doc_id in ids]
+            return [dict(data) for data in self._docs.values() if data.get(field) == value]
+
+    def filter(self, predicate: Callable) -> List[Dict]:
+        with self._lock:
+            return [dict(data) for data in self._docs.values() if predicate(data)]
+
+
+def source_query(collection: str):
+    """The collection, or for a GROUP_COLLECTIONS entry its collection group."""
+    if collection in GROUP_COLLECTIONS:
+        return db.collection_group(collection)
+    return db.collection(collection)
+
+
+def keyed_document(collection: str, doc) -> Optional[Tuple[str, Dict]]:
+    """(mirror key, data) for a snapshot from source_query(), or None to skip it.
+
+    Group documents are keyed by parent and doc ID, since doc IDs (batch
+    numbers) repeat across parents; same-named subcollections under other
+    parents are skipped.
+    """
+    if collection not in GROUP_COLLECTIONS:
+        return doc.id, doc.to_dict()
+    parent = doc.reference.parent.parent
+    if parent is None or parent.parent.id != GROUP_COLLECTIONS[collection]:
+        return None
+    return f"{parent.id}/{doc.id}", (doc.to_dict() or {}) | {"parent_id": parent.id}
+
+
+def _hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return value is not None
+
+
+# ---------------- Registry ----------------
+
+_mirrors = {}
+_mirrors_lock = threading.Lock()
+
+# Read sources used when no live mirror is running (e.g. the SQLite replica)
+_fallbacks = {}
+
+
+def enable_mirror(collections: List[str] = None, wait: bool = True, timeout: float = 30) -> Dict[str, CollectionMirror]:
+    """Start listeners for the given collections (default: all mirrored ones).
+
+    Safe to call repeatedly, e.g. on every Streamlit rerun.
+    """
+    started = []
+    with _mirrors_lock:
+        for collection in collections or MIRRORED_COLLECTIONS:
+            mirror = _mirrors.get(collection)
+            if mirror is None:
+                mirror = CollectionMirror(collection, INDEXED_FIELDS.get(collection, []))
+                _mirrors[collection] = mirror
+            mirror.start()
+            started.append(mirror)
+    if wait:
+        for mirror in started:
+            mirror.wait_ready(timeout)
+    return {mirror.collection: mirror for mirror in started}
+
+
+def disable_mirror():
+    with _mirrors_lock:
+        for mirror in _mirrors.values():
+            mirror.stop()
+        _mirrors.clear()
+
+
+def get_mirror(collection: str) -> Optional[CollectionMirror]:
+    """Return the live mirror for a collection, or None if it can't serve reads.
+
+    Falls back to a registered read source (same read interface) when the
+    live mirror isn't running.
+    """
+    mirror = _mirrors.get(collection)
+    if mirror is not None and mirror.ready:
+        return mirror
+    return _fallbacks.get(collection)
+
+
+def register_fallback(collection: str, source):
+    _fallbacks[collection] = source
+
+
+def unregister_fallback(collection: str):
+    _fallbacks.pop(collection, None)
+
+
+def get_mirror_versions() -> Dict[str, int]:
+    return {name: mirror.version for name, mirror in _mirrors.items()}
@@ -0,0 +1,184 @@
+from firebase_config.mirror import get_mirror
+from typing import Dict, List, Optional
+import bisect
+import re
+import threading
+import unicodedata
+
+# ---------------- Name Search Index ----------------
+# Trigram + token-prefix index over item, client and supplier names. It is
+# fed by the live mirror's listener, so it refreshes one document at a time
+# and answers partial and typo-tolerant lookups without touching Firestore.
+
+# Common pharmacy/medical abbreviations folded to one canonical token so
+# "Inj. Heparin" and "Injection Heparin" index the same way
+ABBREVIATIONS = {
+    "inj": "injection",
+    "tab": "tablet",
+    "tabs": "tablet",
+    "tablets": "tablet",
+    "cap": "capsule",
+    "caps": "capsule",
+    "capsules": "capsule",
+    "syr": "syrup",
+    "susp": "suspension",
+    "oint": "ointment",
+    "sol": "solution",
+    "soln": "solution",
+    "amp": "ampoule",
+    "amps": "ampoule",
+}
+
+MIN_SCORE = 0.3
+
+# Queries shorter than this (spaces removed) have no interior trigram, so
+# a mid-word match can't be found through the trigram buckets
+MIN_INDEXED_QUERY = 3
+
+
+def normalize_name(name: str) -> str:
+    """Case-fold, strip accents and punctuation, expand abbreviations.
+
+    Punctuation is dropped rather than turned into spaces, so "I.V." and
+    "IV" or "A.V. Fistula" and "AV Fistula" normalize identically.
+    """
+    text = unicodedata.normalize("NFKD", str(name or "")).casefold()
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^\w\s]", "", text)
+    tokens = [ABBREVIATIONS.get(token, token) for token in text.split()]
+    return " ".join(tokens)
+
+
+def _trigrams(normalized: str) -> set:
+    padded = f"${normalized.replace(' ', '')}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def score_name(query: str, name: str) -> float:
+    """Rank a normalized name against a normalized query (higher is better)."""
+    if not query:
+        return 0.0
+    compact_query = query.replace(" ", "")
+    compact_name = name.replace(" ", "")
+    if compact_query == compact_name:
+        return 3.0
+    query_grams = _trigrams(query)
+    score = len(query_grams & _trigrams(name)) / len(query_grams)
+    if compact_name.startswith(compact_query) or any(token.startswith(query) for token in name.split()):
+        score += 1.0
+    elif compact_query in compact_name:
+        score += 0.5
+    return score
+
+
+def rank_by_name(docs: List[Dict], query: str, limit: int = None, min_score: float = MIN_SCORE) -> List[Dict]:
+    """Rank already-loaded documents by name (used when no index is live)."""
+    normalized = normalize_name(query)
+    scored = []
+    for doc in docs:
+        score = score_name(normalized, normalize_name(doc.get("name", "")))
+        if score >= min_score:
+            scored.append((score, doc))
+    scored.sort(key=lambda pair: (-pair[0], pair[1].get("name", "")))
+    return [doc for _, doc in scored[:limit]]
+
+
+class NameIndex:
+    def __init__(self, collection: str):
+        self.collection = collection
+        self._lock = threading.Lock()
+        self._names = {}    # doc_id -> normalized name
+        self._grams = {}    # trigram -> set of doc ids
+        self._tokens = []   # sorted (token, doc_id) pairs for prefix lookups
+
+    def on_change(self, doc_id: str, data: Optional[Dict]):
+        with self._lock:
+            self._remove(doc_id)
+            if data is not None:
+                self._add(doc_id, data.get("name", ""))
+
+    def _add(self, doc_id: str, name: str):
+        normalized = normalize_name(name)
+        self._names[doc_id] = normalized
+        for gram in _trigrams(normalized):
+            self._grams.setdefault(gram, set()).add(doc_id)
+        for token in set(normalized.split()):
+            bisect.insort(self._tokens, (token, doc_id))
+
+    def _remove(self, doc_id: str):
+        normalized = self._names.pop(doc_id, None)
+        if normalized is None:
+            return
+        for gram in _trigrams(normalized):
+            ids = self._grams.get(gram)
+            if ids:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._grams[gram]
+        for token in set(normalized.split()):
+            pos = bisect.bisect_left(self._tokens, (token, doc_id))
+            if pos < len(self._tokens) and self._tokens[pos] == (token, doc_id):
+                del self._tokens[pos]
+
+    def _prefix_candidates(self, prefix: str) -> set:
+        pos = bisect.bisect_left(self._tokens, (prefix, ""))
+        found = set()
+        while pos < len(self._tokens) and self._tokens[pos][0].startswith(prefix):
+            found.add(self._tokens[pos][1])
+            pos += 1
+        return found
+
+    def search_ids(self, query: str, limit: int = None, min_score: float = MIN_SCORE) -> List[str]:
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+        with self._lock:
+            if len(normalized.replace(" ", "")) < MIN_INDEXED_QUERY:
+                # Score every name, same as rank_by_name does
+                candidates = set(self._names)
+            else:
+                candidates = self._prefix_candidates(normalized.split()[0])
+                for gram in _trigrams(normalized):
+                    candidates |= self._grams.get(gram, set())
+            scored = []
+            for doc_id in candidates:
+                name = self._names[doc_id]
+                score = score_name(normalized, name)
+                if score >= min_score:
+                    scored.append((-score, name, doc_id))
+        scored.sort()
+        return [doc_id for _, _, doc_id in scored[:limit]]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_name_index(collection: str) -> Optional[NameIndex]:
+    """Return the live name index for a mirrored collection, building it on first use."""
+    mirror = get_mirror(collection)
+    if mirror is None:
+        return None
+    with _indexes_lock:
+        source, index = _indexes.get(collection, (None, None))
+        # Rebuild if the mirror was restarted since the index was attached
+        if source is not mirror:
+            index = NameIndex(collection)
+            # Replays the current documents, then streams every later change
+            mirror.add_listener(index.on_change)
+            _indexes[collection] = (mirror, index)
+    return index
+
+
+def search_by_name(collection: str, query: str, limit: int = None) -> Optional[List[Dict]]:
+    """Ranked name search served from the index, or None if it isn't live."""
+    index = get_name_index(collection)
+    if index is None:
+        return None
+    mirror = get_mirror(collection)
+    results = []
+    for doc_id in index.search_ids(query, limit):
+        doc = mirror.get(doc_id)
+        if doc is not None:
+            results.append(doc)
+    return results
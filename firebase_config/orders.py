@@ -1,6 +1,7 @@
 from firebase_config.config import db
+from firebase_config.query_utils import get_page, iter_query, project, project_docs
 from google.cloud import firestore
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime, timezone
 
 # ---------------- Order Handling ----------------
@@ -14,11 +15,64 @@ from firebase_config.config import db
 from google.cloud import firestore
 from google.cloud.firestore_v1.base_query import FieldFilter
 from typing import Dict
-
-def add_order(order_data: Dict) -> str:
-    from firebase_config.config import db
-    from google.cloud import firestore
-    from google.cloud.firestore_v1.base_query import FieldFilter
+from firebase_config.stock import SALE_ORDER_TYPES, apply_batch_change, run_stock_transaction
+from firebase_config.batches import BatchAllocator
+from firebase_config.batch_store import load_batches, stage_batches
+from firebase_config.expiry_index import batch_quantities, record_batches
+from firebase_config.low_stock import low_stock_update, record_low_stock_delta
+from firebase_config.ledger import record_order_movements
+from firebase_config.mirror import get_mirror
+from firebase_config.rollups import record_order
+from firebase_config.cache import cached, invalidate
+from firebase_config.idempotency import get_result, record_completion, request_hash, split_key
+
+# Firestore caps `in` filters at 30 values per query
+INVENTORY_LOOKUP_CHUNK = 30
+
+
+def _fetch_inventory_by_names(item_names: List[str]):
+    """Resolve item names to inventory snapshots with chunked `in` queries.
+
+    Returns ({name: snapshot}, number_of_queries).
+    """
+    found = {}
+    queries = 0
+    for start in range(0, len(item_names), INVENTORY_LOOKUP_CHUNK):
+        chunk = item_names[start:start + INVENTORY_LOOKUP_CHUNK]
+        docs = db.collection("Inventory Items").where(filter=FieldFilter("name", "in", chunk)).stream()
+        queries += 1
+        for doc in docs:
+            # Keep the first match per name, same as the old `.limit(1)` lookup
+            found.setdefault(doc.to_dict().get("name"), doc)
+    return found, queries
+
+
+def add_order(order_data: Dict, stats: Optional[Dict] = None, idempotency_key: Optional[str] = None) -> str:
+    """Create an order and apply all of its side effects in one atomic commit.
+
+    Every line item is resolved with a handful of `in` queries, then the
+    inventory updates, the order itself, the client/supplier due and the
+    employee `collected` counter are written in one transaction (retried on
+    contention, see firebase_config.stock). Pass a dict as `stats` to get
+    back the number of Firestore RPCs the call made, and the FEFO
+    allocations per line index under "allocations".
+
+    Sale lines without a batch_number are filled first-expiry-first-out
+    (see firebase_config.batches); the chosen batches are stored on the line
+    under "allocations".
+
+    With an idempotency_key (or order_data["idempotency_key"]) the key is
+    recorded in the same transaction, and a retry returns the order ID
+    without touching stock or dues again.
+    """
+    key, order_data = split_key(order_data, idempotency_key)
+    digest = request_hash(order_data)
+    if key:
+        replayed = get_result("order", key, digest)
+        if replayed is not None:
+            if stats is not None:
+                stats.update({"replayed": True})
+            return replayed
 
     # Core fields
     client_id = order_data.get("client_id", "")
@@ -49,7 +103,7 @@ def add_order(order_data: Dict) -> str:
     payment_status = order_data.get("payment_status", "unpaid")
     link = order_data.get("link", "")
     discount_type = order_data.get("discount_type","percentage")
-    discount = order_data.gete("dicount", 0)
+    discount = order_data.get("discount", 0)
 
     invoice_number = order_data.get("invoice_number") if order_type != "delivery_challan" else None
     challan_number = order_data.get("challan_number") if order_type == "delivery_challan" else None
@@ -59,6 +113,12 @@ def add_order(order_data: Dict) -> str:
     if not order_id:
         raise ValueError("❌ Order must have an invoice_number or challan_number to be used as Order ID.")
 
+    # -------------------- Inventory lookup --------------------
+    item_names = list(dict.fromkeys(item["item_name"] for item in order_data["items"]))
+    item_docs, lookup_queries = _fetch_inventory_by_names(item_names)
+    idempotency_reads = 1 if key else 0  # the replay check above
+    rpc_count = lookup_queries + idempotency_reads
+
     processed_items = []
     total_quantity = 0
     total_tax = 0
@@ -68,57 +128,20 @@ def add_order(order_data: Dict) -> str:
         quantity = float(item["quantity"])
         price = float(item["price"])
         tax = float(item.get("tax", 0))
-        discount = float(item.get("discount", 0))
+        item_discount = float(item.get("discount", 0))
         batch_number = item.get("batch_number", "")
         expiry = item.get("expiry", "")
 
-        # Get inventory item
-        query = db.collection("Inventory Items").where(filter=FieldFilter("name", "==", item_name)).limit(1).stream()
-        item_doc = next(query, None)
+        item_doc = item_docs.get(item_name)
         if not item_doc:
             raise ValueError(f"❌ Inventory item '{item_name}' not found.")
 
-        item_id = item_doc.id
-        item_data = item_doc.to_dict()
-        batches = item_data.get("batches", [])
-        updated_batches = []
-        batch_found = False
-
-        for batch in batches:
-            batch_qty = float(batch.get("quantity", 0))
-            if batch.get("batch_number") == batch_number:
-                batch_found = True
-                if order_type == "purchase":
-                    batch["quantity"] = batch_qty + quantity
-                elif order_type in ["sell", "sales", "delivery_challan"]:
-                    if batch_qty < quantity:
-                        raise ValueError(f"❌ Not enough stock in batch {batch_number} of item '{item_name}'.")
-                    batch["quantity"] = batch_qty - quantity
-            updated_batches.append(batch)
-
-        if not batch_found:
-            if order_type == "purchase":
-                updated_batches.append({
-                    "batch_number": batch_number,
-                    "Expiry": expiry,
-                    "quantity": quantity
-                })
-            else:
-                raise ValueError(f"❌ Batch {batch_number} not found for item '{item_name}'.")
-
-        total_item_quantity = sum(batch["quantity"] for batch in updated_batches)
-
-        db.collection("Inventory Items").document(item_id).update({
-            "stock_quantity": total_item_quantity,
-            "batches": updated_batches
-        })
-
         processed_items.append({
-            "item_id": item_id,
+            "item_id": item_doc.id,
             "item_name": item_name,
             "quantity": quantity,
             "price": price,
-            "discount": discount,
+            "discount": item_discount,
             "tax": tax,
             "batch_number": batch_number,
             "expiry": expiry
@@ -158,36 +181,114 @@ def add_order(order_data: Dict) -> str:
         "updated_at": timestamp
     }
 
-    # Save using custom ID
-    db.collection("Orders").document(order_id).set(order_doc)
-    print(f"[✔] Order added with ID: {order_id} (type: {order_type})")
-
-    # -------------------- Due Logic --------------------
+    item_refs = {
+        name: db.collection("Inventory Items").document(item_docs[name].id)
+        for name in item_names
+    }
     due = total_amount - amount_paid
-
-    if order_type in ["delivery_challan", "sales"] and due > 0 and client_id:
-        if not client_id and order_type in ["delivery_challan", "sales"]:
-            raise ValueError("❌ client_id is empty!")
-        db.collection("Clients").document(client_id).update({
-            "due_amount": firestore.Increment(due)
+    attempts = []
+
+    # -------------------- Single atomic transaction --------------------
+    def write_order(transaction):
+        attempts.append(1)
+
+        # A retry of a call that already committed returns its result
+        if key:
+            replayed = get_result("order", key, digest, transaction)
+            if replayed is not None:
+                return replayed
+
+        # Re-read every touched item inside the transaction so a concurrent
+        # sale on the same batch aborts and retries instead of being lost
+        snapshots = {snap.id: snap for snap in transaction.get_all(list(item_refs.values()))}
+        item_data = {}
+        item_batches = {}
+        before = {}
+        for name, ref in item_refs.items():
+            snapshot = snapshots.get(ref.id)
+            if not snapshot or not snapshot.exists:
+                raise ValueError(f"❌ Inventory item '{name}' not found.")
+            item_data[name] = snapshot.to_dict()
+            item_batches[name] = load_batches(ref.id, item_data[name], transaction)
+            before[name] = batch_quantities(item_batches[name])
+
+        # Explicit batches first, so FEFO never takes stock a later line named
+        auto_lines = []
+        for line in processed_items:
+            if order_type in SALE_ORDER_TYPES and not line["batch_number"]:
+                auto_lines.append(line)
+                continue
+            apply_batch_change(item_batches[line["item_name"]], line["item_name"], line["batch_number"],
+                               line["quantity"], order_type, line["expiry"])
+
+        # One expiry heap per item, shared by every auto line for that item
+        allocators = {}
+        for line in auto_lines:
+            name = line["item_name"]
+            if name not in allocators:
+                allocators[name] = BatchAllocator(item_batches[name], name)
+            line["allocations"] = allocators[name].allocate(line["quantity"])
+
+        low_stock_delta = 0
+        for name, batches in item_batches.items():
+            fields = stage_batches(transaction, item_refs[name].id, item_data[name], batches, before[name])
+            flag, delta = low_stock_update(item_data[name], fields["stock_quantity"])
+            low_stock_delta += delta
+            transaction.update(item_refs[name], fields | flag)
+            record_batches(transaction, item_refs[name].id, item_data[name], batches, before[name])
+        record_low_stock_delta(transaction, low_stock_delta)
+
+        for line in processed_items:
+            record_order_movements(transaction, line["item_id"], order_type, line, order_id)
+
+        # Save using custom ID
+        transaction.set(db.collection("Orders").document(order_id), order_doc)
+
+        # -------------------- Due Logic --------------------
+        if order_type in ["delivery_challan", "sales"] and due > 0 and client_id:
+            transaction.update(db.collection("Clients").document(client_id), {
+                "due_amount": firestore.Increment(due),
+                "updated_at": timestamp
+            })
+        elif order_type == "purchase" and due > 0 and supplier_id:
+            transaction.update(db.collection("Suppliers").document(supplier_id), {
+                "due": firestore.Increment(due),
+                "updated_at": timestamp
+            })
+
+        if amount_collected_by and amount_paid > 0:
+            transaction.update(db.collection("Employees").document(amount_collected_by), {
+                "collected": firestore.Increment(amount_paid),
+                "updated_at": timestamp
+            })
+
+        record_order(transaction, order_doc)
+        if key:
+            record_completion(transaction, "order", key, digest, order_id)
+
+    replayed = run_stock_transaction(write_order)
+    if replayed is not None:
+        if stats is not None:
+            stats.update({"replayed": True, "transaction_attempts": len(attempts)})
+        return replayed
+    invalidate("Inventory Items", *(ref.id for ref in item_refs.values()))
+    invalidate("Clients", client_id)
+    invalidate("Suppliers", supplier_id)
+    # begin + get_all + commit for every attempt, plus the key read
+    rpc_count += (4 if key else 3) * len(attempts)
+
+    print(f"[✔] Order added with ID: {order_id} (type: {order_type}, {rpc_count} RPCs)")
+    if stats is not None:
+        stats.update({
+            "rpc_count": rpc_count,
+            "lookup_queries": lookup_queries,
+            "idempotency_reads": idempotency_reads,
+            "transaction_attempts": len(attempts),
+            "items_updated": len(item_refs),
+            # Keyed by line index: an order may have several lines for one item
+            "allocations": {index: line["allocations"] for index, line in enumerate(processed_items) if "allocations" in line},
+            "replayed": False,
         })
-        print(f"[✔] Updated client due: ₹{due}")
-
-    elif order_type == "purchase" and due > 0 and supplier_id:
-        if not supplier_id and order_type == "purchase":
-            raise ValueError("❌ supplier_id is empty!")
-        db.collection("Suppliers").document(supplier_id).update({
-            "due": firestore.Increment(due)
-        })
-        print(f"[✔] Updated supplier due: ₹{due}")
-
-    if amount_collected_by and amount_paid > 0:
-        if not amount_collected_by and amount_paid > 0:
-            raise ValueError("❌ amount_collected_by is empty despite amount being paid!")
-        db.collection("Employees").document(amount_collected_by).update({
-            "collected": firestore.Increment(amount_paid)
-        })
-        print(f"[✔] Updated collected for employee {amount_collected_by}: ₹{amount_paid}")
 
     return order_id
 
@@ -196,13 +297,17 @@ def add_order(order_data: Dict) -> str:
 
 
 
+@cached("Orders")
 def get_order_by_id(order_id: str) -> Optional[Dict]:
     doc = db.collection("Orders").document(order_id).get()
     return doc.to_dict() | {"id": doc.id} if doc.exists else None
 
-def GetAllOrders():
+def GetAllOrders(strict: bool = False, fields: Optional[List[str]] = None):
     """Fetch all orders from Firestore."""
-    orders_ref = db.collection("Orders").stream()
+    mirror = get_mirror("Orders")
+    if mirror and not strict:
+        return project_docs(mirror.all(), fields)
+    orders_ref = project(db.collection("Orders"), fields).stream()
     orders = []
     for doc in orders_ref:
         data = doc.to_dict()
@@ -228,33 +333,52 @@ def get_all_orders():
             data['order_id'] = doc.id  # Add Firestore doc ID if needed
             orders.append(data)
     return orders
-def get_all_orders():
-    docs = db.collection("Orders").stream()
+def get_all_orders(strict: bool = False, fields: Optional[List[str]] = None):
+    mirror = get_mirror("Orders")
+    if mirror and not strict:
+        return project_docs(mirror.all(), fields)
+    docs = project(db.collection("Orders"), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
+def get_orders_page(page_size: int = 100, page_token: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    """One page of Orders: {"items": [...], "next_page_token": str | None}."""
+    return get_page(db.collection("Orders"), page_size=page_size, page_token=page_token, fields=fields)
+
+def iter_orders(page_size: int = 100, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+    return iter_query(db.collection("Orders"), page_size=page_size, fields=fields)
+
 # ---------------- Filtering ----------------
 
-def get_orders_by_client(client_id: str) -> List[Dict]:
-    docs = db.collection("Orders").where(filter=FieldFilter("client_id", "==", client_id)).stream()
+def get_orders_by_client(client_id: str, strict: bool = False, fields: Optional[List[str]] = None) -> List[Dict]:
+    mirror = get_mirror("Orders")
+    if mirror and not strict:
+        return project_docs(mirror.find("client_id", client_id), fields)
+    docs = project(db.collection("Orders").where(filter=FieldFilter("client_id", "==", client_id)), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
-def get_orders_by_supplier(supplier_id: str) -> List[Dict]:
-    docs = db.collection("Orders").where(filter=FieldFilter("supplier_id", "==", supplier_id)).stream()
+def get_orders_by_supplier(supplier_id: str, strict: bool = False, fields: Optional[List[str]] = None) -> List[Dict]:
+    mirror = get_mirror("Orders")
+    if mirror and not strict:
+        return project_docs(mirror.find("supplier_id", supplier_id), fields)
+    docs = project(db.collection("Orders").where(filter=FieldFilter("supplier_id", "==", supplier_id)), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
-def get_orders_by_status(status: str) -> List[Dict]:
-    docs = db.collection("Orders").where(filter=FieldFilter("status", "==", status)).stream()
+def get_orders_by_status(status: str, strict: bool = False, fields: Optional[List[str]] = None) -> List[Dict]:
+    mirror = get_mirror("Orders")
+    if mirror and not strict:
+        return project_docs(mirror.find("status", status), fields)
+    docs = project(db.collection("Orders").where(filter=FieldFilter("status", "==", status)), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
-def get_orders_by_date_range(start_date: datetime, end_date: datetime) -> List[Dict]:
-    docs = db.collection("Orders")\
+def get_orders_by_date_range(start_date: datetime, end_date: datetime, fields: Optional[List[str]] = None) -> List[Dict]:
+    query = db.collection("Orders")\
         .where(filter=FieldFilter("date", ">=", start_date))\
-        .where(filter=FieldFilter("date", "<=", end_date))\
-        .stream()
+        .where(filter=FieldFilter("date", "<=", end_date))
+    docs = project(query, fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
 def get_total_sales_in_period(start_date: datetime, end_date: datetime) -> float:
-    orders = get_orders_by_date_range(start_date, end_date)
+    orders = get_orders_by_date_range(start_date, end_date, fields=["total_amount"])
     return sum(o.get("total_amount", 0) for o in orders)
 
 # ---------------- Update/Delete ----------------
@@ -262,9 +386,11 @@ def get_total_sales_in_period(start_date: datetime, end_date: datetime) -> float
 def update_order(order_id: str, update_data: Dict):
     update_data["updated_at"] = firestore.SERVER_TIMESTAMP
     db.collection("Orders").document(order_id).update(update_data)
+    invalidate("Orders", order_id)
 
 def delete_order(order_id: str):
     db.collection("Orders").document(order_id).delete()
+    invalidate("Orders", order_id)
 
 # ---------------- Invoice Support ----------------
 
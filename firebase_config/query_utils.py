@@ -0,0 +1,79 @@
+from google.api_core import exceptions
+from google.cloud.firestore_v1.field_path import FieldPath
+from typing import Dict, Iterator, List, Optional
+
+# ---------------- Aggregation Helpers ----------------
+# Server-side count()/sum() so totals cost one RPC regardless of how many
+# documents match. If the aggregation can't run (older client, missing
+# composite index) we fall back to a streamed scan that projects only the
+# field being summed.
+
+_AGGREGATION_ERRORS = (AttributeError, exceptions.FailedPrecondition, exceptions.InvalidArgument)
+
+
+def count_query(query) -> int:
+    try:
+        result = query.count(alias="count").get()
+        return int(result[0][0].value)
+    except _AGGREGATION_ERRORS:
+        # Empty projection streams document names only
+        return sum(1 for _ in query.select([]).stream())
+
+
+def sum_query(query, field: str) -> float:
+    try:
+        result = query.sum(field, alias="total").get()
+        return float(result[0][0].value or 0)
+    except _AGGREGATION_ERRORS:
+        return sum(float(doc.to_dict().get(field, 0) or 0) for doc in query.select([field]).stream())
+
+
+# ---------------- Projection Helpers ----------------
+
+def project(query, fields: Optional[List[str]] = None):
+    """Apply a select() projection when the caller asked for specific fields."""
+    return query.select(fields) if fields else query
+
+
+def project_docs(docs: List[Dict], fields: Optional[List[str]] = None) -> List[Dict]:
+    """Trim already-loaded documents (e.g. mirror reads) to the same projection."""
+    if not fields:
+        return docs
+    return [{field: doc[field] for field in fields if field in doc} | {"id": doc.get("id")} for doc in docs]
+
+
+# ---------------- Cursor Pagination ----------------
+# Pages are ordered by document ID and resumed with start_after on the last
+# ID returned, so page N costs the same as page 1 (no offset skipping) and
+# equality filters need no extra composite index.
+
+DEFAULT_PAGE_SIZE = 100
+
+
+def get_page(collection_ref, query=None, page_size: int = DEFAULT_PAGE_SIZE,
+             page_token: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    """Return {"items": [...], "next_page_token": str | None}.
+
+    `query` is an optional filtered query over `collection_ref`; the page
+    token is the ID of the last document on the previous page.
+    """
+    query = (query if query is not None else collection_ref).order_by(FieldPath.document_id())
+    if page_token:
+        query = query.start_after({FieldPath.document_id(): collection_ref.document(page_token)})
+    # Fetch one extra document to know whether another page exists
+    docs = list(project(query, fields).limit(page_size + 1).stream())
+    items = [doc.to_dict() | {"id": doc.id} for doc in docs[:page_size]]
+    next_page_token = docs[page_size - 1].id if len(docs) > page_size else None
+    return {"items": items, "next_page_token": next_page_token}
+
+
+def iter_query(collection_ref, query=None, page_size: int = DEFAULT_PAGE_SIZE,
+               fields: Optional[List[str]] = None) -> Iterator[Dict]:
+    """Yield documents one bounded page at a time; stop iterating to stop reading."""
+    page_token = None
+    while True:
+        page = get_page(collection_ref, query, page_size, page_token, fields)
+        yield from page["items"]
+        page_token = page["next_page_token"]
+        if not page_token:
+            return
@@ -0,0 +1,411 @@
+from firebase_config.config import db
+from firebase_config.mirror import MIRRORED_COLLECTIONS, get_mirror, keyed_document, register_fallback, source_query, unregister_fallback
+from google.cloud.firestore_v1 import FieldFilter, GeoPoint
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ---------------- Local SQLite Replica ----------------
+# On-disk copy of the hot collections so a new process doesn't start cold.
+# Documents are stored as JSON with the commonly filtered fields pulled out
+# into indexed columns. Each collection remembers a watermark (the newest
+# `updated_at` seen), and a sync pulls only the documents changed since
+# then, so the Firestore reads on startup scale with the day's changes
+# rather than with the collection size.
+#
+# Once enabled, the replica serves the mirror-aware read helpers in
+# firebase_config/* (get_all_*, get_*_by_name, search_*...) whenever no live
+# mirror is running. With the live mirror running, every change it sees is
+# also written to the replica, so the next cold start begins where this
+# process left off.
+#
+# Watermark syncs can't see deletes made by other processes; run
+# `python -m firebase_config.replica --full` (e.g. nightly) to reconcile.
+
+REPLICA_PATH = os.getenv("FIRESTORE_REPLICA_PATH", "firestore_replica.sqlite3")
+REPLICA_MAX_AGE = float(os.getenv("FIRESTORE_REPLICA_MAX_AGE", "300"))  # seconds between delta syncs
+
+REPLICATED_COLLECTIONS = MIRRORED_COLLECTIONS + ["Payments"]
+
+# Server timestamp stamped by every write path, including the transactional
+# due/collected increments and Payments (whose `date` may be backdated)
+WATERMARK_FIELD = "updated_at"
+
+INDEXED_COLUMNS = ["name", "client_id", "order_date", "category", "parent_id"]
+
+# Re-read a small window behind the watermark so writes that committed with
+# an earlier server timestamp than one we already saw aren't skipped
+SYNC_OVERLAP = timedelta(seconds=5)
+UPSERT_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    name TEXT,
+    client_id TEXT,
+    order_date TEXT,
+    category TEXT,
+    parent_id TEXT,
+    PRIMARY KEY (collection, id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    collection TEXT PRIMARY KEY,
+    watermark TEXT,
+    synced_at REAL
+);
+"""
+
+
+# ---------------- Encoding ----------------
+# JSON can't hold Firestore timestamps, references or bytes, so they are
+# tagged on the way in and restored on the way out.
+
+def _default(value):
+    if isinstance(value, datetime):
+        return {"$date": _iso(value)}
+    if isinstance(value, bytes):
+        return {"$bytes": base64.b64encode(value).decode("ascii")}
+    if hasattr(value, "path") and hasattr(value, "id"):  # DocumentReference
+        return {"$ref": value.path}
+    if hasattr(value, "latitude") and hasattr(value, "longitude"):  # GeoPoint
+        return {"$geo": [value.latitude, value.longitude]}
+    return str(value)
+
+
+def _object_hook(obj: Dict):
+    if len(obj) == 1:
+        if "$date" in obj:
+            return datetime.fromisoformat(obj["$date"])
+        if "$bytes" in obj:
+            return base64.b64decode(obj["$bytes"])
+        if "$ref" in obj:
+            return db.document(obj["$ref"])
+        if "$geo" in obj:
+            return GeoPoint(*obj["$geo"])
+    return obj
+
+
+def _iso(value: datetime) -> str:
+    # Naive datetimes are treated as UTC, same as the Firestore client does
+    value = value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+    return value.isoformat()
+
+
+def _column(value) -> Optional[str]:
+    if value is None:
+        return None
+    return _iso(value) if isinstance(value, datetime) else str(value)
+
+
+def encode_document(data: Dict) -> str:
+    return json.dumps(data, default=_default, ensure_ascii=False)
+
+
+def decode_document(text: str) -> Dict:
+    return json.loads(text, object_hook=_object_hook)
+
+
+# ---------------- Replica ----------------
+
+class LocalReplica:
+    def __init__(self, path: str = REPLICA_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._add_missing_columns()
+        self._listeners = {}    # collection -> [callback(doc_id, data_or_None)]
+        self._live = {}         # collection -> live mirror feeding it
+
+    def _add_missing_columns(self):
+        # Replicas created before a column was added to INDEXED_COLUMNS
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        with self._conn:
+            for column in INDEXED_COLUMNS:
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE documents ADD COLUMN {column} TEXT")
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_documents_{column} ON documents (collection, {column})")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------------- Writes ----------------
+
+    def upsert(self, collection: str, docs: Iterable[Tuple[str, Dict]]):
+        self.apply_changes(collection, docs, advance=False)
+
+    def delete(self, collection: str, doc_ids: Iterable[str]):
+        self.apply_changes(collection, [(doc_id, None) for doc_id in doc_ids], advance=False)
+
+    def apply(self, collection: str, doc_id: str, data: Optional[Dict]):
+        """Write one change seen by the live mirror."""
+        self.apply_changes(collection, [(doc_id, data)])
+
+    def apply_changes(self, collection: str, changes: Iterable[Tuple[str, Optional[Dict]]], advance: bool = True):
+        """Write a batch of (doc_id, data_or_None) changes in one SQLite commit.
+
+        With advance=True the watermark moves to the newest `updated_at` in
+        the batch, in the same commit.
+        """
+        rows = []
+        deleted = []
+        applied = []
+        newest = None
+        for doc_id, data in changes:
+            if data is None:
+                deleted.append((collection, doc_id))
+                applied.append((doc_id, None))
+                continue
+            data = {key: value for key, value in data.items() if key != "id"}
+            rows.append((collection, doc_id, encode_document(data),
+                         *(_column(data.get(column)) for column in INDEXED_COLUMNS)))
+            applied.append((doc_id, data | {"id": doc_id}))
+            stamp = data.get(WATERMARK_FIELD)
+            if isinstance(stamp, datetime) and (newest is None or stamp > newest):
+                newest = stamp
+        if not applied:
+            return
+        with self._lock:
+            with self._conn:
+                if rows:
+                    self._conn.executemany(
+                        f"INSERT OR REPLACE INTO documents (collection, id, data, {', '.join(INDEXED_COLUMNS)}) "
+                        f"VALUES (?, ?, ?, {', '.join('?' for _ in INDEXED_COLUMNS)})", rows)
+                if deleted:
+                    self._conn.executemany("DELETE FROM documents WHERE collection = ? AND id = ?", deleted)
+                if advance and newest is not None:
+                    self._write_watermark(collection, newest)
+            self._notify(collection, applied)
+
+    # ---------------- Watermarks ----------------
+
+    def watermark(self, collection: str) -> Optional[datetime]:
+        with self._lock:
+            row = self._conn.execute("SELECT watermark FROM sync_state WHERE collection = ?", (collection,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def synced_at(self, collection: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute("SELECT synced_at FROM sync_state WHERE collection = ?", (collection,)).fetchone()
+        return row[0] if row else None
+
+    def _advance_watermark(self, collection: str, stamp: Optional[datetime]):
+        with self._lock:
+            with self._conn:
+                self._write_watermark(collection, stamp)
+
+    def _write_watermark(self, collection: str, stamp: Optional[datetime]):
+        # Caller holds the lock and the open commit
+        current = self.watermark(collection)
+        if stamp is not None and (current is None or stamp > current):
+            current = stamp
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sync_state (collection, watermark, synced_at) VALUES (?, ?, ?)",
+            (collection, _iso(current) if current else None, time.time()))
+
+    # ---------------- Sync ----------------
+
+    def sync(self, collection: str, full: bool = False) -> int:
+        """Pull changes since the watermark; returns the number of documents read.
+
+        The first sync of a collection (or full=True) streams everything and
+        drops rows for documents that no longer exist.
+        """
+        field = WATERMARK_FIELD
+        watermark = None if full else self.watermark(collection)
+        if watermark is None and not full:
+            full = True
+
+        query = source_query(collection)
+        if not full:
+            query = query.where(filter=FieldFilter(field, ">=", watermark - SYNC_OVERLAP)).order_by(field)
+
+        newest = watermark
+        seen = set()
+        pending = []
+        for doc in query.stream():
+            keyed = keyed_document(collection, doc)
+            if keyed is None:
+                continue
+            doc_id, data = keyed
+            stamp = data.get(field)
+            if isinstance(stamp, datetime) and (newest is None or stamp > newest):
+                newest = stamp
+            seen.add(doc_id)
+            pending.append((doc_id, data))
+            if len(pending) >= UPSERT_CHUNK:
+                self.upsert(collection, pending)
+                pending = []
+        self.upsert(collection, pending)
+
+        if full:
+            with self._lock:
+                stale = [row[0] for row in self._conn.execute(
+                    "SELECT id FROM documents WHERE collection = ?", (collection,)) if row[0] not in seen]
+            self.delete(collection, stale)
+
+        self._advance_watermark(collection, newest)
+        return len(seen)
+
+    def sync_all(self, collections: List[str] = None, full: bool = False) -> Dict[str, int]:
+        return {collection: self.sync(collection, full) for collection in collections or REPLICATED_COLLECTIONS}
+
+    # ---------------- Listeners ----------------
+
+    def add_listener(self, collection: str, callback: Callable):
+        with self._lock:
+            self._listeners.setdefault(collection, []).append(callback)
+            for doc in self.all(collection):
+                callback(doc["id"], doc)
+
+    def _notify(self, collection: str, applied: List):
+        for callback in self._listeners.get(collection, []):
+            for doc_id, data in applied:
+                callback(doc_id, data)
+
+    # ---------------- Reads ----------------
+
+    def _rows(self, sql: str, params: tuple) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [decode_document(data) | {"id": doc_id} for doc_id, data in rows]
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict]:
+        docs = self._rows("SELECT id, data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id))
+        return docs[0] if docs else None
+
+    def all(self, collection: str) -> List[Dict]:
+        return self._rows("SELECT id, data FROM documents WHERE collection = ?", (collection,))
+
+    def find(self, collection: str, field: str, value) -> List[Dict]:
+        if field in INDEXED_COLUMNS:
+            return self._rows(f"SELECT id, data FROM documents WHERE collection = ? AND {field} = ?",
+                              (collection, _column(value)))
+        return [doc for doc in self.all(collection) if doc.get(field) == value]
+
+    def filter(self, collection: str, predicate: Callable) -> List[Dict]:
+        return [doc for doc in self.all(collection) if predicate(doc)]
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents WHERE collection = ?", (collection,)).fetchone()[0]
+
+
+class ReplicaCollection:
+    """Mirror-compatible read view of one replicated collection.
+
+    Registered as the mirror fallback, so it needs the same get/all/find/
+    filter/add_listener surface as CollectionMirror. When no live mirror
+    feeds it, reads first run a delta sync if the last one is older than
+    REPLICA_MAX_AGE.
+    """
+
+    def __init__(self, replica: LocalReplica, collection: str):
+        self.replica = replica
+        self.collection = collection
+        self._sync_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return True
+
+    def age(self) -> Optional[float]:
+        synced_at = self.replica.synced_at(self.collection)
+        return None if synced_at is None else time.time() - synced_at
+
+    def _fresh(self):
+        live = self.replica._live.get(self.collection)
+        if live is not None and live.ready:
+            return
+        age = self.age()
+        if age is not None and age < REPLICA_MAX_AGE:
+            return
+        with self._sync_lock:
+            age = self.age()
+            if age is None or age >= REPLICA_MAX_AGE:
+                self.replica.sync(self.collection)
+
+    def add_listener(self, callback: Callable):
+        self.replica.add_listener(self.collection, callback)
+
+    def get(self, doc_id: str) -> Optional[Dict]:
+        self._fresh()
+        return self.replica.get(self.collection, doc_id)
+
+    def all(self) -> List[Dict]:
+        self._fresh()
+        return self.replica.all(self.collection)
+
+    def find(self, field: str, value) -> List[Dict]:
+        self._fresh()
+        return self.replica.find(self.collection, field, value)
+
+    def filter(self, predicate: Callable) -> List[Dict]:
+        self._fresh()
+        return self.replica.filter(self.collection, predicate)
+
+
+# ---------------- Registry ----------------
+
+_replica = None
+_replica_lock = threading.Lock()
+_views = {}  # collection -> ReplicaCollection registered as the mirror fallback
+
+
+def enable_replica(collections: List[str] = None, sync: bool = True, path: str = None) -> LocalReplica:
+    """Open the replica, delta-sync it and serve reads from it.
+
+    Safe to call repeatedly. Call after enable_mirror() to have the live
+    mirror write every change through to disk.
+    """
+    global _replica
+    with _replica_lock:
+        if _replica is None:
+            _replica = LocalReplica(path or REPLICA_PATH)
+        replica = _replica
+        for collection in collections or REPLICATED_COLLECTIONS:
+            if sync:
+                replica.sync(collection)
+            if collection not in _views:
+                # Keep one view per collection so the name index isn't rebuilt on every call
+                _views[collection] = ReplicaCollection(replica, collection)
+                register_fallback(collection, _views[collection])
+            mirror = get_mirror(collection)
+            if mirror is not _views[collection] and replica._live.get(collection) is not mirror:
+                mirror.add_batch_listener(lambda applied, c=collection: replica.apply_changes(c, applied))
+                replica._live[collection] = mirror
+    return replica
+
+
+def disable_replica():
+    global _replica
+    with _replica_lock:
+        if _replica is None:
+            return
+        for collection in _views:
+            unregister_fallback(collection)
+        _views.clear()
+        _replica.close()
+        _replica = None
+
+
+def get_replica() -> Optional[LocalReplica]:
+    return _replica
+
+
+if __name__ == "__main__":
+    import sys
+    full = "--full" in sys.argv
+    counts = LocalReplica().sync_all(full=full)
+    for collection, count in counts.items():
+        print(f"[✔] {collection}: {count} documents {'reconciled' if full else 'pulled'}")
@@ -0,0 +1,246 @@
+from firebase_config.config import db
+from google.cloud import firestore
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+
+# ---------------- Daily Rollups ----------------
+# One small document per business day at rollups/daily/days/<YYYY-MM-DD>,
+# incremented in the same commit as the order, expense or payment that
+# changes it. Trend, top-seller and daily-summary reads then touch at most
+# one document per day instead of rescanning Orders.
+#
+# Rollups only track creates; after bulk edits or deletes, rebuild them
+# with `python -m firebase_config.rollups`.
+
+IST = timezone(timedelta(hours=5, minutes=30))
+SALE_ORDER_TYPES = ["sell", "sales", "delivery_challan"]
+
+
+def rollup_day(when=None) -> str:
+    """Business day (IST) a timestamp falls on, as YYYY-MM-DD."""
+    if when is None or when == firestore.SERVER_TIMESTAMP:
+        when = datetime.now(timezone.utc)
+    if isinstance(when, datetime):
+        if when.tzinfo is not None:
+            when = when.astimezone(IST)
+        return when.strftime("%Y-%m-%d")
+    if isinstance(when, date):
+        return when.isoformat()
+    return str(when)[:10]
+
+
+def daily_rollup_ref(day: str):
+    return db.collection("rollups").document("daily").collection("days").document(day)
+
+
+# ---------------- Deltas ----------------
+
+def _key(name) -> str:
+    return str(name) if name else "unknown"
+
+
+def order_deltas(order: Dict) -> Dict:
+    order_type = order.get("order_type", "")
+    total_amount = float(order.get("total_amount", 0) or 0)
+    amount_paid = float(order.get("amount_paid", 0) or 0)
+    items = order.get("items", [])
+
+    deltas = {"orders": 1, "orders_by_type": {_key(order_type): 1}}
+
+    if order_type in SALE_ORDER_TYPES:
+        deltas["sales_orders"] = 1
+        deltas["sales_revenue"] = total_amount
+        deltas["sales_by_payment_status"] = {_key(order.get("payment_status", "unpaid")): 1}
+        deltas["items_sold"] = 0.0
+        deltas["item_quantity"] = {}
+        deltas["item_revenue"] = {}
+        for item in items:
+            name = _key(item.get("item_name"))
+            quantity = float(item.get("quantity", 0) or 0)
+            deltas["items_sold"] += quantity
+            deltas["item_quantity"][name] = deltas["item_quantity"].get(name, 0) + quantity
+            deltas["item_revenue"][name] = deltas["item_revenue"].get(name, 0) + quantity * float(item.get("price", 0) or 0)
+    elif order_type == "purchase":
+        deltas["purchase_total"] = total_amount
+        deltas["items_purchased"] = 0.0
+        deltas["item_purchased"] = {}
+        for item in items:
+            name = _key(item.get("item_name"))
+            quantity = float(item.get("quantity", 0) or 0)
+            deltas["items_purchased"] += quantity
+            deltas["item_purchased"][name] = deltas["item_purchased"].get(name, 0) + quantity
+
+    if amount_paid > 0:
+        deltas["collections"] = amount_paid
+        collector = order.get("amount_collected_by")
+        if collector:
+            deltas["collections_by_employee"] = {_key(collector): amount_paid}
+
+    return deltas
+
+
+def expense_deltas(expense: Dict) -> Dict:
+    return {
+        "expenses_logged": 1,
+        "total_expenses": float(expense.get("amount", 0) or 0),
+        "expenses_by_category": {_key(expense.get("category")): float(expense.get("amount", 0) or 0)},
+    }
+
+
+def payment_deltas(payment: Dict) -> Dict:
+    amount = float(payment.get("amount", 0) or 0)
+    deltas = {"payments_received": 1, "payments_total": amount, "collections": amount}
+    collector = payment.get("collected_by")
+    if collector:
+        deltas["collections_by_employee"] = {_key(collector): amount}
+    return deltas
+
+
+def _merge(target: Dict, deltas: Dict):
+    for key, value in deltas.items():
+        if isinstance(value, dict):
+            _merge(target.setdefault(key, {}), value)
+        else:
+            target[key] = target.get(key, 0) + value
+
+
+def _as_increments(deltas: Dict) -> Dict:
+    return {
+        key: _as_increments(value) if isinstance(value, dict) else firestore.Increment(value)
+        for key, value in deltas.items()
+    }
+
+
+# ---------------- Writes ----------------
+
+def record_rollup(writer, deltas: Dict, when=None):
+    """Queue the rollup increments on a transaction or WriteBatch."""
+    day = rollup_day(when)
+    fields = _as_increments(deltas)
+    fields["date"] = day
+    fields["updated_at"] = firestore.SERVER_TIMESTAMP
+    writer.set(daily_rollup_ref(day), fields, merge=True)
+
+
+def record_order(writer, order: Dict, when=None):
+    record_rollup(writer, order_deltas(order), when)
+
+
+def record_expense(writer, expense: Dict, when=None):
+    record_rollup(writer, expense_deltas(expense), when)
+
+
+def record_payment(writer, payment: Dict, when=None):
+    record_rollup(writer, payment_deltas(payment), when)
+
+
+# ---------------- Reads ----------------
+
+def _as_day(value) -> date:
+    if isinstance(value, datetime):
+        return (value.astimezone(IST) if value.tzinfo else value).date()
+    return value
+
+
+def get_daily_rollups(start_date=None, end_date=None) -> List[Dict]:
+    """Rollup documents for a date range, oldest first.
+
+    With both bounds the days are fetched in one batched get; without them
+    the whole (small) rollup collection is streamed.
+    """
+    if start_date and end_date:
+        start, end = _as_day(start_date), _as_day(end_date)
+        refs = [daily_rollup_ref((start + timedelta(days=offset)).isoformat())
+                for offset in range((end - start).days + 1)]
+        docs = db.get_all(refs) if refs else []
+    else:
+        docs = db.collection("rollups").document("daily").collection("days").stream()
+
+    rollups = []
+    for doc in docs:
+        if not doc.exists:
+            continue
+        data = doc.to_dict() | {"date": doc.id}
+        if start_date and data["date"] < _as_day(start_date).isoformat():
+            continue
+        if end_date and data["date"] > _as_day(end_date).isoformat():
+            continue
+        rollups.append(data)
+    return sorted(rollups, key=lambda r: r["date"])
+
+
+def get_daily_rollup(day=None) -> Dict:
+    doc = daily_rollup_ref(rollup_day(day)).get()
+    return doc.to_dict() if doc.exists else {}
+
+
+def get_sales_summary(start_date, end_date) -> Dict:
+    """Sales report for /api/v1/reports/sales-summary built from rollups."""
+    total_sales = 0.0
+    total_orders = 0
+    payment_summary = {"paid": 0, "pending": 0, "partial": 0}
+    daily_sales = {}
+    for rollup in get_daily_rollups(start_date, end_date):
+        total_sales += rollup.get("sales_revenue", 0)
+        total_orders += rollup.get("sales_orders", 0)
+        for status, count in rollup.get("sales_by_payment_status", {}).items():
+            if status in payment_summary:
+                payment_summary[status] += count
+        if rollup.get("sales_revenue"):
+            daily_sales[rollup["date"]] = rollup["sales_revenue"]
+    return {
+        "period": {"start": _as_day(start_date).isoformat(), "end": _as_day(end_date).isoformat()},
+        "total_sales": total_sales,
+        "total_orders": total_orders,
+        "average_order_value": total_sales / total_orders if total_orders > 0 else 0,
+        "payment_summary": payment_summary,
+        "daily_sales": daily_sales,
+    }
+
+
+# ---------------- Backfill ----------------
+
+def backfill_rollups() -> int:
+    """Rebuild every daily rollup from Orders, Expenses and Payments."""
+    days = {}
+
+    order_fields = ["order_type", "order_date", "total_amount", "amount_paid", "payment_status",
+                    "amount_collected_by", "items"]
+    for doc in db.collection("Orders").select(order_fields).stream():
+        order = doc.to_dict()
+        _merge(days.setdefault(rollup_day(order.get("order_date")), {}), order_deltas(order))
+
+    for doc in db.collection("Expenses").select(["amount", "category", "date", "created_at"]).stream():
+        expense = doc.to_dict()
+        when = expense.get("date") or expense.get("created_at")
+        _merge(days.setdefault(rollup_day(when), {}), expense_deltas(expense))
+
+    for doc in db.collection("Payments").select(["amount", "date", "collected_by"]).stream():
+        payment = doc.to_dict()
+        _merge(days.setdefault(rollup_day(payment.get("date")), {}), payment_deltas(payment))
+
+    stale = [doc.reference for doc in db.collection("rollups").document("daily").collection("days").select([]).stream()
+             if doc.id not in days]
+
+    batch = db.batch()
+    pending = 0
+    for day, totals in days.items():
+        batch.set(daily_rollup_ref(day), totals | {"date": day, "updated_at": firestore.SERVER_TIMESTAMP})
+        pending += 1
+        if pending == 400:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    for ref in stale:
+        batch.delete(ref)
+        pending += 1
+        if pending == 400:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+
+    return len(days)
+
+
+if __name__ == "__main__":
+    print(f"✅ Rebuilt {backfill_rollups()} daily rollups")
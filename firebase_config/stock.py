@@ -0,0 +1,270 @@
+from firebase_config.config import db
+from firebase_config.cache import invalidate
+from firebase_config.batch_store import load_batches, stage_batches
+from firebase_config.expiry_index import batch_quantities, record_batches
+from firebase_config.low_stock import low_stock_update, record_low_stock_delta
+from firebase_config.ledger import movement_type, record_movement
+from google.api_core import exceptions
+from google.cloud import firestore
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+import random
+import threading
+import time
+
+# ---------------- Stock Mutation Engine ----------------
+# Every batch-level stock change runs inside a Firestore transaction so two
+# counters selling from the same batch can't overwrite each other. Aborted
+# commits are retried with bounded, jittered backoff and counted below.
+
+SALE_ORDER_TYPES = ["sell", "sales", "delivery_challan"]
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.05  # seconds, doubled on every retry
+BACKOFF_CAP = 1.0
+GROUP_WINDOW = 0.01  # how long a group leader waits for more sales to join
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "transactions": 0,       # transaction attempts started
+    "commits": 0,            # transactions that committed
+    "contention_aborts": 0,  # attempts aborted by a concurrent write
+    "failures": 0,           # calls that gave up or hit a non-retryable error
+    "backoff_seconds": 0.0,
+    "groups": 0,             # grouped transactions committed
+    "grouped_changes": 0,    # sales folded into those groups
+}
+
+
+def _bump(name: str, by=1):
+    with _metrics_lock:
+        _metrics[name] += by
+
+
+def get_contention_metrics() -> Dict:
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    attempts = metrics["transactions"] or 1
+    metrics["contention_rate"] = metrics["contention_aborts"] / attempts
+    return metrics
+
+
+def reset_contention_metrics():
+    with _metrics_lock:
+        for key in _metrics:
+            _metrics[key] = 0.0 if key == "backoff_seconds" else 0
+
+
+# ---------------- Batch Helpers ----------------
+
+def apply_batch_change(batches: List[Dict], item_name: str, batch_number: str,
+                       quantity: float, order_type: str, expiry: str = ""):
+    """Apply one order line to an item's `batches` list in place."""
+    for batch in batches:
+        if batch.get("batch_number") != batch_number:
+            continue
+        batch_qty = float(batch.get("quantity", 0))
+        if order_type == "purchase":
+            batch["quantity"] = batch_qty + quantity
+        elif order_type in SALE_ORDER_TYPES:
+            if batch_qty < quantity:
+                raise ValueError(f"❌ Not enough stock in batch {batch_number} of item '{item_name}'.")
+            batch["quantity"] = batch_qty - quantity
+        return
+
+    if order_type != "purchase":
+        raise ValueError(f"❌ Batch {batch_number} not found for item '{item_name}'.")
+    batches.append({
+        "batch_number": batch_number,
+        "Expiry": expiry,
+        "quantity": quantity
+    })
+
+
+# ---------------- Transactions ----------------
+
+def _is_contention(exc: Exception) -> bool:
+    # With max_attempts=1 the client wraps the Aborted commit in a ValueError
+    if isinstance(exc, (exceptions.Aborted, exceptions.Conflict)):
+        return True
+    return isinstance(exc.__cause__, (exceptions.Aborted, exceptions.Conflict))
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter keeps retrying counters from colliding again in lockstep
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def run_stock_transaction(fn: Callable, max_retries: int = MAX_RETRIES):
+    """Run fn(transaction) in a Firestore transaction, retrying on contention.
+
+    fn may run more than once, so it must do all of its reads through the
+    transaction and keep no state between attempts.
+    """
+    for attempt in range(max_retries + 1):
+        transaction = db.transaction(max_attempts=1)
+        _bump("transactions")
+        try:
+            result = firestore.transactional(fn)(transaction)
+        except Exception as exc:
+            if not _is_contention(exc):
+                _bump("failures")
+                raise
+            _bump("contention_aborts")
+            if attempt == max_retries:
+                _bump("failures")
+                raise
+            delay = _backoff(attempt)
+            _bump("backoff_seconds", delay)
+            time.sleep(delay)
+            continue
+        _bump("commits")
+        return result
+
+
+def mutate_stock(item_id: str, changes: List[Dict], order_type: str) -> float:
+    """Apply several batch changes to one item atomically.
+
+    changes: [{"batch_number": str, "quantity": float, "expiry": str}, ...]
+    Returns the item's new stock_quantity.
+    """
+    ref = db.collection("Inventory Items").document(item_id)
+
+    def txn(transaction):
+        snapshot = ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise ValueError(f"❌ Inventory item '{item_id}' not found.")
+        item_data = snapshot.to_dict()
+        batches = load_batches(item_id, item_data, transaction)
+        before = batch_quantities(batches)
+        for change in changes:
+            apply_batch_change(batches, item_data.get("name", item_id), change.get("batch_number", ""),
+                               float(change["quantity"]), order_type, change.get("expiry", ""))
+        fields = stage_batches(transaction, item_id, item_data, batches, before)
+        flag, delta = low_stock_update(item_data, fields["stock_quantity"])
+        transaction.update(ref, fields | flag)
+        record_batches(transaction, item_id, item_data, batches, before)
+        record_low_stock_delta(transaction, delta)
+        sign = 1 if order_type == "purchase" else -1
+        for change in changes:
+            record_movement(transaction, item_id, movement_type(order_type), sign * float(change["quantity"]),
+                            change.get("batch_number", ""))
+        return fields["stock_quantity"]
+
+    stock_quantity = run_stock_transaction(txn)
+    invalidate("Inventory Items", item_id)
+    return stock_quantity
+
+
+# ---------------- Grouped Sales ----------------
+
+class StockGroupCommitter:
+    """Coalesce concurrent sales against the same item into one transaction.
+
+    The first caller for an item becomes the group leader: it waits `window`
+    seconds for other sales on that item to queue up, then commits all of
+    them in a single transaction. A sale that would overdraw its batch fails
+    on its own future without affecting the rest of the group.
+
+    A leader commits one group on its own thread; sales that queued up in
+    the meantime are led by a worker thread, so no caller waits for more
+    than its own group. add_order doesn't go through here: an order writes
+    several items, the order document, dues and its idempotency key in one
+    transaction, which can't be split into per-item groups.
+    """
+
+    def __init__(self, window: float = GROUP_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._leaders = set()
+
+    def submit(self, item_id: str, batch_number: str, quantity: float,
+               order_type: str = "sales") -> Future:
+        future = Future()
+        change = {"batch_number": batch_number, "quantity": float(quantity), "order_type": order_type}
+        with self._lock:
+            self._pending.setdefault(item_id, []).append((change, future))
+            lead = item_id not in self._leaders
+            if lead:
+                self._leaders.add(item_id)
+        if lead:
+            self._lead(item_id)
+        return future
+
+    def _lead(self, item_id: str):
+        group = []
+        try:
+            time.sleep(self.window)
+            with self._lock:
+                group = self._pending.pop(item_id, [])
+            if group:
+                self._commit_group(item_id, group)
+        except Exception as exc:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(exc)
+        finally:
+            with self._lock:
+                if self._pending.get(item_id):
+                    # Hand the next group to a worker so this caller can return
+                    threading.Thread(target=self._lead, args=(item_id,), daemon=True).start()
+                else:
+                    self._leaders.discard(item_id)
+
+    def _commit_group(self, item_id: str, group: List):
+        ref = db.collection("Inventory Items").document(item_id)
+
+        def txn(transaction):
+            snapshot = ref.get(transaction=transaction)
+            if not snapshot.exists:
+                raise ValueError(f"❌ Inventory item '{item_id}' not found.")
+            item_data = snapshot.to_dict()
+            batches = load_batches(item_id, item_data, transaction)
+            before = batch_quantities(batches)
+            errors = []
+            for change, _ in group:
+                try:
+                    apply_batch_change(batches, item_data.get("name", item_id), change["batch_number"],
+                                       change["quantity"], change["order_type"])
+                    errors.append(None)
+                except ValueError as exc:
+                    errors.append(exc)
+            stock_quantity = float(item_data.get("stock_quantity", 0) or 0)
+            if any(error is None for error in errors):
+                fields = stage_batches(transaction, item_id, item_data, batches, before)
+                stock_quantity = fields["stock_quantity"]
+                flag, delta = low_stock_update(item_data, stock_quantity)
+                transaction.update(ref, fields | flag)
+                record_batches(transaction, item_id, item_data, batches, before)
+                record_low_stock_delta(transaction, delta)
+                for (change, _), error in zip(group, errors):
+                    if error is None:
+                        sign = 1 if change["order_type"] == "purchase" else -1
+                        record_movement(transaction, item_id, movement_type(change["order_type"]),
+                                        sign * change["quantity"], change["batch_number"])
+            return errors, stock_quantity
+
+        try:
+            errors, stock_quantity = run_stock_transaction(txn)
+        except Exception as exc:
+            for _, future in group:
+                future.set_exception(exc)
+            return
+        # Resolve the futures first: the group has committed whatever happens next
+        for (_, future), error in zip(group, errors):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(stock_quantity)
+        _bump("groups")
+        _bump("grouped_changes", len(group))
+        invalidate("Inventory Items", item_id)
+
+
+stock_group = StockGroupCommitter()
+
+
+def sell_stock(item_id: str, batch_number: str, quantity: float, timeout: float = None) -> float:
+    """Deduct stock through the shared group committer and wait for the commit."""
+    return stock_group.submit(item_id, batch_number, quantity).result(timeout=timeout)
@@ -1,24 +1,20 @@
 from firebase_config.config import db
+from firebase_config.query_utils import get_page, iter_query, project, project_docs
+from firebase_config.id_allocator import get_next_id
+from firebase_config.mirror import get_mirror
+from firebase_config.cache import cached, invalidate
+from firebase_config.name_index import rank_by_name, search_by_name
 from google.cloud import firestore
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional
 from google.cloud.firestore_v1 import FieldFilter
 
+# Suppliers at this schema keep supply history in Suppliers/<id>/supply_history
+# (one document per delivery) instead of the nested `supplied_items` array.
+SUPPLY_SCHEMA = 2
+
 # Add a new supplier
 from google.cloud import firestore
 
-def get_next_id(prefix: str, counter_name: str) -> str:
-    counter_ref = db.collection("doc_counters").document(counter_name)
-    counter_doc = counter_ref.get()
-
-    if not counter_doc.exists:
-        counter_ref.set({"last_id": 1})
-        next_id = 1
-    else:
-        counter_ref.update({"last_id": firestore.Increment(1)})
-        next_id = counter_doc.to_dict()["last_id"] + 1
-
-    return f"{prefix}{next_id:04d}"
-
 def add_supplier(supplier_data: Dict) -> str:
     supplier_id = get_next_id("S", "suppliers")
     supplier_doc = {
@@ -27,6 +23,7 @@ def add_supplier(supplier_data: Dict) -> str:
         "contact": supplier_data.get("contact", ""),
         "due": 0,
         "address": supplier_data.get("address", ""),
+        "supply_schema": SUPPLY_SCHEMA,
         "created_at": firestore.SERVER_TIMESTAMP,
         "updated_at": firestore.SERVER_TIMESTAMP
     }
@@ -36,12 +33,16 @@ def add_supplier(supplier_data: Dict) -> str:
 
 
 # Get supplier by exact name
-def get_supplier_by_name(name: str) -> List[Dict]:
-    docs = db.collection("Suppliers").where(filter=FieldFilter("name", "==", name)).stream()
+def get_supplier_by_name(name: str, strict: bool = False, fields: Optional[List[str]] = None) -> List[Dict]:
+    mirror = get_mirror("Suppliers")
+    if mirror and not strict:
+        return project_docs(mirror.find("name", name), fields)
+    docs = project(db.collection("Suppliers").where(filter=FieldFilter("name", "==", name)), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
 
 # Get supplier by document ID
+@cached("Suppliers")
 def get_supplier_by_id(supplier_id: str) -> Dict:
     doc = db.collection("Suppliers").document(supplier_id).get()
     return doc.to_dict() | {"id": doc.id} if doc.exists else None
@@ -51,62 +52,104 @@ def get_supplier_by_id(supplier_id: str) -> Dict:
 def update_supplier(supplier_id: str, updated_data: Dict):
     updated_data["updated_at"] = firestore.SERVER_TIMESTAMP
     db.collection("Suppliers").document(supplier_id).update(updated_data)
+    invalidate("Suppliers", supplier_id)
 
 
 # Delete a supplier
 def delete_supplier(supplier_id: str):
     db.collection("Suppliers").document(supplier_id).delete()
+    invalidate("Suppliers", supplier_id)
 
 
 # Get all suppliers
-def get_all_suppliers() -> List[Dict]:
-    docs = db.collection("Suppliers").stream()
+def get_all_suppliers(strict: bool = False, fields: Optional[List[str]] = None) -> List[Dict]:
+    mirror = get_mirror("Suppliers")
+    if mirror and not strict:
+        return project_docs(mirror.all(), fields)
+    docs = project(db.collection("Suppliers"), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
 
+# Page through suppliers / stream them in bounded pages
+def get_suppliers_page(page_size: int = 100, page_token: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    """One page of Suppliers: {"items": [...], "next_page_token": str | None}."""
+    return get_page(db.collection("Suppliers"), page_size=page_size, page_token=page_token, fields=fields)
+
+def iter_suppliers(page_size: int = 100, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+    return iter_query(db.collection("Suppliers"), page_size=page_size, fields=fields)
+
+
 # Fuzzy search by partial name
-def search_suppliers_by_partial_name(partial_name: str) -> List[Dict]:
+def search_suppliers_by_partial_name(partial_name: str, strict: bool = False, limit: int = None) -> List[Dict]:
+    """Ranked, typo-tolerant name search (served from the name index when live)."""
+    if not strict:
+        results = search_by_name("Suppliers", partial_name, limit)
+        if results is not None:
+            return results
     docs = db.collection("Suppliers").stream()
-    return [
-        doc.to_dict() | {"id": doc.id}
-        for doc in docs
-        if partial_name.lower() in doc.to_dict().get("name", "").lower()
-    ]
+    return rank_by_name([doc.to_dict() | {"id": doc.id} for doc in docs], partial_name, limit)
 
 
 # Increment or decrement supplier's due amount
 def update_supplier_due(supplier_id: str, change_amount: float):
     db.collection("Suppliers").document(supplier_id).update({
-        "due_amount": firestore.Increment(change_amount),
+        "due": firestore.Increment(change_amount),
         "updated_at": firestore.SERVER_TIMESTAMP
     })
+    invalidate("Suppliers", supplier_id)
 
 
 # Get payment records made to a supplier
-def get_supplier_payments(supplier_id: str) -> List[Dict]:
-    docs = db.collection("P ayments").where(filter=FieldFilter("supplier_id", "==", supplier_id)).stream()
+def get_supplier_payments(supplier_id: str, fields: Optional[List[str]] = None) -> List[Dict]:
+    docs = project(db.collection("P ayments").where(filter=FieldFilter("supplier_id", "==", supplier_id)), fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in docs]
 
 
 # Get all purchase orders from a supplier
-def get_supplier_order_history(supplier_id: str) -> list:
-    orders = (
+def get_supplier_order_history(supplier_id: str, fields: Optional[List[str]] = None) -> list:
+    query = (
         db.collection("Orders")
         .where(filter=FieldFilter("supplier_id", "==", supplier_id))
         .where(filter=FieldFilter("type", "==", "purchase"))
-        .stream()
     )
+    orders = project(query, fields).stream()
     return [doc.to_dict() | {"id": doc.id} for doc in orders]
 
 
-# OPTIONAL: Add supply history for a specific item from a supplier
+# ---------------- Supply History ----------------
+
+def supply_history_ref(supplier_id: str):
+    return db.collection("Suppliers").document(supplier_id).collection("supply_history")
+
+
+def uses_supply_subcollection(supplier: Dict) -> bool:
+    return int(supplier.get("supply_schema", 1) or 1) >= SUPPLY_SCHEMA
+
+
+def supply_history_document(item_id: str, supply_record: Dict) -> Dict:
+    return supply_record | {"item_id": item_id, "recorded_at": firestore.SERVER_TIMESTAMP}
+
+
+# Add supply history for a specific item from a supplier
 def add_supply_record(supplier_id: str, item_id: str, supply_record: Dict):
     doc_ref = db.collection("Suppliers").document(supplier_id)
-    doc = doc_ref.get()
+    doc = doc_ref.get(field_paths=["supply_schema"])
     if not doc.exists:
         raise ValueError("Supplier not found")
 
-    supplier = doc.to_dict()
+    if uses_supply_subcollection(doc.to_dict()):
+        # One small document per delivery; the supplier doc only tracks item ids
+        batch = db.batch()
+        batch.set(supply_history_ref(supplier_id).document(), supply_history_document(item_id, supply_record))
+        batch.update(doc_ref, {
+            "supplied_item_ids": firestore.ArrayUnion([item_id]),
+            "updated_at": firestore.SERVER_TIMESTAMP
+        })
+        batch.commit()
+        invalidate("Suppliers", supplier_id)
+        return
+
+    supplier = doc_ref.get().to_dict()
     items = supplier.get("supplied_items", [])
 
     found = False
@@ -126,3 +169,28 @@ def add_supply_record(supplier_id: str, item_id: str, supply_record: Dict):
         "supplied_items": items,
         "updated_at": firestore.SERVER_TIMESTAMP
     })
+    invalidate("Suppliers", supplier_id)
+
+
+# Supply history for a supplier (optionally one item), whichever layout it uses
+def get_supply_history(supplier_id: str, item_id: Optional[str] = None, limit: int = None) -> List[Dict]:
+    doc = db.collection("Suppliers").document(supplier_id).get()
+    if not doc.exists:
+        raise ValueError("Supplier not found")
+    supplier = doc.to_dict()
+
+    if uses_supply_subcollection(supplier):
+        query = supply_history_ref(supplier_id)
+        if item_id:
+            query = query.where(filter=FieldFilter("item_id", "==", item_id))
+        query = query.order_by("recorded_at", direction=firestore.Query.DESCENDING)
+        if limit:
+            query = query.limit(limit)
+        return [entry.to_dict() | {"id": entry.id} for entry in query.stream()]
+
+    history = []
+    for item in supplier.get("supplied_items", []):
+        if item_id and item["item_id"] != item_id:
+            continue
+        history += [record | {"item_id": item["item_id"]} for record in reversed(item.get("supply_history", []))]
+    return history[:limit] if limit else history
@@ -5,98 +5,59 @@ from firebase_config.finance import *
 
 from firebase_config.orders import *
 from firebase_config.suppliers import *
-from firebase_config.llama_index_configs.order_index import load_orders_index
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-# from llama_index import ServiceContext
-# from llama_index_configs.order_index import load_orders_index
 from firebase_config.llama_index_configs import global_settings  # triggers embedding config
+from firebase_config.llama_index_configs import index_registry
 
-# Create service_context once, or pass it as a parameter
-# firebase_config/tools.py or wherever your tools are defined
-
-from firebase_config.llama_index_configs.order_index import load_orders_index
-from firebase_config.llama_index_configs.invoice_index import load_invoices_index
-from firebase_config.llama_index_configs.item_index import load_items_index
-from firebase_config.llama_index_configs.supplier_index import load_suppliers_index
-from firebase_config.llama_index_configs.client_index import load_clients_index
-from firebase_config.llama_index_configs.payment_index import load_payments_index
-from firebase_config.llama_index_configs.expense_index import load_expenses_index
-# from firebase_config.llama_index_configs.client_index2 import load_clients_index
-def query_orders_semantic(query: str) -> str:
+# Query engines come from the process-wide registry, so each call is one
+# query embedding plus one vector search (no per-call index rebuild)
+def _query_semantic(collection: str, label: str, query: str) -> str:
     try:
-        index = load_orders_index()
-        response = index.as_query_engine().query(query)
-        return str(response)
+        return index_registry.query(collection, query)
     except FileNotFoundError:
-        return "Orders index not found. Please build it first."
+        return f"{label} index not found. Please build it first."
     except Exception as e:
-        return f"Error querying orders index: {e}"
+        return f"Error querying {collection} index: {e}"
+
+def query_orders_semantic(query: str) -> str:
+    return _query_semantic("orders", "Orders", query)
 
 def query_invoices_semantic(query: str) -> str:
-    try:
-        index = load_invoices_index()
-        response = index.as_query_engine().query(query)
-        return str(response)
-    except FileNotFoundError:
-        return "Invoice index not found. Please build it first."
-    except Exception as e:
-        return f"Error querying orders index: {e}"
-    
+    return _query_semantic("invoices", "Invoice", query)
+
 def query_items_semantic(query: str) -> str:
-    try:
-        index = load_items_index()
-        response = index.as_query_engine().query(query)
-        return str(response)
-    except FileNotFoundError:
-        return "Orders index not found. Please build it first."
-    except Exception as e:
-        return f"Error querying orders index: {e}"
-    
+    return _query_semantic("items", "Items", query)
+
 def query_clients_semantic(query: str) -> str:
-    try:
-        index = load_clients_index()
-        # print(f"✅ Loaded index, using vector store: {index._vector_store._collection_name}")
-        response = index.as_query_engine().query(query)
-        return str(response)
-    except FileNotFoundError:
-        return "Clients index not found. Please build it first."
-    except Exception as e:
-        return f"Error querying clients index: {e}"
+    return _query_semantic("clients", "Clients", query)
 
 def query_suppliers_semantic(query: str) -> str:
-    try:
-        index = load_suppliers_index()
-        response = index.as_query_engine().query(query)
-        return str(response)
-    except FileNotFoundError:
-        return "Orders index not found. Please build it first."
-    except Exception as e:
-        return f"Error querying orders index: {e}"
-    
+    return _query_semantic("suppliers", "Suppliers", query)
+
 def query_payments_semantic(query: str) -> str:
-    try:
-        index = load_payments_index()
-        response = index.as_query_engine().query(query)
-        return str(response)
-    except FileNotFoundError:
-        return "Orders index not found. Please build it first."
-    except Exception as e:
-        return f"Error querying orders index: {e}"
-    
+    return _query_semantic("payments", "Payments", query)
+
 def query_expenses_semantic(query: str) -> str:
-    try:
-        index = load_expenses_index()
-        response = index.as_query_engine().query(query)
-        return str(response)
-    except FileNotFoundError:
-        return "Orders index not found. Please build it first."
-    except Exception as e:
-        return f"Error querying orders index: {e}"
+    return _query_semantic("expenses", "Expenses", query)
+
+def query_employees_semantic(query: str) -> str:
+    return _query_semantic("employees", "Employees", query)
+
 
 
 
 
 
+# Orders are handed to the LLM a page at a time instead of the whole collection
+ORDERS_TOOL_PAGE_SIZE = 20
+
+def get_orders_tool_page(token: str = "") -> dict:
+    # Only tokens this tool issued are honoured, so free text from the LLM
+    # ("all", "_", ...) always starts from the first page
+    token = (token or "").strip()
+    page_token = token[len("after:"):] if token.startswith("after:") else None
+    page = get_orders_page(page_size=ORDERS_TOOL_PAGE_SIZE, page_token=page_token)
+    next_token = page["next_page_token"]
+    return {"orders": page["items"], "next_page_token": f"after:{next_token}" if next_token else None}
 
 # Inventory tools
 inventory_tools = [
@@ -164,7 +125,7 @@ supplier_tools.append(
 # Orders tools
 order_tools = [
     Tool("GetOrderById", get_order_by_id, "Get order details by order ID."),
-    Tool("AddOrder", lambda data: str(add_order(data)), "Add a new order."),
+    Tool("AddOrder", lambda data: str(add_order(data)), "Add a new order. Include a unique idempotency_key so a retried call is not applied twice."),
     Tool("UpdateOrder", lambda data: update_order(data['order_id'], data['updated_fields']) or "Updated", "Update order."),
     Tool("DeleteOrder", lambda order_id: delete_order(order_id) or "Deleted", "Delete order."),
     
@@ -174,7 +135,8 @@ order_tools = [
     Tool("GetOrdersByDateRange", lambda data: get_orders_by_date_range(data['start_date'], data['end_date']), "Get orders within a date range."),
     Tool("GetTotalSalesInPeriod", lambda data: get_total_sales_in_period(data['start_date'], data['end_date']), "Get total sales in a given period."),
 
-    Tool("GetAllOrders", lambda _: get_all_orders(), "Get all orders.", return_direct=True),
+    # Not return_direct: the agent has to see next_page_token to ask for the next page
+    Tool("GetAllOrders", get_orders_tool_page, "Get orders one page at a time. Pass nothing for the first page, or the exact next_page_token from the previous result for the next one. Keep calling while next_page_token is not null to see every order."),
     
     # 🔍 Invoice-related tools (now inside Orders)
     Tool("SearchOrdersByInvoiceNumber", search_orders_by_invoice_number, "Search orders by invoice number."),
@@ -206,9 +168,9 @@ order_tools.append(
 
 # Finance tools
 finance_tools = [
-    Tool("AddExpense", lambda data: str(add_expense(data)), "Add a new expense."),
-    Tool("AddPayment", lambda data: str(add_payment(data)), "Add a new payment."),
-    Tool("AddSupplierPayment", lambda data: str(add_supplier_payment(data)), "Add a payment to a supplier."),
+    Tool("AddExpense", lambda data: str(add_expense(data)), "Add a new expense. Include a unique idempotency_key so a retried call is not applied twice."),
+    Tool("AddPayment", lambda data: str(add_payment(data)), "Add a new payment. Include a unique idempotency_key so a retried call is not applied twice."),
+    Tool("AddSupplierPayment", lambda data: str(add_supplier_payment(data)), "Add a payment to a supplier. Include a unique idempotency_key so a retried call is not applied twice."),
     Tool("GetAllDues", lambda _: get_all_dues(), "Get all dues."),
     Tool("GetExpenses", lambda _: get_expenses(), "Get all expenses."),
     Tool("GetPayments", lambda _: get_payments(), "Get all payments."),
@@ -235,6 +197,14 @@ finance_tools.append(
     )
 )
 
+# Employee tools
+employee_tools = [
+    Tool(
+        name="SemanticSearchEmployees",
+        func=query_employees_semantic,
+        description="Semantic search over employees (amounts collected and paid) when exact tool is not found."
+    )
+]
 
 
 # Combine all tools
@@ -244,5 +214,6 @@ all_tools = (
     supplier_tools +
     order_tools +
     
-    finance_tools
+    finance_tools +
+    employee_tools
 )
@@ -4,6 +4,7 @@ import os
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
+import uuid
 import speech_recognition as sr
 os.environ["STREAMLIT_WATCHFILE"] = "false"
 import torch
@@ -20,7 +21,7 @@ from firebase_config.inventory import (
     get_inventory_item_by_id, update_inventory_item, update_stock_quantity,
     delete_inventory_item, get_items_expiring_soon
 )
-from firebase_config.dashboard import add_expense, add_payment, add_supplier_payment, get_all_dues, get_date_range, get_expenses, get_inventory_distribution_by_category, get_low_stock_items_dashboard, get_net_profit,  get_order_trend, get_overdue_payments, get_supplier_payments,get_payments, get_total_expenses, get_top_selling_items, get_total_orders, get_total_payments, get_total_revenue 
+from firebase_config.dashboard import add_expense, add_payment, add_supplier_payment, get_all_dues, get_date_range, get_expenses, get_low_stock_items_dashboard, get_net_profit,  get_order_trend, get_overdue_payments, get_supplier_payments,get_payments, get_total_expenses, get_top_selling_items, get_total_orders, get_total_payments, get_total_revenue, get_snapshot
 from firebase_config.orders import (
     add_order, get_all_orders, get_order_by_id, get_orders_by_status,
     get_orders_by_date_range, get_total_sales_in_period, update_order,
@@ -43,6 +44,22 @@ from firebase_config.finance import (
     add_payment, add_expense, get_all_dues, get_payments, get_expenses,
     get_total_payments, get_total_expenses
 )
+from firebase_config.mirror import enable_mirror
+from firebase_config.cache import enable_cache_invalidation
+from firebase_config.replica import enable_replica
+from firebase_config.llama_index_configs.index_registry import warm_up
+
+# Opt-in live mirror: list/search reads are served from memory once enabled
+if os.getenv("FIRESTORE_MIRROR") == "1":
+    enable_mirror()
+    # Rides on the mirror's listeners, so it costs no extra watch streams
+    enable_cache_invalidation()
+if os.getenv("FIRESTORE_REPLICA") == "1":
+    # After the mirror, so live changes are written through to disk
+    enable_replica()
+if os.getenv("SEMANTIC_WARMUP") == "1":
+    # Build the shared semantic indexes now rather than on the first agent query
+    warm_up(background=True)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -50,6 +67,16 @@ logger = logging.getLogger(__name__)
 
 st.set_page_config(page_title="AI Business Assistant", layout="wide")
 
+
+def form_request_key(form: str) -> str:
+    # Kept until the submission succeeds, so resubmitting after a timeout replays instead of writing twice
+    return st.session_state.setdefault(f"{form}_request_key", uuid.uuid4().hex)
+
+
+def clear_request_key(form: str):
+    st.session_state.pop(f"{form}_request_key", None)
+
+
 tabs = st.tabs(["Dashboard", "Inventory", "Orders", "Clients", "Suppliers", "Employees", "Finance", "ChatBot"])
 
 # ---------------- Dashboard ----------------
@@ -58,31 +85,35 @@ with tabs[0]:
 
     st.subheader("Overview")
     try:
-        # Fetch data for metrics
-        total_inventory = len(get_all_inventory_items() or [])
-        low_stock_items = get_low_stock_items_dashboard(threshold=10) or []
-        total_orders = get_total_orders()
-        total_revenue = get_total_revenue()
-        total_expenses = get_total_expenses()
-        net_profit = get_net_profit()
-        total_dues = sum(d['total_due'] for d in get_all_dues() if d.get('total_due', 0.0))
+        # One cached, concurrently computed snapshot shared by every viewer
+        snapshot = get_snapshot("all")
+        for metric, error in snapshot.errors.items():
+            logger.error(f"Error fetching dashboard metric {metric}: {error}")
+        total_inventory = snapshot.total_inventory
+        low_stock_items = snapshot.low_stock_items
+        total_orders = snapshot.total_orders
+        total_revenue = snapshot.total_revenue
+        total_expenses = snapshot.total_expenses
+        net_profit = snapshot.net_profit
+        total_dues = snapshot.total_dues
 
         # Display metrics in columns
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric("Total Inventory Items", total_inventory)
-            st.metric("Low Stock Items", len(low_stock_items))
+            st.metric("Low Stock Items", snapshot.low_stock_count)
         with col2:
             st.metric("Total Orders", total_orders)
             st.metric("Total Revenue", f"₹{total_revenue:,.2f}")
         with col3:
             st.metric("Total Expenses", f"₹{total_expenses:,.2f}")
             st.metric("Net Profit", f"₹{net_profit:,.2f}")
+        st.caption(f"Computed in {snapshot.elapsed:.2f}s, {snapshot.age():.0f}s ago")
 
         # Inventory by Category Chart
         st.subheader("Inventory by Category")
         try:
-            category_dist = get_inventory_distribution_by_category()
+            category_dist = snapshot.category_distribution
             df_category = pd.DataFrame(category_dist)
             st.bar_chart(df_category.set_index("category"))
         except Exception as e:
@@ -92,9 +123,7 @@ with tabs[0]:
         # Sales Over Time (Last 30 Days)
         st.subheader("Sales Over Time (Last 30 Days)")
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=30)
-            sales_trend = get_order_trend(start_date, end_date, group_by="day")
+            sales_trend = snapshot.order_trend
             df_sales = pd.DataFrame(sales_trend)
             df_sales["date"] = pd.to_datetime(df_sales["date"])
             st.line_chart(df_sales.set_index("date"))
@@ -103,7 +132,7 @@ with tabs[0]:
             st.error(f"Error: {e}")
 
         # Low Stock Items Table
-        st.subheader("⚠️ Low Stock Items (Threshold: 10)")
+        st.subheader("⚠️ Low Stock Items (at or below each item's threshold)")
         try:
             if low_stock_items:
                 df_low_stock = pd.DataFrame(low_stock_items)
@@ -117,7 +146,7 @@ with tabs[0]:
         # Top Selling Items
         st.subheader("🏆 Top Selling Items")
         try:
-            top_items = get_top_selling_items(limit=5)
+            top_items = snapshot.top_selling_items
             if top_items:
                 df_top = pd.DataFrame(top_items)
                 st.dataframe(df_top[["item_name", "quantity", "total_amount"]])
@@ -130,7 +159,7 @@ with tabs[0]:
         # Overdue Payments
         st.subheader("📅 Overdue Payments")
         try:
-            overdue_clients = get_overdue_payments(days_overdue=7)
+            overdue_clients = snapshot.overdue_payments
             if overdue_clients:
                 df_due = pd.DataFrame(overdue_clients)
                 st.dataframe(df_due[["client_name", "total_due", "overdue_days"]])
@@ -257,10 +286,11 @@ with tabs[1]:
     # 6. Low Stock Items
     st.subheader("⚠️ Low Stock Items")
     with st.form("Low Stock"):
+        use_item_levels = st.checkbox("Use each item's own low-stock level", value=True)
         threshold = st.number_input("Threshold Quantity", min_value=1, value=10)
         if st.form_submit_button("Check"):
             try:
-                results = get_low_stock_items(threshold)
+                results = get_low_stock_items(None if use_item_levels else threshold)
                 if results:
                     for i in results:
                         st.json(i)
@@ -464,7 +494,8 @@ with tabs[2]:
                     order_data["supplier_name"] = supplier_name
 
                 # 📝 Add Order to Firestore
-                order_id = add_order(order_data)
+                order_id = add_order(order_data, idempotency_key=form_request_key("order"))
+                clear_request_key("order")
                 st.success(f"✅ Order added successfully! ID: {order_id}")
 
             except Exception as e:
@@ -1005,8 +1036,8 @@ with tabs[6]:
                     "invoice_id": invoice_id,
                     "payment_method": payment_method,
                     "notes": notes
-                })
-                update_client_due(client_id, -amount)
+                }, idempotency_key=form_request_key("payment"), reduce_due=True)
+                clear_request_key("payment")
                 st.success("Payment recorded and due updated!")
             except Exception as e:
                 logger.error(f"Error adding payment: {e}")
@@ -1034,7 +1065,8 @@ with tabs[6]:
                     "remarks": remarks,
                     "created_at": firestore.SERVER_TIMESTAMP,
                     "updated_at": firestore.SERVER_TIMESTAMP
-                })
+                }, idempotency_key=form_request_key("expense"))
+                clear_request_key("expense")
                 st.success("✅ Expense recorded successfully!")
             except Exception as e:
                 logger.error(f"Error adding expense: {e}")
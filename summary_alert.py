@@ -8,6 +8,8 @@ from firebase_config.config import db
 from datetime import datetime, timedelta
 import pytz
 from google.cloud.firestore_v1 import FieldFilter
+from firebase_config.query_utils import count_query
+from firebase_config.rollups import SALE_ORDER_TYPES, get_daily_rollup
 
 def generate_daily_summary():
     
@@ -29,40 +31,22 @@ def generate_daily_summary():
         "total_expenses": 0.0
     }
 
-    # 1. Fetch and summarize orders
-    sell_orders = db.collection("Orders").where(filter=FieldFilter("type", "==", "sell")).where(filter=FieldFilter("timestamp", ">=", today)).where(filter=FieldFilter("timestamp", "<", tomorrow)).stream()
-    for order in sell_orders:
-        data = order.to_dict()
-        summary["orders_placed"] += 1
-        summary["total_sales"] += data.get("total", 0)
-        summary["items_sold"] += sum(item.get("quantity", 0) for item in data.get("items", []))
-
-    purchase_orders = db.collection("Orders").where(filter=FieldFilter("type", "==", "purchase")).where(filter=FieldFilter("timestamp", ">=", today)).where(filter=FieldFilter("timestamp", "<", tomorrow)).stream()
-    for order in purchase_orders:
-        data = order.to_dict()
-        summary["total_purchases"] += data.get("total", 0)
-        summary["items_purchased"] += sum(item.get("quantity", 0) for item in data.get("items", []))
-
-    # 2. Fetch dues collected today
-    invoices = db.collection("Invoices").where(filter=FieldFilter("timestamp", ">=", today)).where(filter=FieldFilter("timestamp", "<", tomorrow)).stream()
-    for inv in invoices:
-        data = inv.to_dict()
-        summary["dues_collected"] += data.get("amount_paid", 0)
-        summary["invoices_generated"] += 1
-
-    # 3. Fetch new clients/suppliers added today
-    new_clients = db.collection("Clients").where(filter=FieldFilter("created_at", ">=", today)).where(filter=FieldFilter("created_at", "<", tomorrow)).stream()
-    summary["new_clients"] = len(list(new_clients))
-
-    new_suppliers = db.collection("Suppliers").where(filter=FieldFilter("created_at", ">=", today)).where(filter=FieldFilter("created_at", "<", tomorrow)).stream()
-    summary["new_suppliers"] = len(list(new_suppliers))
-
-    # 4. Expenses
-    expenses = db.collection("Expenses").where(filter=FieldFilter("timestamp", ">=", today)).where(filter=FieldFilter("timestamp", "<", tomorrow)).stream()
-    for expense in expenses:
-        data = expense.to_dict()
-        summary["expenses_logged"] += 1
-        summary["total_expenses"] += data.get("amount", 0)
+    # 1-2. Orders, collections and expenses come from today's rollup document
+    rollup = get_daily_rollup(today)
+    orders_by_type = rollup.get("orders_by_type", {})
+    summary["orders_placed"] = sum(orders_by_type.get(t, 0) for t in SALE_ORDER_TYPES)
+    summary["total_sales"] = rollup.get("sales_revenue", 0.0)
+    summary["items_sold"] = rollup.get("items_sold", 0)
+    summary["total_purchases"] = rollup.get("purchase_total", 0.0)
+    summary["items_purchased"] = rollup.get("items_purchased", 0)
+    summary["dues_collected"] = rollup.get("collections", 0.0)
+    summary["expenses_logged"] = rollup.get("expenses_logged", 0)
+    summary["total_expenses"] = rollup.get("total_expenses", 0.0)
+
+    # 3. New clients/suppliers/invoices added today (server-side counts)
+    summary["new_clients"] = count_query(db.collection("Clients").where(filter=FieldFilter("created_at", ">=", today)).where(filter=FieldFilter("created_at", "<", tomorrow)))
+    summary["new_suppliers"] = count_query(db.collection("Suppliers").where(filter=FieldFilter("created_at", ">=", today)).where(filter=FieldFilter("created_at", "<", tomorrow)))
+    summary["invoices_generated"] = count_query(db.collection("Invoices").where(filter=FieldFilter("created_at", ">=", today)).where(filter=FieldFilter("created_at", "<", tomorrow)))
 
     # ✅ Final message
     summary_message = f"""
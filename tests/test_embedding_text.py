@@ -0,0 +1,59 @@
+import sys
+import types
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("llama_index.core")
+pytest.importorskip("numpy")
+
+from llama_index.core import MockEmbedding  # noqa: E402
+
+# The build scripts and the daemon connect to Firestore, Qdrant and load the
+# sentence-transformers model at import; rendering text needs none of them
+embed_model = MockEmbedding(embed_dim=8)
+sys.modules.setdefault("firebase_config.config", types.SimpleNamespace(db=mock.MagicMock()))
+sys.modules.setdefault("firebase_config.llama_index_configs.global_settings", types.SimpleNamespace(
+    embed_model=embed_model,
+    global_settings=lambda: {"embed_model": embed_model, "qdrant_client": mock.MagicMock()},
+))
+
+from firebase_config.llama_index_configs import build_client_index, build_inventory_index  # noqa: E402
+from firebase_config.llama_index_configs.embedding_cache import CachedEmbedding, EmbeddingCache, text_hash  # noqa: E402
+from firebase_config.llama_index_configs.sync_daemon import SCHEMAS  # noqa: E402
+
+CLIENT = {
+    "name": "City Dialysis Centre",
+    "pan": "ABCDE1234F",
+    "gst": "27ABCDE1234F1Z5",
+    "poc_name": "R. Mehta",
+    "poc_contact": "9800000000",
+    "address": "Andheri, Mumbai",
+    "due_amount": 1250.0,
+}
+
+ITEM = {
+    "name": "Heparin Injection 5000 IU",
+    "category": "injection",
+    "stock_quantity": 40.0,
+    "low_stock": 10.0,
+    "batches": [{"batch_number": "HP-01", "exp": "2027-03", "quantity": 40.0}],
+}
+
+
+@pytest.mark.parametrize("module, reader, builder, schema, doc_id, record", [
+    (build_client_index, "get_all_clients", "build_client_documents", "clients", "C0001", CLIENT),
+    (build_inventory_index, "get_all_inventory_items", "build_item_documents", "items", "I0001", ITEM),
+])
+def test_rebuild_and_daemon_render_the_same_text(tmp_path, module, reader, builder, schema, doc_id, record):
+    # The reader returns the document with its id, the listener sees the raw snapshot
+    with mock.patch.object(module, reader, lambda strict=False: [record | {"id": doc_id}]):
+        built = getattr(module, builder)()[0]
+    synced = SCHEMAS[schema].document(dict(record), doc_id)
+
+    assert text_hash(built.text) == text_hash(synced.text)
+
+    embed_model = CachedEmbedding(MockEmbedding(embed_dim=8), cache=EmbeddingCache("test-model", str(tmp_path)))
+    embed_model.get_text_embedding_batch([built.text])
+    embed_model.get_text_embedding_batch([synced.text])
+    assert embed_model.cache.stats()["hits"] == 1
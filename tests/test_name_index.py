@@ -0,0 +1,55 @@
+import sys
+import types
+
+# name_index only needs get_mirror for the registry helpers; keep the
+# Firestore client (and its credentials) out of these tests
+sys.modules.setdefault("firebase_config.mirror", types.SimpleNamespace(get_mirror=lambda collection: None))
+
+from firebase_config.name_index import NameIndex, rank_by_name  # noqa: E402
+
+NAMES = [
+    "Heparin Injection 5000 IU",
+    "Inj. Heparin",
+    "Dialyser F8",
+    "Blood Tubing Set",
+    "AV Fistula Needle 16G",
+    "A.V. Fistula Needle 17G",
+    "Sodium Bicarbonate",
+    "Citos Disinfectant",
+    "Surgical Gloves",
+    "Paracetamol Tab 500",
+]
+
+QUERIES = [
+    "hep", "heparin", "inj heparin", "hepar1n", "e", "ar", "ly", "g", "16",
+    "av fistula", "fistula needle", "sodium", "bicarb", "carbonate", "gloves",
+    "tab", "tablet", "paracetamol 500", "citos", "xyz", "a b",
+]
+
+
+def _index():
+    index = NameIndex("Inventory Items")
+    for n, name in enumerate(NAMES):
+        index.on_change(f"I{n:04d}", {"name": name})
+    return index
+
+
+def test_indexed_search_matches_scan():
+    index = _index()
+    docs = [{"id": f"I{n:04d}", "name": name} for n, name in enumerate(NAMES)]
+    for query in QUERIES:
+        # Ties may order differently (normalized vs raw name), so compare sets
+        scanned = {doc["id"] for doc in rank_by_name(docs, query)}
+        assert set(index.search_ids(query)) == scanned, query
+
+
+def test_short_query_matches_mid_word():
+    # "ar" only occurs inside words ("Heparin", "Paracetamol", "Bicarbonate")
+    names = {NAMES[int(doc_id[1:])] for doc_id in _index().search_ids("ar")}
+    assert {"Heparin Injection 5000 IU", "Paracetamol Tab 500", "Sodium Bicarbonate"} <= names
+
+
+def test_removed_documents_drop_out():
+    index = _index()
+    index.on_change("I0000", None)
+    assert "I0000" not in index.search_ids("heparin")